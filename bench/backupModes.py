@@ -0,0 +1,97 @@
+#!/usr/bin/env python3
+
+import os
+import sys
+import time as t
+import random
+import shutil
+import logging
+import argparse
+import tempfile
+
+## The modules live in the repository root
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from zomboidBackup import zomboidBackup
+
+## Created by https://steamcommunity.com/id/Mr_Pink47/
+## © 2024 - Open Source - Free to share and modify
+
+## README: Compares snapshot backups against tar archives on a synthetic world tree
+## The world is a grid of map_X_Y.bin chunks (half random, half zero bytes, so they compress about as well as real chunks) plus a few
+## database files. After a first backup in each mode, --changed percent of the chunks are rewritten, as a save after some play would,
+## and each mode backs up again. Seconds and bytes written are reported for both backups.
+##
+##      python3 bench/backupModes.py --chunks 4000 --chunk-kb 16 --changed 2
+
+def writeChunk(path, size, rng) -> None:
+    ''' Write one chunk file of half random, half zero bytes '''
+    with open(path, "wb") as chunk:
+        chunk.write(rng.randbytes(size // 2) + bytes(size - size // 2))
+
+def syntheticWorld(world_path, chunks, chunk_size, seed=0) -> list:
+    ''' Build the world tree and return its chunk paths '''
+    rng     = random.Random(seed)
+    side    = int(chunks ** 0.5) + 1
+    paths   = []
+    os.makedirs(world_path, exist_ok=True)
+    for index in range(chunks):
+        path = os.path.join(world_path, f"map_{index // side}_{index % side}.bin")
+        writeChunk(path, chunk_size, rng)
+        paths.append(path)
+    for name in ["players.db", "vehicles.db", "map_t.bin", "map_meta.bin"]:
+        writeChunk(os.path.join(world_path, name), 256 * 1024, rng)
+    return paths
+
+def treeBytes(path) -> int:
+    ''' Total size of every file under path '''
+    return sum(os.path.getsize(os.path.join(root, name)) for root, _, names in os.walk(path) for name in names)
+
+def timed(action) -> float:
+    ''' Run action and return the seconds it took '''
+    started = t.perf_counter()
+    action()
+    return t.perf_counter() - started
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Snapshot vs tar backups of a synthetic world tree")
+    parser.add_argument("--chunks", type=int, default=4000, help="Number of map_X_Y.bin chunk files")
+    parser.add_argument("--chunk-kb", type=int, default=16, help="Size of each chunk file")
+    parser.add_argument("--changed", type=float, default=2, help="Percent of chunks rewritten between the two backups")
+    parser.add_argument("--work-dir", default=None, help="Scratch folder (default: a temporary folder, removed afterwards)")
+    args = parser.parse_args()
+    logging.disable(logging.CRITICAL)
+
+    work_dir    = args.work_dir or tempfile.mkdtemp(prefix="zomboid_bench_")
+    world_path  = os.path.join(work_dir, "servertest")
+    try:
+        chunk_paths = syntheticWorld(world_path, args.chunks, args.chunk_kb * 1024)
+        print(f"World: {len(chunk_paths)} chunks, {treeBytes(world_path) / 1048576:.1f} MiB")
+
+        tar_backup      = zomboidBackup(world_path, os.path.join(work_dir, "tar"))
+        snapshot_backup = zomboidBackup(world_path, os.path.join(work_dir, "snapshot"))
+        results         = {"tar": [], "snapshot": []}
+        for round_name in ["first", "after changes"]:
+            if round_name != "first":
+                rng = random.Random(1)
+                for path in rng.sample(chunk_paths, max(1, int(len(chunk_paths) * args.changed / 100))):
+                    writeChunk(path, args.chunk_kb * 1024, rng)
+            before = treeBytes(tar_backup.backup_path) if os.path.isdir(tar_backup.backup_path) else 0
+            seconds = timed(lambda: tar_backup.archive("restart"))
+            results["tar"].append((round_name, seconds, treeBytes(tar_backup.backup_path) - before))
+            before = treeBytes(snapshot_backup.backup_path) if os.path.isdir(snapshot_backup.backup_path) else 0
+            seconds = timed(lambda: snapshot_backup.snapshot("restart"))
+            results["snapshot"].append((round_name, seconds, treeBytes(snapshot_backup.backup_path) - before))
+            ## Backups named by the second must not collide
+            t.sleep(1)
+
+        print(f"{'mode':>9} {'backup':>14} {'seconds':>8} {'MiB written':>12}")
+        for mode, rounds in results.items():
+            for round_name, seconds, written in rounds:
+                print(f"{mode:>9} {round_name:>14} {seconds:>8.2f} {written / 1048576:>12.1f}")
+    finally:
+        if not args.work_dir:
+            shutil.rmtree(work_dir, ignore_errors=True)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,77 @@
+#!/usr/bin/env python3
+
+import os
+import sys
+import json
+import tarfile
+import argparse
+import tempfile
+import statistics
+import subprocess as sp
+
+## Created by https://steamcommunity.com/id/Mr_Pink47/
+## © 2024 - Open Source - Free to share and modify
+
+## README: Compares the time and memory it takes to import zomboidSoup in this checkout against the last version built on pandas
+## The pandas version is exported from git (by default the commit before "import pandas" was removed from zomboidSoup.py) and each
+## import runs in a fresh interpreter, reporting wall time and peak RSS over a bare interpreter. Both versions need their requirements.
+##
+##      python3 bench/importFootprint.py --runs 10
+
+REPO = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+## Run in a fresh interpreter: import the module and print the seconds it took and the peak RSS in KiB
+PROBE = ("import time, resource; started = time.perf_counter(); {statement}; "
+         "print(time.perf_counter() - started, resource.getrusage(resource.RUSAGE_SELF).ru_maxrss)")
+
+def pandasRevision() -> str:
+    ''' Return the last commit whose zomboidSoup.py still imported pandas '''
+    removals = sp.run(["git", "log", "-S", "import pandas", "--format=%H", "--", "zomboidSoup.py"], cwd=REPO, capture_output=True, text=True, check=True).stdout.split()
+    if not removals:
+        raise SystemExit("No commit touching \"import pandas\" in zomboidSoup.py; pass --baseline")
+    return f"{removals[0]}~1"
+
+def exportRevision(revision, target) -> None:
+    ''' Write the tree of a git revision into target '''
+    archive = sp.run(["git", "archive", "--format=tar", revision], cwd=REPO, capture_output=True, check=True).stdout
+    with tempfile.TemporaryFile() as archive_file:
+        archive_file.write(archive)
+        archive_file.seek(0)
+        with tarfile.open(fileobj=archive_file) as tar:
+            tar.extractall(target, filter="data")
+
+def probe(tree, statement, runs) -> tuple:
+    ''' Return the median seconds and median peak RSS (MiB) of a statement run in fresh interpreters inside tree '''
+    seconds, rss = [], []
+    for run in range(runs):
+        output = sp.run([sys.executable, "-c", PROBE.format(statement=statement)], cwd=tree, capture_output=True, text=True, check=True).stdout.split()
+        seconds.append(float(output[0]))
+        rss.append(int(output[1]) / 1024)
+    return statistics.median(seconds), statistics.median(rss)
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="zomboidSoup import time and memory against the pandas version")
+    parser.add_argument("--baseline", default=None, help="Git revision of the pandas version (default: found from the history)")
+    parser.add_argument("--runs", type=int, default=10, help="Fresh interpreters per measurement; the median is reported")
+    parser.add_argument("--json", action="store_true", help="Print the results as JSON")
+    args = parser.parse_args()
+
+    baseline = args.baseline or pandasRevision()
+    with tempfile.TemporaryDirectory(prefix="zomboid_bench_") as baseline_tree:
+        exportRevision(baseline, baseline_tree)
+        _, bare_rss = probe(REPO, "pass", args.runs)
+        results     = {"bare_interpreter_rss_mb": round(bare_rss, 1)}
+        for name, tree in [("pandas", baseline_tree), ("current", REPO)]:
+            seconds, rss            = probe(tree, "import zomboidSoup", args.runs)
+            results[name]           = {"import_ms": round(seconds * 1000, 1), "peak_rss_mb": round(rss, 1), "rss_over_bare_mb": round(rss - bare_rss, 1)}
+
+    if args.json:
+        print(json.dumps({"baseline": baseline, **results}, indent=4))
+        return
+    print(f"Baseline: {baseline}; bare interpreter {results['bare_interpreter_rss_mb']} MiB")
+    print(f"{'version':>8} {'import ms':>10} {'peak RSS MiB':>13} {'over bare MiB':>14}")
+    for name in ["pandas", "current"]:
+        print(f"{name:>8} {results[name]['import_ms']:>10.1f} {results[name]['peak_rss_mb']:>13.1f} {results[name]['rss_over_bare_mb']:>14.1f}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,138 @@
+#!/usr/bin/env python3
+
+import os
+import re
+import sys
+import json
+import random
+import argparse
+import tempfile
+import time as t
+
+## The modules live in the repository root
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from zomboidLogs import logTailer, LOG_EVENT_PATTERNS
+
+## Created by https://steamcommunity.com/id/Mr_Pink47/
+## © 2024 - Open Source - Free to share and modify
+
+## README: Measures how fast zomboidLogs reads a large server-console.txt, against a single combined regex over the same chunks
+## A synthetic console log of --size-mib MiB is written first: mostly routine lines, with one event line (save, connect, mod error,
+## exception...) every --event-every lines. Both scanners read it with logTailer.readFile in the same 4 MiB chunks, so only the way
+## candidate lines are found differs: the keyword pass (bytes.find per keyword, then the event patterns on those lines only) or one
+## alternation of every event pattern run over the whole chunk. Each is run --runs times from the page cache; the best run is reported.
+##
+##      python3 bench/logThroughput.py --size-mib 2048
+
+## Routine lines make up most of a real console log; none of them contain an event keyword
+ROUTINE_LINES = [
+    b"LOG  : General     , %d> 1,234,567,890> znet: Java_zombie_core_znet_SteamGameServer_RunCallbacks (%d ms)",
+    b"LOG  : Network     , %d> 1,234,567,890> [%d] ZombieUpdate: sent 128 zombies to 4 players",
+    b"LOG  : General     , %d> 1,234,567,890> chunk %d,412 loaded from disk",
+    b"DEBUG: Multiplayer , %d> 1,234,567,890> VehicleManager: %d vehicles in cell",
+    b"LOG  : Lua         , %d> 1,234,567,890> Loading: media/lua/server/Items/Distribution_%d.lua",
+]
+
+EVENT_LINES = [
+    b"LOG  : General     , %d> 1,234,567,890> Saving game... (%d chunks)",
+    b"LOG  : General     , %d> 1,234,567,890> World saved in %d ms",
+    b"LOG  : Network     , %d> 1,234,567,890> [fully-connected] \"player%d\" connection: guid=1234",
+    b"LOG  : Network     , %d> 1,234,567,890> [disconnect] \"player%d\" reason: quit",
+    b"LOG  : Mod         , %d> 1,234,567,890> Workshop item %d not found",
+    b"ERROR: General     , %d> 1,234,567,890> java.lang.NullPointerException at zombie.iso.IsoCell.%d",
+]
+
+class combinedTailer(logTailer):
+    ''' A logTailer that finds candidate lines with one combined alternation regex instead of the keyword pass '''
+
+    def __init__(self, index, **kwargs) -> None:
+        ''' Constructor to compile every event pattern into one multiline alternation '''
+        super().__init__(index, **kwargs)
+        self.combined = re.compile(rb"^.*(?:" + rb"|".join(LOG_EVENT_PATTERNS.values()) + rb").*$", re.MULTILINE)
+
+    def parseChunk(self, chunk, path, chunk_offset, now) -> list:
+        ''' Classify every line the combined regex matches '''
+        events = []
+        for match in self.combined.finditer(chunk):
+            event_type = self.classifyLine(match.group(0))
+            if event_type:
+                events.append({"time": now, "type": event_type, "path": path, "offset": chunk_offset + match.start(),
+                               "line": match.group(0).rstrip(b"\r").decode("utf-8", "replace")[:1000]})
+        return events
+
+def writeLog(path, size_mib, event_every, seed=47) -> int:
+    ''' Write a synthetic console log of at least size_mib MiB and return how many event lines it holds '''
+    rng         = random.Random(seed)
+    target      = size_mib * 1048576
+    written     = 0
+    events      = 0
+    line_number = 0
+    with open(path, "wb") as log_file:
+        while written < target:
+            block = []
+            for _ in range(10000):
+                line_number += 1
+                if line_number % event_every == 0:
+                    block.append(rng.choice(EVENT_LINES) % (line_number, rng.randrange(1000)))
+                    events += 1
+                else:
+                    block.append(rng.choice(ROUTINE_LINES) % (line_number, rng.randrange(1000)))
+            data = b"\n".join(block) + b"\n"
+            log_file.write(data)
+            written += len(data)
+    return events
+
+def measure(tailer, path, runs) -> tuple:
+    ''' Read the whole log runs times; return the best MiB/s and the number of events found '''
+    size    = os.path.getsize(path)
+    best    = 0
+    for run in range(runs):
+        started         = t.perf_counter()
+        events, offset  = tailer.readFile(path, 0, t.time())
+        best            = max(best, size / 1048576 / (t.perf_counter() - started))
+    if offset != size:
+        raise SystemExit(f"{type(tailer).__name__} stopped at byte {offset} of {size}")
+    return best, len(events)
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Console log read throughput: keyword pass vs one combined regex")
+    parser.add_argument("--size-mib", type=int, default=1024, help="Size of the synthetic console log")
+    parser.add_argument("--event-every", type=int, default=200, help="One event line per this many lines")
+    parser.add_argument("--runs", type=int, default=3, help="Reads per scanner; the best is reported")
+    parser.add_argument("--combined-mib", type=int, default=64, help="Only time the combined regex over the first this many MiB (0: the whole log), as it is slow")
+    parser.add_argument("--json", action="store_true", help="Print the results as JSON")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory(prefix="zomboid_bench_") as work_dir:
+        log_path    = os.path.join(work_dir, "server-console.txt")
+        event_lines = writeLog(log_path, args.size_mib, args.event_every)
+        results     = {"size_mib": round(os.path.getsize(log_path) / 1048576), "event_lines": event_lines}
+
+        keyword_mib_s, keyword_events   = measure(logTailer(None), log_path, args.runs)
+        results["keyword"]              = {"mib_per_second": round(keyword_mib_s, 1), "events": keyword_events}
+
+        ## The combined regex reads a prefix of the same log, cut at a line end, so a full run doesn't take minutes
+        combined_path, reference_events = log_path, keyword_events
+        if args.combined_mib and args.combined_mib < args.size_mib:
+            combined_path = os.path.join(work_dir, "prefix.txt")
+            with open(log_path, "rb") as log_file, open(combined_path, "wb") as prefix_file:
+                prefix = log_file.read(args.combined_mib * 1048576)
+                prefix_file.write(prefix[:prefix.rfind(b"\n") + 1])
+            _, reference_events = measure(logTailer(None), combined_path, 1)
+        combined_mib_s, combined_events = measure(combinedTailer(None), combined_path, args.runs)
+        results["combined"]             = {"mib_per_second": round(combined_mib_s, 1), "events": combined_events,
+                                           "measured_mib": round(os.path.getsize(combined_path) / 1048576)}
+        if combined_events != reference_events:
+            raise SystemExit(f"The scanners disagree: {reference_events} events from the keyword pass, {combined_events} from the combined regex")
+
+    if args.json:
+        print(json.dumps(results, indent=4))
+        return
+    print(f"Console log: {results['size_mib']} MiB, {event_lines} event lines")
+    print(f"{'scanner':>9} {'MiB/s':>8} {'events':>9} {'MiB read':>9}")
+    print(f"{'keyword':>9} {keyword_mib_s:>8.1f} {keyword_events:>9} {results['size_mib']:>9}")
+    print(f"{'combined':>9} {combined_mib_s:>8.1f} {combined_events:>9} {results['combined']['measured_mib']:>9}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,144 @@
+#!/usr/bin/env python3
+
+import os
+import sys
+import json
+import math
+import time as t
+import random
+import argparse
+import statistics
+
+## The modules live in the repository root
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from zomboidModPolling import modUpdateHistory, modPollScheduler
+
+## Created by https://steamcommunity.com/id/Mr_Pink47/
+## © 2024 - Open Source - Free to share and modify
+
+## README: Replays workshop update histories through a fixed sweep and through adaptive polling (zomboidModPolling.py)
+## The histories are either the ones the manager recorded in mod_history_path, a JSON file of {workshop_id: [update epochs]}, or generated
+## for a typical mod list. Mod checks run every 30 minutes and restarts every 4 hours, as in the manager: a restart looks every mod up,
+## checks stop for the hour before it and all mods are looked up in the last 90 minutes. Adaptive polling learns each mod's rate over a
+## warm-up as long as the measured period; only the measured period is counted.
+##
+##      python3 bench/modPollingReplay.py --history /home/user/Zomboid/Server/zomboid_mod_history.json --days 30
+##      python3 bench/modPollingReplay.py --synthetic 100 --days 30
+
+def latestTimestamp(updates, now):
+    ''' Return the "last updated" timestamp a lookup at now would see for a mod with these update epochs, as the API reports it '''
+    seen = [update for update in updates if update <= now]
+    return str(max(seen)) if seen else None
+
+def replay(mod_updates, start, end, scheduler, measure_from=None, check_interval=30 * 60, restart_interval=4 * 60 * 60, priority_window=90 * 60, api_batch_size=100) -> dict:
+    ''' Replay recorded {workshop_id: [update epochs]} from start to end through a scheduler; returns lookup counts and detection delays after measure_from '''
+    ## A restart looks every mod up again when it writes the mod state, and lookups stop for the last hour before it, as in the manager
+    measure_from    = start if measure_from is None else measure_from
+    workshop_ids    = list(mod_updates)
+    delays          = []
+    lookups         = 0
+    api_requests    = 0
+    pending         = {workshop_id: sorted(update for update in updates if measure_from < update <= end) for workshop_id, updates in mod_updates.items()}
+
+    def lookUp(looked_up, now):
+        ''' Look mods up at now, recording the detection delay of every update they pick up '''
+        nonlocal lookups, api_requests
+        if now > measure_from:
+            lookups         += len(looked_up)
+            api_requests    += math.ceil(len(looked_up) / api_batch_size)
+        for workshop_id in looked_up:
+            while pending[workshop_id] and pending[workshop_id][0] <= now:
+                delays.append(now - pending[workshop_id].pop(0))
+        scheduler.observe({workshop_id: latestTimestamp(mod_updates[workshop_id], now) for workshop_id in looked_up}, now)
+
+    now = start
+    lookUp(workshop_ids, now)
+    next_restart = start + restart_interval
+    while now + check_interval <= end:
+        now += check_interval
+        if now >= next_restart:
+            lookUp(workshop_ids, now)
+            next_restart += restart_interval
+            continue
+        if restart_interval > 60 * 60 and next_restart - now <= 60 * 60:
+            continue
+        priority = workshop_ids if next_restart - now <= priority_window else ()
+        lookUp(scheduler.dueMods(workshop_ids, now, priority), now)
+
+    missed = sum(len(updates) for updates in pending.values())
+    return {
+        "lookups"       : lookups,
+        "api_requests"  : api_requests,
+        "updates"       : len(delays) + missed,
+        "detected"      : len(delays),
+        "delay_mean"    : statistics.mean(delays) if delays else 0.0,
+        "delay_p95"     : sorted(delays)[int(0.95 * (len(delays) - 1))] if delays else 0.0,
+        "delay_max"     : max(delays) if delays else 0.0,
+    }
+
+def compareReplay(mod_updates, start, end, seed=0, **replay_args) -> dict:
+    ''' Replay the same histories through a fixed sweep and through adaptive polling '''
+    check_interval = replay_args.get("check_interval", 30 * 60)
+    return {
+        "sweep"    : replay(mod_updates, start, end, modPollScheduler(modUpdateHistory(), adaptive=False), **replay_args),
+        "adaptive" : replay(mod_updates, start, end, modPollScheduler(modUpdateHistory(), min_interval=check_interval, seed=seed), **replay_args),
+    }
+
+def syntheticHistories(mods, start, end, seed=0) -> dict:
+    ''' Generate {workshop_id: [update epochs]} for a typical mod list: mostly dormant mods, some monthly ones and a few patched several times a week, with follow-up fixes '''
+    generator   = random.Random(seed)
+    histories   = {}
+    for index in range(mods):
+        kind            = generator.random()
+        updates_per_day = 1 / 365 if kind < 0.7 else 1 / 30 if kind < 0.9 else 3 / 7
+        updates         = []
+        update          = start + generator.expovariate(updates_per_day) * 24 * 60 * 60
+        while update < end:
+            updates.append(int(update))
+            ## A third of updates get a fix within a few hours
+            if generator.random() < 1 / 3:
+                updates.append(int(update + generator.uniform(0.5, 6) * 60 * 60))
+            update += generator.expovariate(updates_per_day) * 24 * 60 * 60
+        histories[str(2000000000 + index)] = sorted(update for update in updates if update < end)
+    return histories
+
+def printReplay(results, days) -> None:
+    ''' Print the sweep and adaptive replay results side by side '''
+    sweep, adaptive = results["sweep"], results["adaptive"]
+    print(f"Measured {days:g} days, {sweep['updates']} updates")
+    print(f"{'':<22}{'sweep':>12}{'adaptive':>12}")
+    for key, label, scale in [("lookups", "Mod lookups", 1), ("api_requests", "API requests", 1), ("detected", "Updates detected", 1),
+                              ("delay_mean", "Mean delay (min)", 60), ("delay_p95", "95th pct delay (min)", 60), ("delay_max", "Max delay (min)", 60)]:
+        print(f"{label:<22}{sweep[key] / scale:>12.1f}{adaptive[key] / scale:>12.1f}")
+    if sweep["lookups"]:
+        print(f"Adaptive polling saves {1 - adaptive['lookups'] / sweep['lookups']:.0%} of mod lookups (page requests on the html backend)")
+
+def main() -> None:
+    parser  = argparse.ArgumentParser(description="Mod lookups and update detection delays: fixed sweep vs adaptive polling")
+    source  = parser.add_mutually_exclusive_group(required=True)
+    source.add_argument("--history", help="The manager's mod_history_path, or a JSON file of {workshop_id: [update epochs]}")
+    source.add_argument("--synthetic", type=int, help="Generate histories for a mod list of this many mods")
+    parser.add_argument("--days", type=float, default=90, help="Days measured, after a warm-up just as long")
+    parser.add_argument("--seed", type=int, default=0, help="Seed for the generated histories and the polling jitter")
+    parser.add_argument("--json", action="store_true", help="Print the results as JSON")
+    args = parser.parse_args()
+
+    end = int(t.time())
+    if args.history:
+        with open(args.history, "r") as history_file:
+            recorded = json.load(history_file)
+        mod_updates = {workshop_id: entry["updates"] if isinstance(entry, dict) else entry for workshop_id, entry in recorded.items()}
+        end         = max((entry["last_checked"] for entry in recorded.values() if isinstance(entry, dict)), default=end)
+    start = end - 2 * args.days * 24 * 60 * 60
+    if args.synthetic:
+        mod_updates = syntheticHistories(args.synthetic, start, end, args.seed)
+
+    results = compareReplay(mod_updates, start, end, seed=args.seed, measure_from=end - args.days * 24 * 60 * 60)
+    if args.json:
+        print(json.dumps({"days": args.days, **results}, indent=4))
+        return
+    printReplay(results, args.days)
+
+if __name__ == "__main__":
+    main()
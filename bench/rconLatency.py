@@ -0,0 +1,74 @@
+#!/usr/bin/env python3
+
+import os
+import sys
+import time as t
+import shutil
+import argparse
+import statistics
+import subprocess as sp
+
+## The modules live in the repository root and the stubs in tests/
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "tests"))
+
+from stubs import fakeRconServer
+from zomboidRcon import zomboidRcon
+
+## Created by https://steamcommunity.com/id/Mr_Pink47/
+## © 2024 - Open Source - Free to share and modify
+
+## README: Measures RCON command latency against a local fake server: the persistent zomboidRcon connection against the old path,
+## which spawned a shell plus a one-shot client (connect, authenticate, send, exit) for every command. gorcon's rcon-cli is used for
+## the old path when it is on PATH; otherwise this script's own --once mode stands in for it.
+##
+##      python3 bench/rconLatency.py --commands 200
+
+def oneShotCommand(port, rcon_command) -> str:
+    ''' Return the shell command the old path ran for one RCON command '''
+    if shutil.which("rcon"):
+        return f"rcon --address 127.0.0.1:{port} --password password {rcon_command}"
+    return f"{sys.executable} {os.path.abspath(__file__)} --once {port} {rcon_command}"
+
+def summary(samples) -> str:
+    ''' Format the median and 99th percentile of a list of seconds '''
+    ordered = sorted(samples)
+    return f"median {statistics.median(ordered) * 1000:8.3f} ms   p99 {ordered[int(len(ordered) * 0.99) - 1] * 1000:8.3f} ms"
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="RCON command latency: persistent connection vs a process per command")
+    parser.add_argument("--commands", type=int, default=200, help="Commands sent on each path")
+    parser.add_argument("--once", nargs=2, metavar=("PORT", "COMMAND"), help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.once:
+        rcon = zomboidRcon("127.0.0.1", args.once[0], "password")
+        rcon.command(args.once[1])
+        rcon.close()
+        return
+
+    server = fakeRconServer(lambda command: "Players connected (0):")
+    port   = server.start()
+    try:
+        rcon        = zomboidRcon("127.0.0.1", port, "password")
+        persistent  = []
+        for index in range(args.commands):
+            started = t.perf_counter()
+            rcon.command("players")
+            persistent.append(t.perf_counter() - started)
+        rcon.close()
+
+        subprocess_path = []
+        for index in range(min(args.commands, 50)):
+            started = t.perf_counter()
+            sp.call(oneShotCommand(port, "players"), shell=True)
+            subprocess_path.append(t.perf_counter() - started)
+
+        print(f"persistent connection ({len(persistent)} commands): {summary(persistent)}")
+        print(f"process per command   ({len(subprocess_path)} commands): {summary(subprocess_path)}")
+        print(f"logins: {server.logins}")
+    finally:
+        server.close()
+
+if __name__ == "__main__":
+    main()
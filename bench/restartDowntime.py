@@ -0,0 +1,129 @@
+#!/usr/bin/env python3
+
+import os
+import sys
+import time as t
+import socket
+import asyncio
+import logging
+import argparse
+import tempfile
+import subprocess as sp
+
+## The modules live in the repository root
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from zomboidRcon import zomboidRcon
+from zomboidReadiness import zomboidReadiness
+
+## Created by https://steamcommunity.com/id/Mr_Pink47/
+## © 2024 - Open Source - Free to share and modify
+
+## README: Measures restart downtime against zomboidSimulation.py's fake server process, for servers that take different times to start
+## The old path slept a fixed 5+5+10s after "quit", 5s in stopServer and 300s after starting, whether or not the server was up; the
+## readiness path waits for the RCON port to close and then for the console marker or an RCON answer. Every duration (the fixed sleeps,
+## the fake server's startup time and the probe interval) is multiplied by --scale so a run takes seconds; results are scaled back.
+## Downtime runs from "quit" until the manager carries on; "early" means the old path carried on before the server was actually up.
+##
+##      python3 bench/restartDowntime.py --startup-seconds 60 120 240 420 --scale 0.01
+
+SIMULATION          = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "zomboidSimulation.py")
+OLD_SHUTDOWN_SLEEPS = 5 + 5 + 10 + 5
+OLD_STARTUP_SLEEP   = 300
+
+def freePort() -> int:
+    ''' Return a local port nothing listens on '''
+    with socket.socket() as probe:
+        probe.bind(("127.0.0.1", 0))
+        return probe.getsockname()[1]
+
+class benchServer():
+    ''' Starts and stops fake server processes on one RCON port '''
+
+    def __init__(self, work_dir, startup_seconds) -> None:
+        ''' Constructor to declare the fake server's files and how long it takes to start '''
+        self.work_dir           = work_dir
+        self.startup_seconds    = startup_seconds
+        self.port               = freePort()
+        self.console_path       = os.path.join(work_dir, "server-console.txt")
+        self.process            = None
+        os.makedirs(os.path.join(work_dir, "world"), exist_ok=True)
+
+    def start(self) -> None:
+        ''' Launch a fake server process '''
+        self.process = sp.Popen([sys.executable, SIMULATION, "fake-server", "--rcon-port", str(self.port), "--password", "bench",
+                                 "--world", os.path.join(self.work_dir, "world"), "--console", self.console_path,
+                                 "--events", os.path.join(self.work_dir, "events.jsonl"), "--startup-seconds", str(self.startup_seconds)])
+
+    def stop(self) -> None:
+        ''' Make sure the fake server process is gone, as stopServer does '''
+        if self.process and self.process.poll() is None:
+            self.process.terminate()
+        if self.process:
+            self.process.wait()
+
+def answers(rcon) -> bool:
+    ''' Report whether the server answers RCON right now '''
+    try:
+        rcon.command("players")
+        return True
+    except Exception:
+        return False
+
+async def oldRestart(server, rcon, scale) -> tuple:
+    ''' Restart with the old fixed sleeps; return the downtime and whether the server was still starting when the sleeps ended '''
+    started = t.perf_counter()
+    rcon.command("quit")
+    await asyncio.sleep(OLD_SHUTDOWN_SLEEPS * scale)
+    server.stop()
+    server.start()
+    await asyncio.sleep(OLD_STARTUP_SLEEP * scale)
+    downtime = t.perf_counter() - started
+    rcon.close()
+    return downtime, not answers(rcon)
+
+async def readinessRestart(server, rcon, readiness, scale) -> tuple:
+    ''' Restart waiting on the readiness probes; return the downtime and whether the wait timed out '''
+    started = t.perf_counter()
+    rcon.command("quit")
+    await readiness.waitUntilStopped(OLD_STARTUP_SLEEP * scale * 10)
+    server.stop()
+    readiness.markStart()
+    server.start()
+    waited = await readiness.waitUntilReady(OLD_STARTUP_SLEEP * scale * 10)
+    return t.perf_counter() - started, waited is None
+
+async def measure(work_dir, startup_seconds, scale) -> dict:
+    ''' Restart a fake server once on each path and return both downtimes, in unscaled seconds '''
+    server      = benchServer(work_dir, startup_seconds * scale)
+    rcon        = zomboidRcon("127.0.0.1", server.port, "bench", timeout=max(1, 100 * scale))
+    readiness   = zomboidReadiness(rcon, server.console_path, poll_interval=scale)
+    readiness.markStart()
+    server.start()
+    try:
+        await readiness.waitUntilReady(startup_seconds * scale * 10)
+        old_downtime, early = await oldRestart(server, rcon, scale)
+        readiness.markStart()
+        await readiness.waitUntilReady(startup_seconds * scale * 10)
+        new_downtime, timed_out = await readinessRestart(server, rcon, readiness, scale)
+    finally:
+        rcon.close()
+        server.stop()
+    return {"old": old_downtime / scale, "early": early, "readiness": new_downtime / scale, "timed_out": timed_out}
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Restart downtime with fixed sleeps vs readiness probes, against a fake server process")
+    parser.add_argument("--startup-seconds", type=float, nargs="+", default=[60, 120, 240, 420], help="How long the fake server takes to start")
+    parser.add_argument("--scale", type=float, default=0.01, help="Factor applied to every duration so a run takes seconds")
+    args = parser.parse_args()
+    logging.disable(logging.CRITICAL)
+
+    print(f"{'startup s':>10} {'old downtime s':>15} {'early':>6} {'readiness downtime s':>21}")
+    with tempfile.TemporaryDirectory(prefix="zomboid_bench_") as work_dir:
+        for startup_seconds in args.startup_seconds:
+            result = asyncio.run(measure(os.path.join(work_dir, f"startup_{startup_seconds:g}"), startup_seconds, args.scale))
+            print(f"{startup_seconds:>10.0f} {result['old']:>15.0f} {'yes' if result['early'] else 'no':>6} "
+                  f"{result['readiness']:>21.0f}{' (timed out)' if result['timed_out'] else ''}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,62 @@
+#!/usr/bin/env python3
+
+import os
+import sys
+import time as t
+import logging
+import argparse
+
+## The modules live in the repository root and the stubs in tests/
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "tests"))
+
+from stubs import stubWorkshop
+from zomboidSoup import zomboidSoup, LOOKUP_FAILED
+
+## Created by https://steamcommunity.com/id/Mr_Pink47/
+## © 2024 - Open Source - Free to share and modify
+
+## README: Measures workshop lookup throughput (mods/sec) for 10, 100 and 500 mods against a local stub workshop
+## Each request waits --latency seconds before it is answered, to stand in for the round trip to Steam. The api backend asks
+## GetPublishedFileDetails in batches; the html backend fetches one page per mod with up to --concurrency requests in flight.
+##
+##      python3 bench/workshopLookups.py --latency 0.05 --runs 3
+
+def lookupRate(base_url, workshop_ids, backend, concurrency, runs) -> float:
+    ''' Return the best mods/sec over a number of runs, checking that every mod was answered '''
+    best = 0
+    for run in range(runs):
+        soup = zomboidSoup(os.devnull, os.devnull, backend=backend, max_concurrency=concurrency, requests_per_second=0, max_retries=0,
+                           workshop_url=f"{base_url}/?id=", steam_api_url=f"{base_url}/api")
+        started     = t.perf_counter()
+        timestamps  = soup.fetchTimestamps(workshop_ids)
+        elapsed     = t.perf_counter() - started
+        failed      = [workshop_id for workshop_id, timestamp in timestamps.items() if timestamp is LOOKUP_FAILED or timestamp is None]
+        if failed:
+            raise RuntimeError(f"{len(failed)} lookups failed on the {backend} backend")
+        best = max(best, len(workshop_ids) / elapsed)
+    return best
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Workshop lookup throughput against a local stub workshop")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10, 100, 500], help="Mod counts to look up")
+    parser.add_argument("--latency", type=float, default=0.05, help="Seconds the stub waits before each answer")
+    parser.add_argument("--concurrency", type=int, default=8, help="Pages in flight at once on the html backend")
+    parser.add_argument("--runs", type=int, default=3, help="Runs per case; the best is reported")
+    args = parser.parse_args()
+    logging.disable(logging.CRITICAL)
+
+    workshop            = stubWorkshop({str(1000 + index): 1700000000 + index for index in range(max(args.sizes))})
+    workshop.latency    = args.latency
+    base_url            = workshop.start()
+    try:
+        print(f"{'mods':>6} {'backend':>8} {'mods/sec':>10}")
+        for size in args.sizes:
+            workshop_ids = list(workshop.time_updated)[:size]
+            for backend in ["api", "html"]:
+                print(f"{size:>6} {backend:>8} {lookupRate(base_url, workshop_ids, backend, args.concurrency, args.runs):>10.1f}")
+    finally:
+        workshop.close()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,58 @@
+#!/usr/bin/env python3
+
+import os
+import sys
+import time as t
+import argparse
+import tracemalloc
+
+## The modules live in the repository root and the stubs in tests/
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "tests"))
+
+from stubs import stubWorkshop
+from zomboidSoup import zomboidSoup
+
+## Created by https://steamcommunity.com/id/Mr_Pink47/
+## © 2024 - Open Source - Free to share and modify
+
+## README: Measures per-page latency and peak memory of each workshop page extractor over updated, never updated and removed pages
+## Pages are padded to --page-kb to stand in for a real workshop page. Each case goes through extractTimestamp, so a page the fast
+## extractors can't answer includes the html5lib fallback it triggers. Peak memory is measured with tracemalloc over one extraction.
+##
+##      python3 bench/workshopParsing.py --page-kb 150 --repeat 50
+
+EXTRACTORS = ["regex", "strainer", "html5lib"]
+
+def measure(soup, page_content, repeat) -> tuple:
+    ''' Return the mean seconds per page and the peak traced bytes of one extraction '''
+    soup.extractTimestamp(page_content)
+    started = t.perf_counter()
+    for run in range(repeat):
+        soup.extractTimestamp(page_content)
+    elapsed = (t.perf_counter() - started) / repeat
+
+    tracemalloc.start()
+    soup.extractTimestamp(page_content)
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return elapsed, peak
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Workshop page extractor latency and peak memory")
+    parser.add_argument("--page-kb", type=int, default=150, help="Size each page is padded to")
+    parser.add_argument("--repeat", type=int, default=50, help="Extractions timed per case")
+    args = parser.parse_args()
+
+    workshop    = stubWorkshop({"1000": 1700000000, "1001": None}, padding=args.page_kb * 1024)
+    pages       = {kind: workshop.page(workshop_id).encode() for kind, workshop_id in [("updated", "1000"), ("never_updated", "1001"), ("removed", "999")]}
+
+    print(f"{'extractor':>10} {'page':>14} {'ms/page':>9} {'peak KiB':>9}")
+    for extractor in EXTRACTORS:
+        soup = zomboidSoup(os.devnull, os.devnull, backend="html", extractor=extractor)
+        for kind, page_content in pages.items():
+            elapsed, peak = measure(soup, page_content, args.repeat)
+            print(f"{extractor:>10} {kind:>14} {elapsed * 1000:>9.2f} {peak / 1024:>9.0f}")
+
+if __name__ == "__main__":
+    main()
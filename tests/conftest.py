@@ -0,0 +1,17 @@
+import os
+import sys
+
+## The modules live in the repository root and the stubs next to the tests
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import pytest
+from stubs import fakeRconServer
+
+@pytest.fixture
+def rcon_server():
+    ''' A fake RCON server on a free local port, answering "" to every command until a test sets respond '''
+    server = fakeRconServer()
+    server.start()
+    yield server
+    server.close()
@@ -0,0 +1,279 @@
+#!/usr/bin/env python3
+
+import os
+import json
+import types
+import asyncio
+import time as t
+import socket
+import struct
+import threading as th
+import datetime as dt
+from urllib.parse import urlsplit, parse_qs
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+## Created by https://steamcommunity.com/id/Mr_Pink47/
+## © 2024 - Open Source - Free to share and modify
+
+## README: Local stand-ins for the Steam workshop and a Zomboid server's RCON port, shared by the tests and the benchmarks in bench/
+## stubWorkshop serves GetPublishedFileDetails and workshop pages from a dict of epochs; any status code can be forced per mod or per batch.
+## fakeRconServer speaks the Source RCON protocol and answers every command through a callback.
+## serverConfig builds one server's settings with every path under a scratch folder, for building a ZomboidServerInstance;
+## recordingInstance builds that instance with its restart steps swapped for ones that only record that they ran.
+
+## Source RCON packet types, as in zomboidRcon.py
+SERVERDATA_AUTH             = 3
+SERVERDATA_AUTH_RESPONSE    = 2
+SERVERDATA_RESPONSE_VALUE   = 0
+
+## Workshop page layouts: an updated mod lists size, posted and updated dates; a never updated mod lists only the first two
+## Each stat sits on its own line as on Steam, which the html5lib extractor relies on
+UPDATED_PAGE        = ('<html><body><div class="detailsStatsContainerRight">\n'
+                       '\t<div class="detailsStatRight">1.234 MB</div>\n\t<div class="detailsStatRight">1 Jan, 2023 @ 9:00am</div>\n'
+                       '\t<div class="detailsStatRight">{updated}</div>\n'
+                       '</div>\n</div></body></html>')
+NEVER_UPDATED_PAGE  = ('<html><body><div class="detailsStatsContainerRight">\n'
+                       '\t<div class="detailsStatRight">1.234 MB</div>\n\t<div class="detailsStatRight">1 Jan, 2023 @ 9:00am</div>\n'
+                       '</div>\n</div></body></html>')
+REMOVED_PAGE        = '<html><body><div class="error_ctn">There was a problem accessing the item.</div></body></html>'
+
+def pageDate(epoch) -> str:
+    ''' Format an epoch the way a workshop page shows it '''
+    return dt.datetime.fromtimestamp(epoch).strftime("%d %b, %Y @ %I:%M%p")
+
+class stubWorkshop():
+    ''' A local workshop: POST answers GetPublishedFileDetails, GET ?id= answers a workshop page with an ETag '''
+
+    def __init__(self, time_updated=None, padding=0) -> None:
+        ''' Constructor to declare every mod's epoch (None for a mod that was never updated) and the bytes of filler added to each page '''
+        self.time_updated   = dict(time_updated or {})
+        self.padding        = padding
+        self.api_status     = {} # {batch number: status} to fail chosen batches
+        self.page_status    = {} # {workshop_id: status} to fail chosen pages
+        self.retry_after    = None
+        self.latency        = 0  # Seconds every request waits before it is answered, to stand in for the round trip to Steam
+        self.api_batches    = []
+        self.page_requests  = []
+        self.not_modified   = 0
+        self.lock           = th.Lock()
+        self.httpd          = None
+
+    def page(self, workshop_id) -> str:
+        ''' Return the workshop page body for one mod '''
+        if workshop_id not in self.time_updated:
+            return REMOVED_PAGE
+        epoch = self.time_updated[workshop_id]
+        body  = NEVER_UPDATED_PAGE if epoch is None else UPDATED_PAGE.format(updated=pageDate(epoch))
+        return body.replace("<body>", "<body>" + "<!-- filler -->" * (self.padding // 15))
+
+    def start(self) -> str:
+        ''' Start serving on a free local port and return the base URL '''
+        workshop = self
+
+        class stubHandler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def reply(self, status, body=b"", headers=None):
+                if workshop.latency:
+                    t.sleep(workshop.latency)
+                self.send_response(status)
+                for key, value in (headers or {}).items():
+                    self.send_header(key, value)
+                if status == 429 and workshop.retry_after is not None:
+                    self.send_header("Retry-After", str(workshop.retry_after))
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def do_POST(self):
+                form = parse_qs(self.rfile.read(int(self.headers.get("Content-Length", 0))).decode("utf-8"))
+                ids  = [form[f"publishedfileids[{index}]"][0] for index in range(int(form["itemcount"][0]))]
+                with workshop.lock:
+                    batch = len(workshop.api_batches)
+                    workshop.api_batches.append(ids)
+                    status = workshop.api_status.get(batch, 200)
+                    details = [{"publishedfileid": workshop_id, "result": 1, "time_updated": workshop.time_updated[workshop_id]}
+                               if workshop.time_updated.get(workshop_id) else {"publishedfileid": workshop_id, "result": 9} for workshop_id in ids]
+                if status != 200:
+                    return self.reply(status)
+                self.reply(200, json.dumps({"response": {"result": 1, "resultcount": len(details), "publishedfiledetails": details}}).encode(),
+                           {"Content-Type": "application/json"})
+
+            def do_GET(self):
+                workshop_id = parse_qs(urlsplit(self.path).query).get("id", [""])[0]
+                with workshop.lock:
+                    workshop.page_requests.append(workshop_id)
+                    status  = workshop.page_status.get(workshop_id, 200)
+                    body    = workshop.page(workshop_id).encode()
+                    etag    = f'"{workshop.time_updated.get(workshop_id)}-{len(body)}"'
+                    if status == 200 and self.headers.get("If-None-Match") == etag:
+                        workshop.not_modified += 1
+                        status = 304
+                if status == 304:
+                    return self.reply(304, headers={"ETag": etag})
+                if status != 200:
+                    return self.reply(status)
+                self.reply(200, body, {"Content-Type": "text/html", "ETag": etag})
+
+            def log_message(self, format, *args):
+                pass
+
+        self.httpd = ThreadingHTTPServer(("127.0.0.1", 0), stubHandler)
+        self.httpd.daemon_threads = True
+        th.Thread(target=self.httpd.serve_forever, daemon=True).start()
+        return f"http://127.0.0.1:{self.httpd.server_address[1]}"
+
+    def close(self) -> None:
+        ''' Stop the HTTP server '''
+        if self.httpd:
+            self.httpd.shutdown()
+            self.httpd.server_close()
+
+class fakeRconServer():
+    ''' A local RCON server answering each command with respond(command); respond may return None to drop the connection instead '''
+
+    def __init__(self, respond=None, password="password") -> None:
+        ''' Constructor to declare the responder and the password it accepts '''
+        self.respond    = respond or (lambda command: "")
+        self.password   = password
+        self.commands       = []
+        self.logins         = 0
+        self.listener       = None
+        self.port           = None
+        self.running        = False
+        self.connections    = []
+        self.lock           = th.Lock()
+
+    def sendPacket(self, conn, request_id, packet_type, body) -> None:
+        ''' Send one RCON packet '''
+        payload = struct.pack("<ii", request_id, packet_type) + body.encode("utf-8") + b"\x00\x00"
+        conn.sendall(struct.pack("<i", len(payload)) + payload)
+
+    def receivePacket(self, conn):
+        ''' Read one RCON packet, or return None once the client has closed the connection '''
+        data = b""
+        while len(data) < 4:
+            chunk = conn.recv(4 - len(data))
+            if not chunk:
+                return None
+            data += chunk
+        (size,) = struct.unpack("<i", data)
+        payload = b""
+        while len(payload) < size:
+            chunk = conn.recv(size - len(payload))
+            if not chunk:
+                return None
+            payload += chunk
+        request_id, packet_type = struct.unpack("<ii", payload[:8])
+        return request_id, packet_type, payload[8:].rstrip(b"\x00").decode("utf-8", "replace")
+
+    def serve(self, conn) -> None:
+        ''' Serve one client connection '''
+        with conn:
+            while self.running:
+                try:
+                    packet = self.receivePacket(conn)
+                except OSError:
+                    return
+                if packet is None:
+                    return
+                request_id, packet_type, body = packet
+                if packet_type == SERVERDATA_AUTH:
+                    self.logins += 1
+                    self.sendPacket(conn, request_id if body == self.password else -1, SERVERDATA_AUTH_RESPONSE, "")
+                    continue
+                self.commands.append(body)
+                response = self.respond(body)
+                if response is None:
+                    return
+                self.sendPacket(conn, request_id, SERVERDATA_RESPONSE_VALUE, response)
+
+    def accept(self) -> None:
+        ''' Accept connections until closed '''
+        while self.running:
+            try:
+                conn, address = self.listener.accept()
+            except OSError:
+                return
+            with self.lock:
+                self.connections.append(conn)
+            th.Thread(target=self.serve, args=(conn,), daemon=True).start()
+
+    def start(self, port=0) -> int:
+        ''' Start listening on port (a free local port by default) and return the port '''
+        self.listener = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        self.listener.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+        self.listener.bind(("127.0.0.1", port))
+        self.listener.listen()
+        self.port       = self.listener.getsockname()[1]
+        self.running    = True
+        th.Thread(target=self.accept, daemon=True).start()
+        return self.port
+
+    def dropConnections(self) -> None:
+        ''' Close every open client connection from the server side, as a restarted server would '''
+        with self.lock:
+            connections, self.connections = self.connections, []
+        for conn in connections:
+            try:
+                conn.shutdown(socket.SHUT_RDWR)
+            except OSError:
+                pass
+
+    def close(self) -> None:
+        ''' Stop accepting connections '''
+        self.running = False
+        if self.listener:
+            self.listener.close()
+        self.dropConnections()
+
+def serverConfig(root, rcon_port, **overrides) -> dict:
+    ''' Return one server's settings with every path under root and RCON pointed at rcon_port '''
+    root = str(root)
+    os.makedirs(os.path.join(root, "world"), exist_ok=True)
+    os.makedirs(os.path.join(root, "backups"), exist_ok=True)
+    config = {
+        "name"                          : "servertest",
+        "start_server_command"          : "true",
+        "server_ini_path"               : os.path.join(root, "servertest.ini"),
+        "mod_state_path"                : os.path.join(root, "mod_state.jsonl"),
+        "backup_folder_path"            : os.path.join(root, "backups"),
+        "world_dict_path"               : os.path.join(root, "world"),
+        "server_binary_process_name"    : "ProjectZomboid64",
+        "server_pidfile_path"           : os.path.join(root, "zomboid_server.pid"),
+        "server_console_path"           : os.path.join(root, "server-console.txt"),
+        "log_index_path"                : os.path.join(root, "zomboid_logs.db"),
+        "rcon_local_ip"                 : "127.0.0.1",
+        "rcon_local_port"               : rcon_port,
+        "rcon_password"                 : "password",
+        "rcon_timeout"                  : 2,
+        "restart_interval_hours"        : 4,
+        "shutdown_timeout"              : 1,
+        "save_timeout"                  : 1,
+        "reboot_enabled"                : False,
+        "reboot_threshold"              : 3,
+    }
+    config.update(overrides)
+    return config
+
+def recordingInstance(root, rcon_port, **overrides):
+    ''' Build a server instance whose save (still sent over RCON), backup, stop, start and wait for the server to stop only record that they ran; returns (instance, steps) '''
+    ## Imported here, so the benchmarks and zomboidSimulation.py's fake server don't load the manager just for the stand-ins
+    from zomboid_server_manager import ZomboidServerInstance
+    instance    = ZomboidServerInstance(serverConfig(root, rcon_port, **overrides), types.SimpleNamespace(diskLock=lambda path: asyncio.Lock()))
+    steps       = []
+
+    async def record(name, result=None):
+        steps.append(name)
+        return result
+
+    async def saveWorld():
+        steps.append("save")
+        await asyncio.to_thread(instance.rcon.command, "save")
+
+    instance.saveWorld                  = saveWorld
+    instance.backupWorldTask            = lambda server_status: record(f"backup {server_status}")
+    instance.stopServer                 = lambda: record("stop")
+    instance.startServer                = lambda: record("start", 1)
+    instance.readiness.waitUntilStopped = lambda timeout: record("wait")
+    return instance, steps
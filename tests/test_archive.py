@@ -0,0 +1,101 @@
+import os
+import sqlite3
+import random
+import subprocess as sp
+import datetime as dt
+import pytest
+from zomboidBackup import zomboidBackup, backupCatalog, expiredBackups
+
+BLOCK_SIZE = 16 * 1024
+
+@pytest.fixture
+def world(tmp_path):
+    ## Incompressible chunks a few blocks long each, so files straddle block boundaries
+    rng         = random.Random(47)
+    world_path  = tmp_path / "servertest"
+    (world_path / "map").mkdir(parents=True)
+    for index in range(12):
+        (world_path / "map" / f"map_0_{index}.bin").write_bytes(rng.randbytes(20000 + index * 1000))
+    (world_path / "players.db").write_bytes(b"players" * 1000)
+    return world_path
+
+@pytest.fixture
+def backup(world, tmp_path):
+    backup = zomboidBackup(str(world), str(tmp_path / "backups"), workers=2, block_size=BLOCK_SIZE)
+    yield backup
+    backup.finish(10)
+
+def worldFiles(world) -> dict:
+    return {str(path.relative_to(world.parent)): path.read_bytes() for path in world.rglob("*") if path.is_file()}
+
+def test_archive_is_a_normal_tgz(world, backup, tmp_path):
+    stats = backup.archive("restart")
+    assert stats["files"] == 13 and stats["bytes_out"] == os.path.getsize(stats["path"])
+
+    listed = sp.run(["tar", "-tzf", stats["path"]], capture_output=True, text=True, check=True).stdout.split()
+    assert sorted(listed) == sorted(worldFiles(world))
+    (tmp_path / "extracted").mkdir()
+    sp.run(["tar", "-xzf", stats["path"], "-C", str(tmp_path / "extracted")], check=True)
+    assert worldFiles(tmp_path / "extracted" / "servertest") == worldFiles(world)
+
+def test_one_file_is_restored_from_its_own_blocks(world, backup, tmp_path):
+    archive_path                    = backup.archive("restart")["path"]
+    codec, start, end, blocks       = backupCatalog(backup.catalog_path).lookup(archive_path, "map/map_0_6.bin")
+    with sqlite3.connect(backup.catalog_path) as catalog:
+        (total_blocks,)             = catalog.execute("SELECT COUNT(*) FROM blocks").fetchone()
+    assert 1 < len(blocks) < total_blocks
+
+    restored = backup.restoreFile(archive_path, "map/map_0_6.bin", str(tmp_path / "restored"))
+    assert restored == str(tmp_path / "restored" / "servertest" / "map" / "map_0_6.bin")
+    assert (tmp_path / "restored" / "servertest" / "map" / "map_0_6.bin").read_bytes() == (world / "map" / "map_0_6.bin").read_bytes()
+    assert os.listdir(tmp_path / "restored" / "servertest" / "map") == ["map_0_6.bin"]
+
+def test_file_missing_from_the_catalog_is_reported(backup, tmp_path):
+    archive_path = backup.archive("restart")["path"]
+    with pytest.raises(FileNotFoundError):
+        backup.restoreFile(archive_path, "map/map_9_9.bin", str(tmp_path / "restored"))
+
+def test_verify_catches_a_corrupted_block(backup):
+    archive_path = backup.archive("quit")["path"]
+    assert backup.finish(10)
+    assert backup.verify(archive_path)
+
+    ## Flip bytes in the middle of the third compressed block
+    with sqlite3.connect(backup.catalog_path) as catalog:
+        comp_offset, comp_size = catalog.execute("SELECT comp_offset, comp_size FROM blocks WHERE block_index = 2").fetchone()
+    with open(archive_path, "r+b") as archive:
+        archive.seek(comp_offset + comp_size // 2)
+        data = archive.read(16)
+        archive.seek(comp_offset + comp_size // 2)
+        archive.write(bytes(byte ^ 0xFF for byte in data))
+    assert not backup.verify(archive_path)
+
+def test_retention_keeps_the_newest_backup_of_each_period():
+    ## Hourly backups over three weeks starting on a Monday, plus one more at half past ten on the last night
+    start   = dt.datetime(2026, 1, 5)
+    backups = [(start + dt.timedelta(hours=hour), f"backup_{hour}") for hour in range(21 * 24)]
+    backups.append((dt.datetime(2026, 1, 25, 22, 30), "backup_22_30"))
+
+    expired = expiredBackups(backups, {"hourly": 3, "daily": 2, "weekly": 2, "yearly": 1})
+    kept    = sorted(created for created, _ in set(backups) - set(expired))
+    assert kept == [
+        dt.datetime(2026, 1, 18, 23),       ## newest of the week before
+        dt.datetime(2026, 1, 24, 23),       ## newest of the day before
+        dt.datetime(2026, 1, 25, 21),       ## the three newest hours; the 22:00 hour keeps 22:30
+        dt.datetime(2026, 1, 25, 22, 30),
+        dt.datetime(2026, 1, 25, 23),
+    ]
+    assert len(expired) == len(backups) - 5
+
+def test_prune_removes_expired_archives_and_their_catalog_rows(backup):
+    backup.retention    = {"daily": 1}
+    old_path            = backup.archive("restart")["path"]
+    assert backup.finish(10)
+    with sqlite3.connect(backup.catalog_path) as catalog:
+        catalog.execute("UPDATE backups SET created = ? WHERE path = ?", ((dt.datetime.now() - dt.timedelta(days=3)).isoformat(), old_path))
+    new_path = backup.archive("quit")["path"]
+    assert backup.finish(10)
+
+    assert not os.path.exists(old_path) and not os.path.exists(old_path + ".sha256.json")
+    assert os.path.exists(new_path) and backup.verify(new_path)
+    assert [path for _, path in backupCatalog(backup.catalog_path).backups()] == [new_path]
@@ -0,0 +1,128 @@
+import os
+import json
+import time
+import types
+import asyncio
+import tarfile
+import threading as th
+import pytest
+from zomboidBackup import zomboidBackup
+from zomboid_server_manager import ZomboidServerController
+
+@pytest.fixture
+def world(tmp_path):
+    world_path = tmp_path / "servertest"
+    (world_path / "chunkdata").mkdir(parents=True)
+    for index in range(20):
+        (world_path / f"map_0_{index}.bin").write_bytes(bytes([index]) * 4096)
+    (world_path / "chunkdata" / "chunkdata_0_0.bin").write_bytes(b"chunk" * 100)
+    (world_path / "players.db").write_bytes(b"players")
+    return world_path
+
+def storedObjects(backup) -> int:
+    return sum(len(names) for _, _, names in os.walk(backup.objects_path))
+
+def test_snapshot_restores_the_world(world, tmp_path):
+    backup          = zomboidBackup(str(world), str(tmp_path / "backups"))
+    manifest_path   = backup.snapshot("restart")["path"]
+    backup.restore(manifest_path, str(tmp_path / "restored"))
+    for path in world.rglob("*"):
+        if path.is_file():
+            assert (tmp_path / "restored" / path.relative_to(world)).read_bytes() == path.read_bytes()
+
+def test_snapshot_only_stores_changed_files(world, tmp_path):
+    backup = zomboidBackup(str(world), str(tmp_path / "backups"))
+    backup.snapshot("restart")
+    objects = storedObjects(backup)
+
+    (world / "map_0_3.bin").write_bytes(b"changed" * 100)
+    with open(backup.snapshot("quit")["path"]) as manifest:
+        files = json.load(manifest)["files"]
+    assert storedObjects(backup) == objects + 1
+    assert len(files) == 22
+
+def test_identical_files_are_stored_once(world, tmp_path):
+    (world / "map_1_0.bin").write_bytes((world / "map_0_1.bin").read_bytes())
+    backup = zomboidBackup(str(world), str(tmp_path / "backups"))
+    backup.snapshot("restart")
+    assert storedObjects(backup) == 22
+
+def test_pruning_waits_for_a_running_snapshot(world, tmp_path):
+    backup = zomboidBackup(str(world), str(tmp_path / "backups"), retention={"hourly": 1})
+    old_manifest = backup.snapshot("restart")["path"]
+    os.utime(old_manifest, (time.time() - 3 * 24 * 60 * 60, time.time() - 3 * 24 * 60 * 60))
+    for path in world.rglob("*.bin"):
+        path.write_bytes(path.read_bytes() + b"changed")
+
+    ## Prune while the snapshot is storing objects that no manifest lists yet
+    store_object    = backup.storeObject
+    pruner          = th.Thread(target=backup.prune)
+    def storeAndPrune(file_path):
+        file_hash = store_object(file_path)
+        if not pruner.ident:
+            pruner.start()
+            pruner.join(0.2)
+        return file_hash
+    backup.storeObject = storeAndPrune
+
+    manifest_path = backup.snapshot("quit")["path"]
+    pruner.join()
+    assert not os.path.exists(old_manifest)
+    backup.restore(manifest_path, str(tmp_path / "restored"))
+    assert (tmp_path / "restored" / "map_0_0.bin").read_bytes() == (world / "map_0_0.bin").read_bytes()
+
+def leftovers(backup_path) -> list:
+    return [path.name for path in backup_path.rglob("*.tmp")]
+
+def test_failed_archive_leaves_no_temp_file(world, tmp_path, monkeypatch):
+    def diskFull(self, tarinfo, fileobj=None):
+        raise OSError(28, "No space left on device")
+    monkeypatch.setattr(tarfile.TarFile, "addfile", diskFull)
+    backup = zomboidBackup(str(world), str(tmp_path / "backups"), workers=1)
+    with pytest.raises(OSError):
+        backup.archive("restart")
+    assert leftovers(tmp_path / "backups") == []
+    assert not list((tmp_path / "backups").glob("*.tgz"))
+
+def test_finish_waits_for_the_checksum_pass(world, tmp_path):
+    backup          = zomboidBackup(str(world), str(tmp_path / "backups"), workers=1)
+    write_checksums = backup.writeChecksums
+    def slowChecksums(archive_path, members):
+        time.sleep(0.5)
+        return write_checksums(archive_path, members)
+    backup.writeChecksums = slowChecksums
+
+    archive_path = backup.archive("quit")["path"]
+    assert not os.path.exists(archive_path + ".sha256.json")
+    assert not any(thread.daemon for thread in backup.background)
+    assert backup.finish(5)
+    assert backup.verify(archive_path)
+
+def test_failed_checksum_write_leaves_no_temp_file(world, tmp_path, monkeypatch):
+    backup = zomboidBackup(str(world), str(tmp_path / "backups"), workers=1)
+    def interrupted(checksums, manifest):
+        manifest.write('{"servertest/map_0_0.bin": ')
+        raise OSError(28, "No space left on device")
+    monkeypatch.setattr(json, "dump", interrupted)
+    archive_path = backup.archive("quit")["path"]
+    assert backup.finish(5)
+    assert leftovers(tmp_path / "backups") == []
+    assert not os.path.exists(archive_path + ".sha256.json")
+
+def test_shutdown_waits_for_background_backup_work(tmp_path):
+    finished = []
+    async def quit(cmd_flag):
+        pass
+    def finish():
+        time.sleep(0.2)
+        finished.append(True)
+    instance    = types.SimpleNamespace(serverMessenger=quit, world_backup=types.SimpleNamespace(finish=finish))
+    controller  = types.SimpleNamespace(instances=[instance], metrics_dump_path=None, metrics_server=types.SimpleNamespace(close=lambda: None))
+
+    async def shutdown():
+        controller.stopped = asyncio.Event()
+        await ZomboidServerController.shutdown(controller)
+        return controller.stopped.is_set()
+
+    assert asyncio.run(shutdown())
+    assert finished == [True]
@@ -0,0 +1,110 @@
+import types
+import asyncio
+import datetime as dt
+import pytest
+from zomboidConfig import cachedConfigFile, serverIni
+from zomboidScheduler import zomboidScheduler, virtualEventLoop
+from zomboid_server_manager import ZomboidServerController
+
+def test_config_file_needs_a_parser(tmp_path):
+    with pytest.raises(TypeError):
+        cachedConfigFile(str(tmp_path / "settings.txt"))
+
+def test_ini_is_parsed_again_only_after_it_changes(tmp_path):
+    ini_path = tmp_path / "servertest.ini"
+    ini_path.write_text("WorkshopItems=1;2\nMaxPlayers=16\n")
+    ini = serverIni(str(ini_path))
+    assert ini.reload()["added"] == {"WorkshopItems": ["1", "2"], "MaxPlayers": 16}
+    assert ini.reload() is None
+
+    ini_path.write_text("WorkshopItems=1;2;3\nMaxPlayers=16\n")
+    assert ini.reload()["changed"] == {"WorkshopItems": (["1", "2"], ["1", "2", "3"])}
+
+def test_only_numeric_settings_become_numbers(tmp_path):
+    ini_path = tmp_path / "servertest.ini"
+    ini_path.write_text("Password=0123\nRCONPassword=42\nPublicName=007\nRCONPort=27015\nMinutesPerPage=1.5\nPVP=true\nMaxPlayers=lots\n")
+    assert serverIni(str(ini_path)).load() == {"Password": "0123", "RCONPassword": "42", "PublicName": "007", "RCONPort": 27015,
+                                               "MinutesPerPage": 1.5, "PVP": True, "MaxPlayers": "lots"}
+
+class fakeInstance():
+    ''' A server instance recording what reloadConfig does with it '''
+
+    def __init__(self, name) -> None:
+        self.name               = name
+        self.scheduler          = zomboidScheduler()
+        self.calls              = []
+        self.timers_at_quit     = None
+        self.running_at_quit    = None
+
+    def applyConfig(self, server_config) -> None:
+        self.calls.append("applyConfig")
+
+    async def reloadServerIni(self) -> None:
+        self.calls.append("reloadServerIni")
+
+    async def restart(self) -> None:
+        ''' Stop the server, then take a while to start it again '''
+        self.calls.append("stop")
+        try:
+            await asyncio.sleep(60)
+        except asyncio.CancelledError:
+            self.calls.append("restart cancelled")
+            raise
+        self.calls.append("start")
+
+    async def serverMessenger(self, cmd_flag) -> None:
+        self.timers_at_quit     = list(self.scheduler.jobs)
+        self.running_at_quit    = [task for task in self.scheduler.running if task is not asyncio.current_task()]
+        self.calls.append(cmd_flag)
+
+def keepOnly(instances, name):
+    ''' Return a controller whose server_config.json now lists only the server called name '''
+    shared      = {"server_ini_path": "/srv/Zomboid/Server/servertest.ini", "backup_folder_path": "/srv/Zomboid/backups",
+                   "mod_state_path": "/srv/Zomboid/Server/zomboid_mod_state.jsonl"}
+    settings    = {"server_config": shared, "servers": [{"name": name}]}
+    controller  = types.SimpleNamespace(
+        config_file         = types.SimpleNamespace(reload=lambda: {"changed": {}}, settings=settings),
+        current_time        = dt.datetime,
+        instances           = list(instances),
+        mod_check_interval  = 30 * 60,
+        loadPollSettings    = lambda server_config: None,
+        workshopLookup      = lambda server_config: None,
+    )
+    controller.instanceConfigs = lambda config_data: ZomboidServerController.instanceConfigs(controller, config_data)
+    return controller
+
+def test_removed_server_stops_its_jobs_before_quitting():
+    survivors, hardcore = fakeInstance("survivors"), fakeInstance("hardcore")
+    controller          = keepOnly([survivors, hardcore], "survivors")
+
+    async def reload():
+        async def noop():
+            pass
+        restart = hardcore.scheduler.every(3600, noop)
+        await ZomboidServerController.reloadConfig(controller)
+        await asyncio.gather(*hardcore.scheduler.running)
+        return restart
+
+    restart = asyncio.run(reload())
+    assert controller.instances == [survivors]
+    assert survivors.calls == ["applyConfig", "reloadServerIni"]
+    assert hardcore.calls == ["quit"]
+    assert hardcore.timers_at_quit == [] and restart.cancelled()
+
+def test_server_removed_mid_restart_is_not_started_again():
+    survivors, hardcore = fakeInstance("survivors"), fakeInstance("hardcore")
+    controller          = keepOnly([survivors, hardcore], "survivors")
+
+    async def reload():
+        hardcore.scheduler.spawn(hardcore.restart())
+        await asyncio.sleep(1)
+        await ZomboidServerController.reloadConfig(controller)
+        await asyncio.gather(*hardcore.scheduler.running)
+        await asyncio.sleep(120)
+
+    ## On the virtual clock, so the restart's minute-long start takes no real time
+    loop = virtualEventLoop()
+    loop.run_until_complete(reload())
+    loop.close()
+    assert hardcore.calls == ["stop", "restart cancelled", "quit"]
+    assert hardcore.running_at_quit == []
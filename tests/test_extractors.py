@@ -0,0 +1,31 @@
+import pytest
+from stubs import stubWorkshop, pageDate
+from zomboidSoup import zomboidSoup
+
+EXTRACTORS = ["regex", "strainer", "html5lib"]
+
+@pytest.fixture
+def pages():
+    workshop = stubWorkshop({"1000": 1700000000, "1001": None}, padding=20000)
+    return {kind: workshop.page(workshop_id).encode() for kind, workshop_id in [("updated", "1000"), ("never_updated", "1001"), ("removed", "999")]}
+
+def makeSoup(tmp_path, extractor):
+    return zomboidSoup(str(tmp_path / "servertest.ini"), str(tmp_path / "mod_state.jsonl"), backend="html", extractor=extractor)
+
+@pytest.mark.parametrize("extractor", EXTRACTORS)
+def test_extractors_agree(tmp_path, pages, extractor):
+    soup = makeSoup(tmp_path, extractor)
+    assert soup.extractTimestamp(pages["updated"]) == pageDate(1700000000).replace("@", "").replace("  ", " ")
+    assert soup.extractTimestamp(pages["never_updated"]) is None
+    assert soup.extractTimestamp(pages["removed"]) is None
+
+@pytest.mark.parametrize("extractor", ["regex", "strainer"])
+def test_only_a_missing_container_falls_back_to_the_full_parse(tmp_path, pages, monkeypatch, extractor):
+    soup        = makeSoup(tmp_path, extractor)
+    full_parses = []
+    monkeypatch.setattr(soup, "extractTimestampFull", lambda page_content: full_parses.append(page_content))
+    soup.extractTimestamp(pages["updated"])
+    soup.extractTimestamp(pages["never_updated"])
+    assert full_parses == []
+    soup.extractTimestamp(pages["removed"])
+    assert full_parses == [pages["removed"]]
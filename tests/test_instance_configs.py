@@ -0,0 +1,36 @@
+import types
+import datetime as dt
+from zomboid_server_manager import ZomboidServerController
+
+SHARED = {"server_ini_path": "/srv/Zomboid/Server/servertest.ini", "backup_folder_path": "/srv/Zomboid/backups",
+          "mod_state_path": "/srv/Zomboid/Server/zomboid_mod_state.jsonl", "workshop_cache_path": "/srv/Zomboid/Server/zomboid_workshop_cache.json"}
+
+def instanceConfigs(config_data) -> list:
+    return ZomboidServerController.instanceConfigs(types.SimpleNamespace(current_time=dt.datetime), config_data)
+
+def test_each_server_gets_its_own_backups_and_cache():
+    survivors, hardcore = instanceConfigs({"server_config": SHARED, "servers": [{"name": "survivors"}, {"name": "hardcore"}]})
+    assert survivors["backup_folder_path"] == "/srv/Zomboid/backups/survivors"
+    assert hardcore["backup_folder_path"] == "/srv/Zomboid/backups/hardcore"
+    assert survivors["workshop_cache_path"] == "/srv/Zomboid/Server/zomboid_workshop_cache_survivors.json"
+    assert hardcore["mod_state_path"] == "/srv/Zomboid/Server/zomboid_mod_state_hardcore.jsonl"
+
+def test_settings_a_server_sets_itself_are_kept():
+    (survivors,) = instanceConfigs({"server_config": SHARED, "servers": [{"name": "survivors", "backup_folder_path": "/mnt/backups"}]})
+    assert survivors["backup_folder_path"] == "/mnt/backups"
+
+def test_unset_cache_stays_unset():
+    shared = {key: value for key, value in SHARED.items() if key != "workshop_cache_path"}
+    (survivors,) = instanceConfigs({"server_config": shared, "servers": [{"name": "survivors"}]})
+    assert "workshop_cache_path" not in survivors
+
+def test_single_server_keeps_the_shared_paths():
+    (server,) = instanceConfigs({"server_config": SHARED})
+    assert server["name"] == "servertest"
+    assert server["backup_folder_path"] == "/srv/Zomboid/backups"
+    assert server["workshop_cache_path"] == SHARED["workshop_cache_path"]
+
+def test_shared_backup_folder_is_reported(capsys):
+    instanceConfigs({"server_config": SHARED, "servers": [{"name": "survivors", "backup_folder_path": "/mnt/backups"},
+                                                          {"name": "hardcore", "backup_folder_path": "/mnt/backups/"}]})
+    assert "Several servers back up to /mnt/backups" in capsys.readouterr().out
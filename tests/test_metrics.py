@@ -0,0 +1,52 @@
+import types
+import asyncio
+import urllib.request
+import urllib.error
+import pytest
+from stubs import serverConfig
+from zomboidMetrics import METRICS, metricsServer, BACKUP_BYTES, BACKUP_SECONDS, RESTART_FAILURES
+from zomboid_server_manager import ZomboidServerInstance
+
+@pytest.fixture
+def metrics_url():
+    server = metricsServer(METRICS, port=0)
+    port   = server.start()
+    yield f"http://127.0.0.1:{port}"
+    server.close()
+
+def fetch(url) -> tuple:
+    with urllib.request.urlopen(url, timeout=5) as response:
+        return response.headers["Content-Type"], response.read().decode("utf-8")
+
+def test_metrics_endpoint_serves_the_exposition(metrics_url):
+    RESTART_FAILURES.inc(server="metrics-test")
+    RESTART_FAILURES.inc(server="metrics-test")
+    BACKUP_SECONDS.observe(0.3, server="metrics-test", mode="tar")
+    BACKUP_SECONDS.observe(42, server="metrics-test", mode="tar")
+
+    content_type, body = fetch(f"{metrics_url}/metrics")
+    lines = body.splitlines()
+    assert content_type.startswith("text/plain; version=0.0.4")
+    assert "# TYPE zomboid_restart_failures_total counter" in lines
+    assert 'zomboid_restart_failures_total{server="metrics-test"} 2' in lines
+    assert "# TYPE zomboid_backup_seconds histogram" in lines
+    assert 'zomboid_backup_seconds_bucket{server="metrics-test",mode="tar",le="0.5"} 1' in lines
+    assert 'zomboid_backup_seconds_bucket{server="metrics-test",mode="tar",le="60.0"} 2' in lines
+    assert 'zomboid_backup_seconds_bucket{server="metrics-test",mode="tar",le="+Inf"} 2' in lines
+    assert 'zomboid_backup_seconds_sum{server="metrics-test",mode="tar"} 42.3' in lines
+    assert 'zomboid_backup_seconds_count{server="metrics-test",mode="tar"} 2' in lines
+
+def test_other_paths_are_not_found(metrics_url):
+    with pytest.raises(urllib.error.HTTPError) as error:
+        fetch(f"{metrics_url}/other")
+    assert error.value.code == 404
+
+def test_snapshot_backups_record_bytes_read(tmp_path):
+    config      = serverConfig(tmp_path, 0, name="metrics-snapshot", backup_mode="snapshot")
+    instance    = ZomboidServerInstance(config, types.SimpleNamespace(diskLock=lambda path: asyncio.Lock()))
+    (tmp_path / "world" / "map_0_0.bin").write_bytes(b"x" * 5000)
+    instance.backupWorld("restart")
+
+    (series,) = [series for series in BACKUP_BYTES.snapshot() if series["labels"]["server"] == "metrics-snapshot"]
+    assert series["labels"]["mode"] == "snapshot"
+    assert series["count"] == 1 and series["sum"] == 5000
@@ -0,0 +1,86 @@
+import pytest
+from zomboidModPolling import modUpdateHistory, modPollScheduler
+
+DAY = 24 * 60 * 60
+
+def makeScheduler(**overrides) -> modPollScheduler:
+    ''' A scheduler without jitter, so next lookup times are exact '''
+    return modPollScheduler(modUpdateHistory(), **{"jitter": 0, "seed": 47, **overrides})
+
+def nextInterval(scheduler, workshop_id, now) -> float:
+    return scheduler.history.mods[workshop_id]["next_check"] - now
+
+def test_due_mods_most_overdue_first_and_priority_before_them():
+    scheduler = makeScheduler()
+    scheduler.history.mods = {
+        "soon"      : {"next_check": 500},
+        "overdue"   : {"next_check": 100},
+        "later"     : {"next_check": 2000},
+    }
+    ## A mod never looked up counts as the most overdue
+    assert scheduler.dueMods(["soon", "overdue", "later", "new"], 1000) == ["new", "overdue", "soon"]
+    assert scheduler.dueMods(["soon", "overdue", "later", "new"], 1000, priority_ids=["later", "soon"]) == ["soon", "later", "new", "overdue"]
+
+def test_sweep_looks_every_mod_up():
+    scheduler = makeScheduler(adaptive=False)
+    scheduler.history.mods = {"later": {"next_check": 2000}}
+    assert scheduler.dueMods(["later", "new"], 1000) == ["later", "new"]
+
+def test_dormant_mod_is_looked_up_less_and_less_often():
+    ## Decayed observation time levels off at the half-life scale, so a high enough change_probability reaches the cap
+    scheduler   = makeScheduler(change_probability=0.2, max_interval=2 * DAY)
+    intervals   = []
+    for day in [0, 1, 7, 30, 120]:
+        assert scheduler.observe({"dormant": "1000"}, day * DAY) == []
+        intervals.append(nextInterval(scheduler, "dormant", day * DAY))
+    assert intervals == sorted(intervals) and intervals[3] > 4 * intervals[0]
+    assert intervals[-1] == 2 * DAY
+
+def test_new_mod_is_looked_up_on_every_check():
+    scheduler = makeScheduler()
+    scheduler.observe({"new": "1000"}, 0)
+    assert nextInterval(scheduler, "new", 0) == scheduler.min_interval
+
+def test_update_brings_the_mod_back_to_every_check():
+    scheduler = makeScheduler()
+    scheduler.observe({"mod": "1000"}, 0)
+    scheduler.observe({"mod": "1000"}, 30 * DAY)
+    assert nextInterval(scheduler, "mod", 30 * DAY) > scheduler.min_interval
+
+    assert scheduler.observe({"mod": str(31 * DAY - 600)}, 31 * DAY) == ["mod"]
+    assert scheduler.history.mods["mod"]["updates"] == [31 * DAY - 600]
+    assert nextInterval(scheduler, "mod", 31 * DAY) == scheduler.min_interval
+    ## Once the recent window has passed, the interval grows again
+    scheduler.observe({"mod": str(31 * DAY - 600)}, 33 * DAY)
+    assert nextInterval(scheduler, "mod", 33 * DAY) > scheduler.min_interval
+
+def test_often_updated_mod_is_looked_up_sooner_than_a_dormant_one():
+    scheduler = makeScheduler()
+    scheduler.observe({"busy": "0", "dormant": "0"}, 0)
+    for day in range(2, 30, 2):
+        scheduler.observe({"busy": str(day * DAY), "dormant": "0"}, day * DAY)
+    scheduler.observe({"busy": str(28 * DAY), "dormant": "0"}, 30 * DAY)
+    assert nextInterval(scheduler, "busy", 30 * DAY) < nextInterval(scheduler, "dormant", 30 * DAY) / 4
+
+def test_failed_lookup_is_not_an_update():
+    scheduler = makeScheduler()
+    scheduler.observe({"mod": "1000"}, 0)
+    assert scheduler.observe({"mod": None}, DAY) == []
+    assert scheduler.history.mods["mod"]["timestamp"] == "1000" and scheduler.history.mods["mod"]["updates"] == []
+
+def test_rate_limit_backoff_doubles_up_to_the_cap_and_resets():
+    scheduler = makeScheduler(backoff=900, max_interval=3600)
+    assert [scheduler.rateLimited(0) for _ in range(4)] == [900, 1800, 3600, 3600]
+    assert scheduler.backingOff(3599) and not scheduler.backingOff(3600)
+
+    ## Retry-After is honoured when it asks for longer than the backoff
+    assert scheduler.rateLimited(0, retry_after=5000) == 5000
+
+    scheduler.clearBackoff()
+    assert scheduler.rateLimited(10000) == 900
+    assert scheduler.backoff_until == 10900
+
+def test_rate_limit_pause_is_jittered_upwards_only():
+    scheduler   = modPollScheduler(modUpdateHistory(), backoff=900, jitter=0.1, seed=47)
+    pause       = scheduler.rateLimited(0)
+    assert 900 <= pause <= 990 and scheduler.backoff_until == pytest.approx(pause)
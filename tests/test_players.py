@@ -0,0 +1,88 @@
+import asyncio
+import pytest
+from stubs import recordingInstance
+from zomboidScheduler import virtualEventLoop
+
+## Every test runs on the virtual clock, so a window of hours takes milliseconds; the fake server reads the same clock
+@pytest.fixture
+def loop():
+    loop = virtualEventLoop()
+    yield loop
+    loop.close()
+
+def scriptPlayers(rcon_server, loop, script) -> None:
+    ''' Answer "players" with the count script gives for the loop's current time; script is a list of (from_second, players) '''
+    def respond(command):
+        if command != "players":
+            return ""
+        players = [count for from_second, count in script if from_second <= loop.time()][-1]
+        return "garbled" if players is None else f"Players connected ({players}):"
+    rcon_server.respond = respond
+
+def makeInstance(tmp_path, rcon_server, **overrides):
+    ''' A recording instance polling players every minute '''
+    return recordingInstance(tmp_path, rcon_server.port, players_poll_interval_seconds=60, **overrides)
+
+def polls(rcon_server) -> int:
+    return rcon_server.commands.count("players")
+
+def test_empty_server_restarts_at_once(tmp_path, loop, rcon_server):
+    scriptPlayers(rcon_server, loop, [(0, 0)])
+    instance, _ = makeInstance(tmp_path, rcon_server)
+    assert loop.run_until_complete(instance.awaitRestartWindow(3600)) == 0
+    assert loop.time() == 0
+    assert polls(rcon_server) == 1
+
+def test_window_opens_once_players_leave(tmp_path, loop, rcon_server):
+    scriptPlayers(rcon_server, loop, [(0, 5), (600, 3), (1500, 1)])
+    instance, _ = makeInstance(tmp_path, rcon_server, restart_player_threshold=1)
+    assert loop.run_until_complete(instance.awaitRestartWindow(3600)) == 1
+    assert loop.time() == pytest.approx(1500)
+    assert polls(rcon_server) == 26
+
+def test_deadline_ends_the_wait(tmp_path, loop, rcon_server):
+    scriptPlayers(rcon_server, loop, [(0, 4)])
+    instance, _ = makeInstance(tmp_path, rcon_server)
+    assert loop.run_until_complete(instance.awaitRestartWindow(1830)) == 4
+    assert loop.time() == pytest.approx(1830)
+    ## The check at the deadline reuses the poll from 30 seconds before it
+    assert polls(rcon_server) == 31
+
+def test_unknown_player_count_does_not_wait(tmp_path, loop, rcon_server):
+    scriptPlayers(rcon_server, loop, [(0, None)])
+    instance, _ = makeInstance(tmp_path, rcon_server)
+    assert loop.run_until_complete(instance.awaitRestartWindow(3600)) is None
+    assert loop.time() == 0
+
+def test_recent_poll_is_reused(tmp_path, loop, rcon_server):
+    scriptPlayers(rcon_server, loop, [(0, 2), (30, 0)])
+    instance, _ = makeInstance(tmp_path, rcon_server)
+
+    async def pollTwice():
+        await instance.pollPlayers()
+        await asyncio.sleep(45)
+        cached = await instance.currentPlayers()
+        await asyncio.sleep(15)
+        return cached, await instance.currentPlayers()
+
+    assert loop.run_until_complete(pollTwice()) == (2, 0)
+    assert polls(rcon_server) == 2
+
+def test_restart_on_an_empty_server_skips_the_countdown(tmp_path, loop, rcon_server, capsys):
+    scriptPlayers(rcon_server, loop, [(0, 0)])
+    instance, steps = makeInstance(tmp_path, rcon_server, restart_window_deadline_minutes=60)
+    loop.run_until_complete(instance.serverMessenger("restart"))
+    assert [command for command in rcon_server.commands if command.startswith("servermsg")] == []
+    assert steps == ["save", "backup restart", "wait", "stop", "start"]
+    assert loop.time() < 1
+    assert "restarting without a countdown" in capsys.readouterr().out
+
+def test_restart_counts_down_for_the_players_left_at_the_deadline(tmp_path, loop, rcon_server):
+    scriptPlayers(rcon_server, loop, [(0, 6), (900, 2)])
+    instance, steps = makeInstance(tmp_path, rcon_server, restart_window_deadline_minutes=30)
+    loop.run_until_complete(instance.serverMessenger("restart"))
+    messages = [command for command in rcon_server.commands if command.startswith("servermsg")]
+    assert messages[0] == "servermsg \"Server will restart in 5 minutes...\"" and len(messages) == 6
+    assert rcon_server.commands.index(messages[0]) == polls(rcon_server) == 31
+    assert steps == ["save", "backup restart", "wait", "stop", "start"]
+    assert loop.time() == pytest.approx(1800 + 300 + 60 + 4)
@@ -0,0 +1,59 @@
+import os
+import json
+import psutil as ps
+import pytest
+from zomboidProcess import zomboidProcess
+
+@pytest.fixture
+def server(tmp_path):
+    ## A stand-in server: a shell that outlives the test unless stopped
+    server = zomboidProcess("sleep 60 &", str(tmp_path / "zomboid.pid"))
+    yield server
+    server.stop(5)
+
+def recorded(server) -> dict:
+    with open(server.pidfile_path, "r") as pidfile:
+        return json.load(pidfile)
+
+def test_start_records_the_pid_and_its_start_time(server):
+    pid = server.start()
+    assert recorded(server) == {"pid": pid, "create_time": ps.Process(pid).create_time()}
+    assert server.isRunning() and server.process().pid == pid
+
+    assert server.stop(5)
+    assert not server.isRunning() and not os.path.exists(server.pidfile_path)
+
+def test_restarted_manager_finds_its_server_again(server):
+    pid         = server.start()
+    restarted   = zomboidProcess("sleep 60", server.pidfile_path)
+    assert restarted.process().pid == pid
+
+    ## Only the recorded tree is stopped, even without the Popen that started it
+    assert restarted.stop(5)
+    assert not ps.pid_exists(pid) or ps.Process(pid).status() == ps.STATUS_ZOMBIE
+
+def test_reused_pid_is_not_taken_for_the_server(server):
+    ## The recorded PID now belongs to another process, started at a different time
+    with open(server.pidfile_path, "w") as pidfile:
+        json.dump({"pid": os.getpid(), "create_time": ps.Process().create_time() - 3600}, pidfile)
+    assert server.process() is None and server.processTree() == []
+
+    ## Stopping a server that isn't running leaves the unrelated process alone
+    assert server.stop(1) and ps.pid_exists(os.getpid())
+
+@pytest.mark.parametrize("contents", ['{"pid": 999999999, "create_time": 0}', '{"pid": ', '{"create_time": 0}'])
+def test_stale_or_broken_pidfile_means_not_running(server, contents):
+    with open(server.pidfile_path, "w") as pidfile:
+        pidfile.write(contents)
+    assert not server.isRunning() and server.binaryProcess() is None
+
+def test_process_gone_before_it_is_recorded_is_a_failed_start(tmp_path, monkeypatch, caplog):
+    ## A start command that exits at once, reaped before its start time could be read
+    def gone(pid=None):
+        raise ps.NoSuchProcess(pid)
+    monkeypatch.setattr(ps, "Process", gone)
+    server = zomboidProcess("exit 3", str(tmp_path / "zomboid.pid"))
+    with caplog.at_level("INFO"):
+        assert server.start() is None
+    assert "exit code 3" in caplog.text
+    assert not os.path.exists(server.pidfile_path) and server.popen is None
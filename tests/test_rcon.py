@@ -0,0 +1,75 @@
+import time as t
+import socket
+import asyncio
+import pytest
+from stubs import recordingInstance
+from zomboidRcon import zomboidRcon
+
+def closedPort() -> int:
+    ''' Return a local port nothing listens on '''
+    with socket.socket() as probe:
+        probe.bind(("127.0.0.1", 0))
+        return probe.getsockname()[1]
+
+def test_commands_reuse_one_connection(rcon_server):
+    rcon_server.respond = lambda command: "Players connected (2):" if command == "players" else "ok"
+    rcon = zomboidRcon("127.0.0.1", rcon_server.port, "password")
+    assert rcon.command("save") == "ok"
+    assert rcon.playerCount() == 2
+    assert rcon_server.logins == 1
+
+def test_wrong_password_is_refused(rcon_server):
+    with pytest.raises(ConnectionError):
+        zomboidRcon("127.0.0.1", rcon_server.port, "wrong").command("save")
+    assert rcon_server.commands == []
+
+def test_stale_connection_is_reopened_before_sending(rcon_server):
+    rcon = zomboidRcon("127.0.0.1", rcon_server.port, "password")
+    rcon.command("players")
+    rcon_server.dropConnections()
+    t.sleep(0.1)
+    assert rcon.command("save") == ""
+    assert rcon_server.commands == ["players", "save"]
+    assert rcon_server.logins == 2
+
+def test_command_is_not_sent_again_after_a_drop(rcon_server):
+    rcon_server.respond = lambda command: None
+    with pytest.raises(ConnectionError):
+        zomboidRcon("127.0.0.1", rcon_server.port, "password").command("servermsg \"hello\"")
+    assert rcon_server.commands == ["servermsg \"hello\""]
+
+def test_command_is_not_sent_again_after_a_timeout(rcon_server):
+    rcon_server.respond = lambda command: t.sleep(0.5) or ""
+    with pytest.raises(TimeoutError):
+        zomboidRcon("127.0.0.1", rcon_server.port, "password", timeout=0.2).command("save")
+    t.sleep(0.5)
+    assert rcon_server.commands == ["save"]
+
+def test_connection_closed_after_quit_is_success(rcon_server):
+    rcon_server.respond = lambda command: None if command == "quit" else ""
+    assert zomboidRcon("127.0.0.1", rcon_server.port, "password").command("quit") == ""
+    assert rcon_server.commands == ["quit"]
+
+def test_unreachable_server_raises():
+    with pytest.raises(ConnectionRefusedError):
+        zomboidRcon("127.0.0.1", closedPort(), "password").command("save")
+
+def test_quit_sends_each_command_once(tmp_path, rcon_server, capsys):
+    rcon_server.respond = lambda command: None if command == "quit" else ""
+    instance, steps = recordingInstance(tmp_path, rcon_server.port)
+    asyncio.run(instance.serverMessenger("quit"))
+    assert rcon_server.commands == ["servermsg \"Server is shutting down.\"", "save", "quit"]
+    assert steps == ["save", "backup quit", "wait", "stop"]
+    assert "ERROR" not in capsys.readouterr().out
+
+def test_quit_backs_up_and_stops_after_a_failed_message(tmp_path, rcon_server):
+    rcon_server.respond = lambda command: None if command.startswith("servermsg") else ""
+    instance, steps = recordingInstance(tmp_path, rcon_server.port)
+    asyncio.run(instance.serverMessenger("quit"))
+    assert rcon_server.commands == ["servermsg \"Server is shutting down.\"", "save", "quit"]
+    assert steps == ["save", "backup quit", "wait", "stop"]
+
+def test_quit_backs_up_and_stops_an_unreachable_server(tmp_path):
+    instance, steps = recordingInstance(tmp_path, closedPort())
+    asyncio.run(instance.serverMessenger("quit"))
+    assert steps == ["save", "backup quit", "wait", "stop"]
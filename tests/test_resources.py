@@ -0,0 +1,130 @@
+import os
+import sys
+import time as t
+import pytest
+import contextlib
+import types
+from zomboidProcess import zomboidProcess
+from zomboidResources import resourceSampler
+
+## A stand-in server: allocates (and touches) mib_at_start MiB, then mib_per_step MiB every step_seconds, touching ready_path once started
+SERVER_SCRIPT = '''
+import sys, time
+mib_at_start, mib_per_step, step_seconds, ready_path = int(sys.argv[1]), int(sys.argv[2]), float(sys.argv[3]), sys.argv[4]
+held = [bytearray(b"x") * (mib_at_start * 1048576)]
+open(ready_path, "w").close()
+while True:
+    time.sleep(step_seconds)
+    held.append(bytearray(b"x") * (mib_per_step * 1048576))
+'''
+
+@pytest.fixture
+def allocating_server(tmp_path):
+    servers = []
+
+    def start(mib_at_start, mib_per_step=0, step_seconds=0.1):
+        script_path = tmp_path / "server.py"
+        ready_path  = tmp_path / f"ready_{len(servers)}"
+        script_path.write_text(SERVER_SCRIPT)
+        server = zomboidProcess(f'"{sys.executable}" "{script_path}" {mib_at_start} {mib_per_step} {step_seconds} "{ready_path}"', str(tmp_path / "server.pid"))
+        server.start()
+        servers.append(server)
+        deadline = t.monotonic() + 10
+        while not os.path.exists(ready_path) and t.monotonic() < deadline:
+            t.sleep(0.02)
+        return server
+
+    yield start
+    for server in servers:
+        server.stop(5)
+
+def sampleFor(sampler, count, interval) -> list:
+    samples = []
+    for index in range(count):
+        samples.append(sampler.sample(t.monotonic()))
+        t.sleep(interval)
+    return samples
+
+def test_samples_sum_the_process_tree(allocating_server):
+    sampler = resourceSampler(allocating_server(100))
+    sample  = sampler.sample(t.monotonic())
+    assert sample["rss"] > 100 * 1048576
+    assert sample["threads"] >= 1 and sample["fds"] >= 3
+    assert list(sampler.samples) == [sample]
+
+def test_rss_above_the_limit_asks_for_a_restart(allocating_server):
+    server = allocating_server(100)
+    sampler = resourceSampler(server, max_rss_mb=80)
+    sampler.sample(t.monotonic())
+    assert sampler.restartReason().startswith("RSS ")
+    assert resourceSampler(server, max_rss_mb=1000).sample(t.monotonic()) is not None
+
+def test_rss_growth_asks_for_a_restart(allocating_server):
+    sampler = resourceSampler(allocating_server(10, mib_per_step=5, step_seconds=0.05), max_rss_mb=4096, max_growth_mb_per_hour=1000, min_trend_samples=5,
+                              warmup_seconds=0, min_trend_seconds=0)
+    sampleFor(sampler, 8, 0.1)
+    assert "growing" in sampler.restartReason()
+    assert not sampler.healthy()
+
+def test_steady_server_is_healthy(allocating_server):
+    sampler = resourceSampler(allocating_server(20), max_rss_mb=4096, max_growth_mb_per_hour=1000, min_trend_samples=5, warmup_seconds=0, min_trend_seconds=0)
+    assert not sampler.healthy()
+    sampleFor(sampler, 5, 0.1)
+    assert sampler.restartReason() is None
+    assert sampler.healthy()
+
+def test_stopped_server_is_not_sampled(allocating_server):
+    server = allocating_server(10)
+    server.stop(5)
+    assert resourceSampler(server).sample(t.monotonic()) is None
+
+class scriptedTree():
+    ''' A process tree whose RSS follows rss_mb(seconds since start), for trends over hours of simulated samples '''
+
+    def __init__(self, rss_mb) -> None:
+        self.rss_mb = rss_mb
+        self.now    = 0
+        ## The sampler keeps the Process object it first saw for a pid, so the one stand-in reads the RSS at the current time
+        self.server = types.SimpleNamespace(pid=1, oneshot=contextlib.nullcontext, memory_info=lambda: types.SimpleNamespace(rss=int(self.rss_mb(self.now) * 1048576)),
+                                            cpu_percent=lambda interval: 0.0, num_threads=lambda: 40, num_fds=lambda: 100)
+
+    def processTree(self) -> list:
+        return [self.server]
+
+def restartReasons(tree, sampler, hours, interval=30, start=0) -> list:
+    ''' Sample every interval seconds for hours from start and return (seconds, reason) for every sample that asks for a restart '''
+    reasons = []
+    for now in range(start, start + int(hours * 3600), interval):
+        tree.now = now
+        sampler.sample(now)
+        if sampler.restartReason():
+            reasons.append((now, sampler.restartReason()))
+    return reasons
+
+def warmingUp(seconds) -> float:
+    ''' A JVM that climbs 100 MiB in its first 5 minutes (1200 MiB/h) and then holds steady '''
+    return 2048 + 100 * min(seconds, 300) / 300
+
+def test_start_up_climb_is_not_a_leak():
+    tree = scriptedTree(warmingUp)
+    assert restartReasons(tree, resourceSampler(tree, max_rss_mb=8192, max_growth_mb_per_hour=1024), hours=3) == []
+    ## Judged from the first ten samples, as before, the same climb asked for a restart within minutes of every start
+    tree = scriptedTree(warmingUp)
+    early = restartReasons(tree, resourceSampler(tree, max_rss_mb=8192, max_growth_mb_per_hour=1024, warmup_seconds=0, min_trend_seconds=0), hours=3)
+    assert early and early[0][0] < 300
+
+def test_leak_after_the_warm_up_asks_for_a_restart():
+    tree    = scriptedTree(lambda seconds: warmingUp(seconds) + 2048 * max(0, seconds - 600) / 3600)
+    sampler = resourceSampler(tree, max_rss_mb=8192, max_growth_mb_per_hour=1024)
+    reasons = restartReasons(tree, sampler, hours=1)
+    assert reasons and "growing" in reasons[0][1]
+    ## The first judgement waits for the warm-up plus half an hour of samples
+    assert reasons[0][0] == 600 + 1800
+
+def test_health_is_unknown_until_the_trend_can_be_judged():
+    tree    = scriptedTree(warmingUp)
+    sampler = resourceSampler(tree, max_rss_mb=8192, max_growth_mb_per_hour=1024)
+    restartReasons(tree, sampler, hours=0.5)
+    assert not sampler.healthy()
+    restartReasons(tree, sampler, hours=0.5, start=1800)
+    assert sampler.healthy()
@@ -0,0 +1,113 @@
+import os
+import sys
+import errno
+import asyncio
+import subprocess as sp
+import time as t
+import pytest
+from zomboidSaveWatch import saveWatcher, inotifyWatch, pollingWatch
+
+## A stand-in server saving its world: appends to map files every interval_seconds for save_seconds, moving on to a folder it
+## creates halfway through, then writes the monotonic time of its last write to done_path (outside the world)
+WRITER_SCRIPT = '''
+import os, sys, time
+world, save_seconds, interval_seconds, done_path = sys.argv[1], float(sys.argv[2]), float(sys.argv[3]), sys.argv[4]
+started, folder = time.monotonic(), world
+while time.monotonic() - started < save_seconds:
+    if folder == world and time.monotonic() - started >= save_seconds / 2:
+        folder = os.path.join(world, "map", "new_column")
+        os.makedirs(folder)
+    with open(os.path.join(folder, "map_0_0.bin"), "ab") as map_file:
+        map_file.write(b"x" * 4096)
+    last_write = time.monotonic()
+    time.sleep(interval_seconds)
+with open(done_path, "w") as done_file:
+    done_file.write(repr(last_write))
+'''
+
+QUIET_SECONDS = 0.3
+
+@pytest.fixture
+def world(tmp_path):
+    world = tmp_path / "world"
+    (world / "map").mkdir(parents=True)
+    (world / "map" / "map_1_1.bin").write_bytes(b"x" * 4096)
+    return world
+
+@pytest.fixture
+def fake_writer(tmp_path, world):
+    writers = []
+
+    def start(save_seconds, interval_seconds=0.05):
+        script_path = tmp_path / "writer.py"
+        script_path.write_text(WRITER_SCRIPT)
+        writers.append(sp.Popen([sys.executable, str(script_path), str(world), str(save_seconds), str(interval_seconds), str(tmp_path / "done")]))
+        return writers[-1]
+
+    yield start
+    for writer in writers:
+        writer.kill()
+        writer.wait()
+
+def lastWrite(tmp_path) -> float:
+    return float((tmp_path / "done").read_text())
+
+def waitUntilSaved(watcher, timeout):
+    ''' Wait for the save and return (seconds waited, monotonic time it returned) '''
+    async def wait():
+        waited = await watcher.waitUntilSaved(timeout)
+        return waited, asyncio.get_running_loop().time()
+    return asyncio.run(wait())
+
+def makeWatcher(world, polling=False) -> saveWatcher:
+    watcher = saveWatcher(str(world), quiet_seconds=QUIET_SECONDS, first_write_grace=5, poll_interval=0.05, scan_interval=0.05)
+    if polling:
+        watcher.libc = None
+    watcher.start()
+    return watcher
+
+@pytest.mark.skipif(not sys.platform.startswith("linux"), reason="inotify is Linux only")
+def test_inotify_waits_for_the_writer_to_go_quiet(tmp_path, world, fake_writer):
+    watcher = makeWatcher(world)
+    assert isinstance(watcher.watch, inotifyWatch)
+    writer = fake_writer(1.0)
+    waited, returned_at = waitUntilSaved(watcher, 10)
+    watcher.stop()
+    assert writer.wait(5) == 0
+    ## Writes in the folder created during the save kept the save going, so it only ended once the writer had been quiet
+    assert waited >= 1.0
+    assert QUIET_SECONDS <= returned_at - lastWrite(tmp_path) < QUIET_SECONDS + 1
+
+def test_polling_waits_for_the_writer_to_go_quiet(tmp_path, world, fake_writer):
+    watcher = makeWatcher(world, polling=True)
+    assert isinstance(watcher.watch, pollingWatch)
+    writer = fake_writer(1.0)
+    waited, returned_at = waitUntilSaved(watcher, 10)
+    watcher.stop()
+    assert writer.wait(5) == 0
+    assert waited >= 1.0
+    assert QUIET_SECONDS <= returned_at - lastWrite(tmp_path) < QUIET_SECONDS + 1
+
+def test_watch_limit_falls_back_to_polling(world, monkeypatch):
+    def exhausted(self, folder):
+        raise OSError(errno.ENOSPC, os.strerror(errno.ENOSPC), folder)
+    monkeypatch.setattr(inotifyWatch, "addWatch", exhausted)
+    watcher = makeWatcher(world)
+    assert isinstance(watcher.watch, pollingWatch)
+    watcher.stop()
+
+@pytest.mark.parametrize("polling", [False, True])
+def test_writer_that_never_stops_times_out(world, fake_writer, polling):
+    watcher = makeWatcher(world, polling)
+    fake_writer(60)
+    started = t.monotonic()
+    assert waitUntilSaved(watcher, 1.0)[0] is None
+    watcher.stop()
+    assert 1.0 <= t.monotonic() - started < 3
+
+def test_save_that_writes_nothing_ends_after_the_grace(world):
+    watcher = makeWatcher(world)
+    watcher.first_write_grace = 0.5
+    waited, _ = waitUntilSaved(watcher, 10)
+    watcher.stop()
+    assert 0.5 <= waited < 1.5
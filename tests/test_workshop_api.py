@@ -0,0 +1,138 @@
+import os
+import json
+import types
+import queue
+import asyncio
+import datetime as dt
+import pytest
+from stubs import stubWorkshop, serverConfig
+from zomboidSoup import zomboidSoup, modStateStore, LOOKUP_FAILED
+from zomboidModPolling import modUpdateHistory, modPollScheduler
+from zomboid_server_manager import ZomboidServerInstance, ZomboidServerController
+
+@pytest.fixture
+def workshop():
+    stub = stubWorkshop({str(1000 + index): 1700000000 + index for index in range(250)})
+    stub.base_url = stub.start()
+    yield stub
+    stub.close()
+
+def makeSoup(workshop, tmp_path, workshop_ids, **options):
+    ini_path = tmp_path / "servertest.ini"
+    ini_path.write_text(f"WorkshopItems={';'.join(workshop_ids)}\n")
+    return zomboidSoup(str(ini_path), str(tmp_path / "mod_state.jsonl"), max_retries=0, requests_per_second=0,
+                       workshop_url=f"{workshop.base_url}/?id=", steam_api_url=f"{workshop.base_url}/api", **options)
+
+def test_batches_every_id_in_chunks(workshop, tmp_path):
+    workshop_ids    = list(workshop.time_updated)
+    timestamps      = makeSoup(workshop, tmp_path, workshop_ids).fetchTimestamps(workshop_ids)
+    assert [len(batch) for batch in workshop.api_batches] == [100, 100, 50]
+    assert timestamps == {workshop_id: str(epoch) for workshop_id, epoch in workshop.time_updated.items()}
+    assert workshop.page_requests == []
+
+def test_batch_size_is_configurable(workshop, tmp_path):
+    workshop_ids = list(workshop.time_updated)[:10]
+    makeSoup(workshop, tmp_path, workshop_ids, api_batch_size=3).fetchTimestamps(workshop_ids)
+    assert [len(batch) for batch in workshop.api_batches] == [3, 3, 3, 1]
+
+def test_removed_mods_are_none(workshop, tmp_path):
+    timestamps = makeSoup(workshop, tmp_path, ["1000", "999"]).fetchTimestamps(["1000", "999"])
+    assert timestamps == {"1000": "1700000000", "999": None}
+
+def test_failed_batch_falls_back_to_scraping_only_its_mods(workshop, tmp_path):
+    workshop.api_status = {1: 500}
+    workshop_ids    = list(workshop.time_updated)
+    timestamps      = makeSoup(workshop, tmp_path, workshop_ids).fetchTimestamps(workshop_ids)
+    assert sorted(workshop.page_requests) == workshop_ids[100:200]
+    assert all(timestamps[workshop_id] == str(workshop.time_updated[workshop_id]) for workshop_id in workshop_ids[:100] + workshop_ids[200:])
+    assert all(timestamps[workshop_id] and not timestamps[workshop_id].isdigit() for workshop_id in workshop_ids[100:200])
+
+def test_scraped_fallback_does_not_count_as_an_update(workshop, tmp_path):
+    modStateStore(str(tmp_path / "mod_state.jsonl")).save({"1000": "1700000000"})
+    workshop.api_status = {0: 500}
+    soup            = makeSoup(workshop, tmp_path, ["1000"])
+    response_queue  = queue.Queue()
+    soup.scrapeSteamWorkshop("--check", response_queue)
+    assert response_queue.get_nowait() == 0
+
+    ## Nor is the stored epoch replaced by the scraped date
+    soup.scrapeSteamWorkshop("--write", queue.Queue())
+    assert modStateStore(str(tmp_path / "mod_state.jsonl")).load() == {"1000": "1700000000"}
+
+def test_api_epoch_replaces_a_stored_date_on_write(workshop, tmp_path):
+    modStateStore(str(tmp_path / "mod_state.jsonl")).save({"1000": "1 Jan, 2023 9:00am"})
+    makeSoup(workshop, tmp_path, ["1000"]).scrapeSteamWorkshop("--write", queue.Queue())
+    assert modStateStore(str(tmp_path / "mod_state.jsonl")).load() == {"1000": "1700000000"}
+
+def test_real_update_is_detected(workshop, tmp_path):
+    modStateStore(str(tmp_path / "mod_state.jsonl")).save({"1000": "1600000000"})
+    response_queue = queue.Queue()
+    makeSoup(workshop, tmp_path, ["1000"]).scrapeSteamWorkshop("--check", response_queue)
+    assert response_queue.get_nowait() == 1
+
+def test_failed_lookups_keep_the_stored_timestamp(workshop, tmp_path):
+    modStateStore(str(tmp_path / "mod_state.jsonl")).save({"1000": "1700000000", "1001": "1700000001"})
+    workshop.api_status     = {0: 500}
+    workshop.page_status    = {"1000": 503, "1001": 404}
+    soup            = makeSoup(workshop, tmp_path, ["1000", "1001"])
+    response_queue  = queue.Queue()
+    soup.scrapeSteamWorkshop("--check", response_queue)
+    assert response_queue.get_nowait() == 0
+
+    soup.scrapeSteamWorkshop("--write", queue.Queue())
+    assert modStateStore(str(tmp_path / "mod_state.jsonl")).load() == {"1000": "1700000000", "1001": "1700000001"}
+
+def test_failed_lookups_are_never_written(workshop, tmp_path):
+    workshop.api_status     = {0: 500}
+    workshop.page_status    = {"1001": 500}
+    makeSoup(workshop, tmp_path, ["1000", "1001"]).scrapeSteamWorkshop("--write", queue.Queue())
+    assert list(modStateStore(str(tmp_path / "mod_state.jsonl")).load()) == ["1000"]
+
+def test_unreachable_workshop_is_a_failed_lookup(workshop, tmp_path):
+    soup = makeSoup(workshop, tmp_path, ["1000"])
+    workshop.close()
+    assert soup.fetchTimestamps(["1000"]) == {"1000": LOOKUP_FAILED}
+
+@pytest.mark.parametrize("arg", ["--check", "--write"])
+def test_server_without_workshop_mods_reports_an_error(workshop, tmp_path, arg):
+    response_queue = queue.Queue()
+    makeSoup(workshop, tmp_path, []).scrapeSteamWorkshop(arg, response_queue)
+    assert response_queue.get_nowait() is None
+    assert workshop.api_batches == [] and not (tmp_path / "mod_state.jsonl").exists()
+
+def test_vanilla_server_keeps_the_manager_running(tmp_path, capsys):
+    recorded    = []
+    controller  = types.SimpleNamespace(diskLock=lambda path: asyncio.Lock(), epochNow=lambda: 0,
+                                        recordModLookups=lambda soup, timestamps, now: recorded.append(timestamps))
+    instance    = ZomboidServerInstance(serverConfig(tmp_path, 0), controller)
+    (tmp_path / "servertest.ini").write_text("Public=true\n")
+    asyncio.run(instance.writeModState())
+    assert recorded == []
+    assert "No workshop mods found" in capsys.readouterr().out
+
+def test_mod_check_looks_every_server_up_through_the_controller(workshop, tmp_path):
+    ## Scraped pages, so the lookup's page cache shows whose mods went through it
+    shared      = {"workshop_backend": "html", "workshop_max_retries": 0, "workshop_requests_per_second": 0, "workshop_page_url": f"{workshop.base_url}/?id=",
+                   "workshop_api_url": f"{workshop.base_url}/api", "workshop_cache_path": str(tmp_path / "workshop_cache.json")}
+    controller  = types.SimpleNamespace(current_time=dt.datetime, diskLock=lambda path: asyncio.Lock(), epochNow=lambda: 1700001000,
+                                        mod_history=modUpdateHistory(), mod_priority_window=90 * 60, lookup_lock=asyncio.Lock())
+    controller.mod_poller       = modPollScheduler(controller.mod_history, adaptive=False)
+    controller.workshop_lookup  = ZomboidServerController.workshopLookup(controller, shared)
+    controller.recordModLookups = lambda soup, timestamps, now: ZomboidServerController.recordModLookups(controller, soup, timestamps, now)
+
+    instances = []
+    for name, workshop_ids in [("survivors", ["1000", "1001"]), ("hardcore", ["1001", "1002"])]:
+        config = serverConfig(tmp_path / name, 0, name=name, **{**shared, "workshop_cache_path": str(tmp_path / f"workshop_cache_{name}.json")})
+        (tmp_path / name / "servertest.ini").write_text(f"WorkshopItems={';'.join(workshop_ids)}\n")
+        modStateStore(config["mod_state_path"]).save({workshop_id: str(workshop.time_updated[workshop_id]) for workshop_id in workshop_ids})
+        instances.append(ZomboidServerInstance(config, controller))
+
+    asyncio.run(ZomboidServerController.modUpdateCheck(controller, instances))
+    assert sorted(workshop.page_requests) == ["1000", "1001", "1002"]
+    assert sorted(controller.mod_history.mods) == ["1000", "1001", "1002"]
+    ## Only the controller's lookup cached the pages; neither server's own cache picked up the other's mods
+    with open(tmp_path / "workshop_cache.json", "r") as cache_file:
+        assert sorted(json.load(cache_file)) == ["1000", "1001", "1002"]
+    assert not os.path.exists(tmp_path / "workshop_cache_survivors.json") and not os.path.exists(tmp_path / "workshop_cache_hardcore.json")
+    ## Both servers are in sync, so neither is restarted
+    assert not any(instance.scheduler.running for instance in instances)
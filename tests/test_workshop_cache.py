@@ -0,0 +1,74 @@
+import json
+import threading as th
+import pytest
+from stubs import stubWorkshop
+from zomboidSoup import zomboidSoup, workshopValidatorCache, LOOKUP_FAILED
+
+@pytest.fixture
+def workshop():
+    stub = stubWorkshop({"1000": 1700000000, "1001": 1700000001, "1002": None})
+    stub.base_url = stub.start()
+    yield stub
+    stub.close()
+
+def makeSoup(workshop, tmp_path):
+    return zomboidSoup(str(tmp_path / "servertest.ini"), str(tmp_path / "mod_state.jsonl"), backend="html", max_retries=0, requests_per_second=0,
+                       cache_path=str(tmp_path / "workshop_cache.json"), workshop_url=f"{workshop.base_url}/?id=", steam_api_url=f"{workshop.base_url}/api")
+
+def test_unchanged_pages_are_answered_from_the_cache(workshop, tmp_path):
+    workshop_ids    = ["1000", "1001", "1002", "999"]
+    first           = makeSoup(workshop, tmp_path).fetchTimestamps(workshop_ids)
+    assert workshop.not_modified == 0
+
+    ## A new soup reads the validators back from disk and every page is answered with a 304
+    soup    = makeSoup(workshop, tmp_path)
+    second  = soup.fetchTimestamps(workshop_ids)
+    assert second == first
+    assert first["1002"] is None and first["999"] is None
+    assert workshop.not_modified == 4
+    assert soup.validator_cache.hits == 4 and soup.validator_cache.bytes_saved > 0
+
+def test_a_changed_page_is_fetched_again(workshop, tmp_path):
+    first = makeSoup(workshop, tmp_path).fetchTimestamps(["1000"])
+    workshop.time_updated["1000"] = 1800000000
+    second = makeSoup(workshop, tmp_path).fetchTimestamps(["1000"])
+    assert workshop.not_modified == 0
+    assert second["1000"] != first["1000"]
+
+def test_304_without_a_cached_entry_is_a_failed_lookup(workshop, tmp_path):
+    workshop.page_status = {"1000": 304}
+    assert makeSoup(workshop, tmp_path).fetchTimestamps(["1000"]) == {"1000": LOOKUP_FAILED}
+
+def test_concurrent_saves_leave_a_whole_file(tmp_path):
+    cache_path  = str(tmp_path / "workshop_cache.json")
+    caches      = [workshopValidatorCache(cache_path) for index in range(4)]
+    for index, cache in enumerate(caches):
+        cache.entries = {str(workshop_id): {"etag": f'"{index}"', "timestamp": "x" * 1000} for workshop_id in range(500)}
+
+    caches[0].save()
+    torn    = []
+    saving  = th.Event()
+
+    def readWhileSaving():
+        while not saving.is_set():
+            try:
+                with open(cache_path) as cache_file:
+                    json.load(cache_file)
+            except ValueError:
+                torn.append(True)
+
+    reader  = th.Thread(target=readWhileSaving)
+    threads = [th.Thread(target=lambda cache=cache: [cache.save() for repeat in range(20)]) for cache in caches]
+    reader.start()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    saving.set()
+    reader.join()
+
+    assert not torn
+
+    with open(cache_path) as cache_file:
+        assert len(json.load(cache_file)) == 500
+    assert [path.name for path in tmp_path.iterdir()] == ["workshop_cache.json"]
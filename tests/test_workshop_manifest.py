@@ -0,0 +1,70 @@
+import os
+import queue
+import shutil
+import pytest
+from stubs import stubWorkshop
+from zomboidSoup import zomboidSoup, workshopManifest, modStateStore
+
+FIXTURES = os.path.join(os.path.dirname(os.path.abspath(__file__)), "fixtures")
+
+@pytest.fixture
+def workshop():
+    stub = stubWorkshop({"1000": 1700000000, "1001": 1700000001})
+    stub.base_url = stub.start()
+    yield stub
+    stub.close()
+
+def manifestCopy(tmp_path, fixture):
+    manifest_path = str(tmp_path / "appworkshop_108600.acf")
+    shutil.copy(os.path.join(FIXTURES, fixture), manifest_path)
+    return manifest_path
+
+def check(workshop, tmp_path, manifest_path, backend="api"):
+    ini_path = tmp_path / "servertest.ini"
+    ini_path.write_text("WorkshopItems=1000;1001\n")
+    soup = zomboidSoup(str(ini_path), str(tmp_path / "mod_state.jsonl"), backend=backend, max_retries=0, requests_per_second=0,
+                       workshop_manifest=workshopManifest(manifest_path), workshop_url=f"{workshop.base_url}/?id=", steam_api_url=f"{workshop.base_url}/api")
+    response_queue = queue.Queue()
+    soup.scrapeSteamWorkshop("--check", response_queue)
+    return response_queue.get_nowait() if not response_queue.empty() else None
+
+def test_installed_items_are_read_from_the_manifest(tmp_path):
+    manifest = workshopManifest(manifestCopy(tmp_path, "appworkshop_108600.acf"))
+    assert manifest.installedItems() == {"1000": {"timeupdated": 1700000000, "manifest": "5551234567890123456"},
+                                         "1001": {"timeupdated": 1700000001, "manifest": "5551234567890123457"}}
+    assert not manifest.needs_update
+
+@pytest.mark.parametrize("fixture", [None, "appworkshop_108600_truncated.acf"])
+def test_missing_or_truncated_manifest_is_none(tmp_path, fixture):
+    manifest_path = manifestCopy(tmp_path, fixture) if fixture else str(tmp_path / "missing.acf")
+    assert workshopManifest(manifest_path).installedItems() is None
+
+def test_installed_mods_are_in_sync(workshop, tmp_path):
+    assert check(workshop, tmp_path, manifestCopy(tmp_path, "appworkshop_108600.acf")) == 0
+
+def test_newer_workshop_mod_is_outdated(workshop, tmp_path):
+    workshop.time_updated["1001"] = 1800000000
+    assert check(workshop, tmp_path, manifestCopy(tmp_path, "appworkshop_108600.acf")) == 1
+
+def test_pending_download_restarts_without_asking_steam(workshop, tmp_path):
+    assert check(workshop, tmp_path, manifestCopy(tmp_path, "appworkshop_108600_pending.acf")) == 1
+    assert workshop.api_batches == [] and workshop.page_requests == []
+
+@pytest.mark.parametrize("fixture", [None, "appworkshop_108600_truncated.acf"])
+def test_unreadable_manifest_falls_back_to_the_mod_state(workshop, tmp_path, fixture):
+    manifest_path = manifestCopy(tmp_path, fixture) if fixture else str(tmp_path / "missing.acf")
+    modStateStore(str(tmp_path / "mod_state.jsonl")).save({"1000": "1700000000", "1001": "1700000001"})
+    assert check(workshop, tmp_path, manifest_path) == 0
+    workshop.time_updated["1001"] = 1800000000
+    assert check(workshop, tmp_path, manifest_path) == 1
+
+def test_scraped_dates_fall_back_to_the_mod_state(workshop, tmp_path):
+    manifest_path = manifestCopy(tmp_path, "appworkshop_108600.acf")
+    ini_path = tmp_path / "servertest.ini"
+    ini_path.write_text("WorkshopItems=1000;1001\n")
+    soup = zomboidSoup(str(ini_path), str(tmp_path / "mod_state.jsonl"), backend="html", max_retries=0, requests_per_second=0, workshop_url=f"{workshop.base_url}/?id=")
+    soup.scrapeSteamWorkshop("--write", queue.Queue())
+
+    assert check(workshop, tmp_path, manifest_path, backend="html") == 0
+    workshop.time_updated["1001"] = 1800000000
+    assert check(workshop, tmp_path, manifest_path, backend="html") == 1
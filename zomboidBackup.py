@@ -0,0 +1,553 @@
+#!/usr/bin/env python3
+
+import io
+import os
+import bz2
+import sys
+import gzip
+import json
+import lzma
+import time as t
+import shutil
+import sqlite3
+import hashlib
+import logging
+import tarfile
+import collections
+import multiprocessing
+import datetime as dt
+import threading as th
+from concurrent.futures import ProcessPoolExecutor
+
+## Created by https://steamcommunity.com/id/Mr_Pink47/
+## © 2024 - Open Source - Free to share and modify
+
+## README: Incremental, deduplicated world backups for zomboid_server_manager.py
+## Each file in the world directory is stored once in a content-addressed object store (snapshots/objects/<2 chars>/<sha256>)
+## and every backup is a JSON manifest (snapshots/manifests/<date>_<status>.json) listing the object each file points to.
+## Files whose size and mtime match the previous manifest are not read again, so a snapshot only costs I/O for chunks that changed.
+
+## Full archives are written in-process: the tar stream is cut into blocks that a process pool compresses in parallel,
+## and the compressed blocks are written back in order as independent gzip/bzip2/xz members of a single file.
+## Concatenated members are still a normal .tgz / .tar.bz2 / .tar.xz, so tar -xf restores them as usual.
+
+## To restore a snapshot into an (empty) world directory:
+##     python3 zomboidBackup.py --restore /path/to/backups/snapshots/manifests/<snapshot>.json /path/to/world_dict
+##
+## To re-check an archive against the checksum manifest written next to it:
+##     python3 zomboidBackup.py --verify /path/to/backups/<archive>.tgz
+##
+## Every archive is recorded in backup_catalog.db (SQLite) along with the offset of each compressed block and each file in the tar stream.
+## That lets a single chunk or player DB be restored by decompressing only the blocks that hold it:
+##     python3 zomboidBackup.py --restore-file /path/to/backups/<archive>.tgz servertest/map/map_1_1.bin /path/to/restore_dir
+
+## File extension for each supported archive codec
+ARCHIVE_EXTENSIONS = {"gz": "tgz", "bz2": "tar.bz2", "xz": "tar.xz"}
+
+## Archives are written from a worker thread of a process running other threads (the scheduler's, the metrics server's), and a forked
+## child can inherit a lock one of them held; the compression pool starts its workers from a clean forkserver (spawn where there is none)
+POOL_CONTEXT = multiprocessing.get_context("forkserver" if "forkserver" in multiprocessing.get_all_start_methods() else "spawn")
+
+def decompressBlock(codec, data) -> bytes:
+    ''' Decompress one self-contained archive member '''
+    if codec == "bz2":
+        return bz2.decompress(data)
+    if codec == "xz":
+        return lzma.decompress(data)
+    return gzip.decompress(data)
+
+def expiredBackups(backups, retention) -> list:
+    ''' Return the (created, item) pairs not kept by a retention policy such as {"hourly": 24, "daily": 7, "weekly": 4} '''
+    ## The newest backup in each of the most recent N hours/days/weeks is kept, everything else expires
+    bucket_keys = {
+        "hourly"    : lambda created: created.strftime("%Y%m%d%H"),
+        "daily"     : lambda created: created.strftime("%Y%m%d"),
+        "weekly"    : lambda created: created.isocalendar()[:2],
+        "monthly"   : lambda created: created.strftime("%Y%m"),
+    }
+    newest_first    = sorted(backups, key=lambda backup: backup[0], reverse=True)
+    keep            = set()
+    for period, count in retention.items():
+        if period not in bucket_keys:
+            continue
+        seen_buckets = []
+        for index, (created, _) in enumerate(newest_first):
+            bucket = bucket_keys[period](created)
+            if bucket in seen_buckets:
+                continue
+            if len(seen_buckets) >= count:
+                break
+            seen_buckets.append(bucket)
+            keep.add(index)
+    return [backup for index, backup in enumerate(newest_first) if index not in keep]
+
+def removeQuietly(path) -> None:
+    ''' Remove a leftover temporary file, if there is one '''
+    try:
+        os.remove(path)
+    except FileNotFoundError:
+        pass
+
+def compressBlock(codec, level, data) -> bytes:
+    ''' Compress one block of the tar stream into a self-contained member; runs in a worker process '''
+    if codec == "bz2":
+        return bz2.compress(data, level)
+    if codec == "xz":
+        return lzma.compress(data, preset=level)
+    return gzip.compress(data, compresslevel=level, mtime=0)
+
+class blockCompressor():
+    ''' A write-only file object that hands fixed size blocks to a process pool and writes the compressed results in order '''
+
+    def __init__(self, output, pool, codec, level, block_size, max_in_flight) -> None:
+        ''' Constructor to declare the output file, the pool and the pending block queue '''
+        self.output         = output
+        self.pool           = pool
+        self.codec          = codec
+        self.level          = level
+        self.block_size     = block_size
+        self.max_in_flight  = max_in_flight
+        self.buffer         = bytearray()
+        self.pending        = collections.deque()
+        self.bytes_in       = 0
+        self.bytes_out      = 0
+        self.blocks         = []
+
+    def write(self, data) -> int:
+        ''' Buffer tar data and submit every full block for compression '''
+        self.buffer     += data
+        self.bytes_in   += len(data)
+        while len(self.buffer) >= self.block_size:
+            self.submit(bytes(self.buffer[:self.block_size]))
+            del self.buffer[:self.block_size]
+        return len(data)
+
+    def submit(self, block) -> None:
+        ''' Queue a block for compression, writing finished blocks out so memory stays bounded '''
+        raw_offset = self.blocks[-1][0] + self.blocks[-1][1] if self.blocks else 0
+        self.blocks.append([raw_offset, len(block), None, None])
+        self.pending.append((len(self.blocks) - 1, self.pool.submit(compressBlock, self.codec, self.level, block)))
+        while len(self.pending) > self.max_in_flight:
+            self.writeNext()
+
+    def writeNext(self) -> None:
+        ''' Write the oldest compressed block to the output '''
+        block_index, future     = self.pending.popleft()
+        compressed              = future.result()
+        self.blocks[block_index][2:] = [self.bytes_out, len(compressed)]
+        self.output.write(compressed)
+        self.bytes_out          += len(compressed)
+
+    def close(self) -> None:
+        ''' Compress the final partial block and drain every pending block '''
+        if self.buffer:
+            self.submit(bytes(self.buffer))
+            self.buffer.clear()
+        while self.pending:
+            self.writeNext()
+
+class backupCatalog():
+    ''' A class to index archives, their compressed blocks and their files in a SQLite database '''
+
+    def __init__(self, catalog_path) -> None:
+        ''' Constructor to create the catalog tables if they don't exist yet '''
+        self.catalog_path   = catalog_path
+        self.lock           = th.Lock()
+        with self.connect() as catalog:
+            catalog.executescript('''
+                CREATE TABLE IF NOT EXISTS backups (id INTEGER PRIMARY KEY, path TEXT UNIQUE, created TEXT, status TEXT, codec TEXT, bytes_in INTEGER, bytes_out INTEGER);
+                CREATE TABLE IF NOT EXISTS blocks  (backup_id INTEGER, block_index INTEGER, raw_offset INTEGER, raw_size INTEGER, comp_offset INTEGER, comp_size INTEGER);
+                CREATE TABLE IF NOT EXISTS files   (backup_id INTEGER, name TEXT, start_offset INTEGER, end_offset INTEGER, size INTEGER);
+                CREATE INDEX IF NOT EXISTS blocks_by_backup ON blocks (backup_id, raw_offset);
+                CREATE INDEX IF NOT EXISTS files_by_backup  ON files  (backup_id, name);
+            ''')
+
+    def connect(self) -> sqlite3.Connection:
+        ''' Open a connection; one per call keeps the catalog safe to use from the background threads '''
+        return sqlite3.connect(self.catalog_path, timeout=30)
+
+    def record(self, archive_path, server_status, codec, bytes_in, bytes_out, blocks, files) -> None:
+        ''' Add an archive with its block table and file offsets to the catalog '''
+        with self.lock, self.connect() as catalog:
+            backup_id = catalog.execute("INSERT OR REPLACE INTO backups (path, created, status, codec, bytes_in, bytes_out) VALUES (?, ?, ?, ?, ?, ?)",
+                                        (archive_path, dt.datetime.now().isoformat(), server_status, codec, bytes_in, bytes_out)).lastrowid
+            catalog.executemany("INSERT INTO blocks VALUES (?, ?, ?, ?, ?, ?)", [(backup_id, index, *block) for index, block in enumerate(blocks)])
+            catalog.executemany("INSERT INTO files VALUES (?, ?, ?, ?, ?)", [(backup_id, *file_entry) for file_entry in files])
+
+    def lookup(self, archive_path, member_name):
+        ''' Return (codec, start_offset, end_offset, blocks) for one file in an archive, matching on the full member name or its trailing path '''
+        with self.connect() as catalog:
+            backup = catalog.execute("SELECT id, codec FROM backups WHERE path = ?", (archive_path,)).fetchone()
+            if not backup:
+                return None
+            backup_id, codec = backup
+            file_entry = catalog.execute("SELECT start_offset, end_offset FROM files WHERE backup_id = ? AND (name = ? OR name LIKE ?) ORDER BY length(name) LIMIT 1",
+                                         (backup_id, member_name, f"%/{member_name}")).fetchone()
+            if not file_entry:
+                return None
+            start_offset, end_offset = file_entry
+            blocks = catalog.execute("SELECT raw_offset, raw_size, comp_offset, comp_size FROM blocks WHERE backup_id = ? AND raw_offset < ? AND raw_offset + raw_size > ? ORDER BY raw_offset",
+                                     (backup_id, end_offset, start_offset)).fetchall()
+            return codec, start_offset, end_offset, blocks
+
+    def backups(self) -> list:
+        ''' Return (created, path) for every cataloged archive '''
+        with self.connect() as catalog:
+            return [(dt.datetime.fromisoformat(created), path) for created, path in catalog.execute("SELECT created, path FROM backups")]
+
+    def remove(self, archive_path) -> None:
+        ''' Drop an archive and its index rows from the catalog '''
+        with self.lock, self.connect() as catalog:
+            backup = catalog.execute("SELECT id FROM backups WHERE path = ?", (archive_path,)).fetchone()
+            if backup:
+                catalog.execute("DELETE FROM blocks WHERE backup_id = ?", backup)
+                catalog.execute("DELETE FROM files WHERE backup_id = ?", backup)
+                catalog.execute("DELETE FROM backups WHERE id = ?", backup)
+
+class zomboidBackup():
+    ''' A class to back up the Zomboid world directory as parallel-compressed archives or incremental, content-addressed snapshots '''
+
+    def __init__(self, world_path, backup_path, codec="gz", level=6, workers=None, block_size=4 * 1024 * 1024, retention=None) -> None:
+        ''' Constructor to declare the world directory, the snapshot store locations and the archive settings '''
+        self.world_path     = world_path
+        self.backup_path    = backup_path
+        self.codec          = codec if codec in ARCHIVE_EXTENSIONS else "gz"
+        self.level          = level
+        self.workers        = workers or os.cpu_count() or 1
+        self.block_size     = block_size
+        self.retention      = retention or {}
+        self.catalog_path   = os.path.join(backup_path, "backup_catalog.db")
+        self.store_lock     = th.Lock() # Held by snapshots and pruning, so objects are never collected before their manifest is written
+        self.background     = [] # Checksum and prune threads; finish() waits for them so none is cut off half-way
+        self.thread_lock    = th.Lock()
+        self.snapshot_path  = os.path.join(backup_path, "snapshots")
+        self.objects_path   = os.path.join(self.snapshot_path, "objects")
+        self.manifests_path = os.path.join(self.snapshot_path, "manifests")
+        self.chunk_size     = 1024 * 1024
+
+    def objectPath(self, file_hash) -> str:
+        ''' Return where an object with the given hash lives in the store '''
+        return os.path.join(self.objects_path, file_hash[:2], file_hash)
+
+    def latestManifest(self) -> dict:
+        ''' Return the most recent snapshot manifest, or an empty one if no snapshot exists yet '''
+        try:
+            manifests = sorted(name for name in os.listdir(self.manifests_path) if name.endswith(".json"))
+        except FileNotFoundError:
+            return {"files": {}}
+
+        for name in reversed(manifests):
+            try:
+                with open(os.path.join(self.manifests_path, name), "r") as manifest:
+                    return json.load(manifest)
+            except Exception as error:
+                logging.info(f"ERROR - Skipping unreadable snapshot manifest {name}\n{error}")
+        return {"files": {}}
+
+    def storeObject(self, file_path) -> str:
+        ''' Hash a file while copying it into the object store and return its hash; identical content is only stored once '''
+        hasher      = hashlib.sha256()
+        temp_path   = os.path.join(self.objects_path, f".incoming-{os.getpid()}")
+        with open(file_path, "rb") as source, open(temp_path, "wb") as temp_object:
+            while chunk := source.read(self.chunk_size):
+                hasher.update(chunk)
+                temp_object.write(chunk)
+
+        file_hash   = hasher.hexdigest()
+        object_path = self.objectPath(file_hash)
+        if os.path.exists(object_path):
+            os.remove(temp_path)
+        else:
+            os.makedirs(os.path.dirname(object_path), exist_ok=True)
+            os.replace(temp_path, object_path)
+        return file_hash
+
+    def snapshot(self, server_status) -> dict:
+        ''' Take a snapshot of the world directory and return its stats, including the path of its manifest '''
+        ## Pruning waits until the manifest listing the newly stored objects is on disk
+        with self.store_lock:
+            stats = self.writeSnapshot(server_status)
+        self.pruneInBackground()
+        return stats
+
+    def writeSnapshot(self, server_status) -> dict:
+        ''' Store the world directory's new and changed files, write the snapshot manifest and return its stats; the caller holds store_lock '''
+        started = t.monotonic()
+        os.makedirs(self.objects_path, exist_ok=True)
+        os.makedirs(self.manifests_path, exist_ok=True)
+
+        previous_files  = self.latestManifest()["files"]
+        files           = {}
+        stored_bytes    = 0
+        reused_files    = 0
+
+        for root, _, file_names in os.walk(self.world_path):
+            for file_name in file_names:
+                file_path   = os.path.join(root, file_name)
+                relative    = os.path.relpath(file_path, self.world_path)
+                try:
+                    stat = os.stat(file_path)
+                except FileNotFoundError:
+                    continue
+
+                ## Unchanged size and mtime means unchanged content; point at the object already in the store
+                previous = previous_files.get(relative)
+                if previous and previous["size"] == stat.st_size and previous["mtime_ns"] == stat.st_mtime_ns and os.path.exists(self.objectPath(previous["hash"])):
+                    files[relative] = previous
+                    reused_files    += 1
+                    continue
+
+                try:
+                    file_hash = self.storeObject(file_path)
+                except FileNotFoundError:
+                    continue
+                files[relative] = {"hash": file_hash, "size": stat.st_size, "mtime_ns": stat.st_mtime_ns, "mode": stat.st_mode & 0o7777}
+                stored_bytes    += stat.st_size
+
+        snapshot_name = f"{dt.datetime.now().strftime('%Y%m%d-%H%M%S')}_{server_status}"
+        manifest_path = os.path.join(self.manifests_path, f"{snapshot_name}.json")
+        try:
+            with open(manifest_path + ".tmp", "w") as manifest:
+                json.dump({"created": dt.datetime.now().isoformat(), "status": server_status, "world_path": self.world_path, "files": files}, manifest)
+            os.replace(manifest_path + ".tmp", manifest_path)
+        except BaseException:
+            removeQuietly(manifest_path + ".tmp")
+            raise
+
+        logging.info(f"Snapshot {snapshot_name}: {len(files)} files, {reused_files} unchanged, {stored_bytes} bytes read")
+        return {
+            "path"          : manifest_path,
+            "files"         : len(files),
+            "reused_files"  : reused_files,
+            "bytes_in"      : stored_bytes,
+            "seconds"       : t.monotonic() - started,
+            "finished"      : dt.datetime.now(),
+        }
+
+    def restore(self, manifest_path, target_path) -> None:
+        ''' Restore every file listed in a snapshot manifest into target_path '''
+        with open(manifest_path, "r") as manifest:
+            files = json.load(manifest)["files"]
+
+        for relative, entry in files.items():
+            destination = os.path.join(target_path, relative)
+            os.makedirs(os.path.dirname(destination), exist_ok=True)
+            shutil.copyfile(self.objectPath(entry["hash"]), destination)
+            os.chmod(destination, entry["mode"])
+            os.utime(destination, ns=(entry["mtime_ns"], entry["mtime_ns"]))
+
+        logging.info(f"Restored {len(files)} files from {manifest_path} into {target_path}")
+
+    def archive(self, server_status) -> dict:
+        ''' Write a full compressed archive of the world directory using every worker, and return its stats once it is on disk '''
+        os.makedirs(self.backup_path, exist_ok=True)
+        archive_path    = os.path.join(self.backup_path, f"{dt.datetime.now().strftime('%Y%m%d-%H%M%S')}_{server_status}_serverWorldSave.{ARCHIVE_EXTENSIONS[self.codec]}")
+        arcname         = os.path.basename(os.path.normpath(self.world_path))
+        members         = {}
+        file_entries    = []
+        started         = t.monotonic()
+
+        try:
+            with open(archive_path + ".tmp", "wb") as output, ProcessPoolExecutor(max_workers=self.workers, mp_context=POOL_CONTEXT) as pool:
+                compressor = blockCompressor(output, pool, self.codec, self.level, self.block_size, self.workers * 2)
+                with tarfile.open(fileobj=compressor, mode="w|") as tar:
+                    for root, dir_names, file_names in os.walk(self.world_path):
+                        dir_names.sort()
+                        for file_name in sorted(file_names):
+                            file_path   = os.path.join(root, file_name)
+                            member_name = os.path.join(arcname, os.path.relpath(file_path, self.world_path))
+                            try:
+                                tarinfo         = tar.gettarinfo(file_path, arcname=member_name)
+                                start_offset    = tar.offset
+                                with open(file_path, "rb") as source:
+                                    tar.addfile(tarinfo, source)
+                            except FileNotFoundError:
+                                continue
+                            members[member_name] = tarinfo.size
+                            file_entries.append((member_name, start_offset, tar.offset, tarinfo.size))
+                compressor.close()
+            os.replace(archive_path + ".tmp", archive_path)
+        except BaseException:
+            ## Don't leave a partial archive behind for every failed backup
+            removeQuietly(archive_path + ".tmp")
+            raise
+
+        seconds = t.monotonic() - started
+        stats   = {
+            "path"          : archive_path,
+            "files"         : len(members),
+            "bytes_in"      : compressor.bytes_in,
+            "bytes_out"     : compressor.bytes_out,
+            "seconds"       : seconds,
+            "throughput"    : compressor.bytes_in / seconds if seconds else 0.0,
+            "finished"      : dt.datetime.now(),
+        }
+        logging.info(f"Archive {archive_path}: {len(members)} files, {stats['bytes_in']} -> {stats['bytes_out']} bytes in {seconds:.2f}s ({stats['throughput'] / 1048576:.1f} MiB/s)")
+
+        try:
+            backupCatalog(self.catalog_path).record(archive_path, server_status, self.codec, compressor.bytes_in, compressor.bytes_out, compressor.blocks, file_entries)
+        except Exception as error:
+            logging.info(f"ERROR - Could not add {archive_path} to the backup catalog\n{error}")
+
+        ## Read the archive back, write its checksum manifest and prune old backups in the background so the caller can carry on straight away
+        self.inBackground(self.finishArchive, archive_path, members)
+        return stats
+
+    def inBackground(self, target, *args) -> None:
+        ''' Run target on a tracked thread, which finish() waits for and interpreter exit doesn't kill '''
+        thread = th.Thread(target=target, args=args)
+        with self.thread_lock:
+            self.background = [running for running in self.background if running.is_alive()] + [thread]
+        thread.start()
+
+    def finish(self, timeout=None) -> bool:
+        ''' Wait for the checksum and prune threads still running; returns False if any of them outlasts timeout '''
+        with self.thread_lock:
+            running = list(self.background)
+        deadline = None if timeout is None else t.monotonic() + timeout
+        for thread in running:
+            thread.join(None if deadline is None else max(0, deadline - t.monotonic()))
+        return not any(thread.is_alive() for thread in running)
+
+    def finishArchive(self, archive_path, members) -> None:
+        ''' Verify a freshly written archive, then apply the retention policy '''
+        self.writeChecksums(archive_path, members)
+        if self.retention:
+            self.prune()
+
+    def checksumArchive(self, archive_path) -> dict:
+        ''' Decompress an archive and return {member name: {"size", "sha256"}} for every file in it '''
+        checksums = {}
+        with tarfile.open(archive_path, "r:*") as tar:
+            for tarinfo in tar:
+                if not tarinfo.isfile():
+                    continue
+                hasher = hashlib.sha256()
+                member = tar.extractfile(tarinfo)
+                while chunk := member.read(self.chunk_size):
+                    hasher.update(chunk)
+                checksums[tarinfo.name] = {"size": tarinfo.size, "sha256": hasher.hexdigest()}
+        return checksums
+
+    def writeChecksums(self, archive_path, members) -> bool:
+        ''' Verify an archive holds every member that was written to it and save its checksum manifest next to it '''
+        try:
+            checksums   = self.checksumArchive(archive_path)
+            missing     = [name for name, size in members.items() if checksums.get(name, {}).get("size") != size]
+            try:
+                with open(archive_path + ".sha256.json.tmp", "w") as manifest:
+                    json.dump(checksums, manifest)
+                os.replace(archive_path + ".sha256.json.tmp", archive_path + ".sha256.json")
+            except BaseException:
+                removeQuietly(archive_path + ".sha256.json.tmp")
+                raise
+            if missing:
+                logging.info(f"ERROR - Archive {archive_path} failed verification, {len(missing)} files missing or truncated")
+                return False
+            logging.info(f"Archive {archive_path} verified ({len(checksums)} files)")
+            return True
+        except Exception as error:
+            logging.info(f"ERROR - Could not verify archive {archive_path}\n{error}")
+            return False
+
+    def restoreFile(self, archive_path, member_name, target_path) -> str:
+        ''' Restore one file from a cataloged archive, decompressing only the blocks that hold it, and return where it was written '''
+        entry = backupCatalog(self.catalog_path).lookup(os.path.abspath(archive_path), member_name) or backupCatalog(self.catalog_path).lookup(archive_path, member_name)
+        if not entry:
+            raise FileNotFoundError(f"{member_name} is not in the catalog for {archive_path}")
+        codec, start_offset, end_offset, blocks = entry
+
+        raw_data = bytearray()
+        with open(archive_path, "rb") as archive:
+            for _, _, comp_offset, comp_size in blocks:
+                archive.seek(comp_offset)
+                raw_data += decompressBlock(codec, archive.read(comp_size))
+
+        ## Cut the member's tar header and data out of the decompressed blocks and extract it like a one-file tar
+        first_offset    = blocks[0][0]
+        member_data     = io.BytesIO(bytes(raw_data[start_offset - first_offset:end_offset - first_offset]))
+        with tarfile.open(fileobj=member_data, mode="r:") as tar:
+            tarinfo = tar.next()
+            tar.extract(tarinfo, target_path, filter="data")
+        logging.info(f"Restored {tarinfo.name} from {archive_path} ({len(blocks)} of the archive's blocks decompressed)")
+        return os.path.join(target_path, tarinfo.name)
+
+    def pruneInBackground(self) -> None:
+        ''' Apply the retention policy on a background thread '''
+        if self.retention:
+            self.inBackground(self.prune)
+
+    def prune(self) -> None:
+        ''' Delete archives and snapshots that fall outside the retention policy, then drop snapshot objects nothing refers to '''
+        with self.store_lock:
+            try:
+                catalog = backupCatalog(self.catalog_path)
+                for _, archive_path in expiredBackups(catalog.backups(), self.retention):
+                    for path in (archive_path, archive_path + ".sha256.json"):
+                        if os.path.exists(path):
+                            os.remove(path)
+                    catalog.remove(archive_path)
+                    logging.info(f"Pruned archive {archive_path}")
+
+                if not os.path.isdir(self.manifests_path):
+                    return
+                snapshots = []
+                for name in os.listdir(self.manifests_path):
+                    if name.endswith(".json"):
+                        created = dt.datetime.fromtimestamp(os.stat(os.path.join(self.manifests_path, name)).st_mtime)
+                        snapshots.append((created, name))
+                expired = expiredBackups(snapshots, self.retention)
+                for _, name in expired:
+                    os.remove(os.path.join(self.manifests_path, name))
+                    logging.info(f"Pruned snapshot {name}")
+                if expired:
+                    self.collectObjects()
+            except Exception as error:
+                logging.info(f"ERROR - Could not prune backups\n{error}")
+
+    def collectObjects(self) -> None:
+        ''' Remove objects from the snapshot store that no remaining manifest refers to '''
+        referenced = set()
+        for name in os.listdir(self.manifests_path):
+            if name.endswith(".json"):
+                with open(os.path.join(self.manifests_path, name), "r") as manifest:
+                    referenced.update(entry["hash"] for entry in json.load(manifest)["files"].values())
+
+        for root, _, file_names in os.walk(self.objects_path):
+            for file_name in file_names:
+                if file_name not in referenced and not file_name.startswith(".incoming-"):
+                    os.remove(os.path.join(root, file_name))
+
+    def verify(self, archive_path) -> bool:
+        ''' Re-check an archive against its saved checksum manifest; an archive that can't be read back (e.g. a corrupted block) fails '''
+        with open(archive_path + ".sha256.json", "r") as manifest:
+            expected = json.load(manifest)
+        try:
+            return self.checksumArchive(archive_path) == expected
+        except Exception as error:
+            logging.info(f"ERROR - Could not read archive {archive_path} back\n{error}")
+            return False
+
+if __name__ == "__main__":
+    logging.basicConfig(level = logging.INFO)
+
+    usage = ("Proper Usage:\n\tpython3 zomboidBackup.py --restore /path/to/backups/snapshots/manifests/<snapshot>.json /path/to/world_dict\
+        \n\tpython3 zomboidBackup.py --verify /path/to/backups/<archive>.tgz\
+        \n\tpython3 zomboidBackup.py --restore-file /path/to/backups/<archive>.tgz servertest/map/map_1_1.bin /path/to/restore_dir\
+        \n\n\t--restore:\n\t\tRecreates the world directory exactly as it was when the snapshot was taken.\
+        \n\t--verify:\n\t\tDecompresses an archive and compares it against the checksum manifest written when it was created.\
+        \n\t--restore-file:\n\t\tRestores a single file from a cataloged archive without decompressing the rest of it.")
+
+    if len(sys.argv) == 4 and sys.argv[1] == "--restore":
+        manifest_path   = sys.argv[2]
+        backup_path     = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(manifest_path))))
+        zomboidBackup(None, backup_path).restore(manifest_path, sys.argv[3])
+    elif len(sys.argv) == 5 and sys.argv[1] == "--restore-file":
+        zomboidBackup(None, os.path.dirname(os.path.abspath(sys.argv[2]))).restoreFile(sys.argv[2], sys.argv[3], sys.argv[4])
+    elif len(sys.argv) == 3 and sys.argv[1] == "--verify":
+        archive_verified = zomboidBackup(None, os.path.dirname(sys.argv[2])).verify(sys.argv[2])
+        logging.info(f"Archive verified: {archive_verified}")
+        exit(0 if archive_verified else 1)
+    else:
+        print(f"missing or invalid argument(s). Please try again.\n{usage}")
+        exit(1)
@@ -0,0 +1,128 @@
+#!/usr/bin/env python3
+
+import os
+import re
+import abc
+import json
+import logging
+import threading as th
+
+## Created by https://steamcommunity.com/id/Mr_Pink47/
+## © 2024 - Open Source - Free to share and modify
+
+## README: Reads servertest.ini and server_config.json, re-parsing each file only when it has changed on disk
+## A file counts as changed when its inode, mtime or size differs from the last read, so checking costs a single stat().
+## servertest.ini is parsed in full into typed values (lists for Mods=, WorkshopItems= and Map=, booleans, and numbers for the known numeric settings),
+## and reload() returns what changed since the previous read, which zomboid_server_manager.py applies while it keeps running.
+
+## servertest.ini settings holding ";"-separated lists
+INI_LIST_SETTINGS   = ("Mods", "WorkshopItems", "Map")
+INI_PORT_SETTINGS   = ("DefaultPort", "UDPPort", "RCONPort", "SteamPort1", "SteamPort2")
+## servertest.ini settings holding numbers; every other value stays a string, so passwords, IDs and names keep their leading zeros
+INI_INT_SETTINGS    = INI_PORT_SETTINGS + ("MaxPlayers", "PingLimit", "SaveWorldEveryMinutes", "BackupsCount", "BackupsPeriod", "MaxAccountsPerUser",
+                                           "HoursForLootRespawn", "MaxItemsForLootRespawn", "SafehouseDaySurvivedToClaim", "SafeHouseRemovalTime",
+                                           "MaxSafezoneSize", "FactionDaySurvivedToCreate", "FactionPlayersRequiredForTag", "ItemNumbersLimitPerContainer")
+INI_FLOAT_SETTINGS  = ("MinutesPerPage", "FastForwardMultiplier", "SpeedLimit", "PVPMeleeDamageModifier", "PVPFirearmDamageModifier", "CarEngineAttractionModifier")
+INI_NUMBER_PATTERN  = re.compile(r"-?\d+(\.\d+)?")
+
+def fileSignature(path) -> tuple:
+    ''' Return (inode, mtime, size) of a file; any of them changing means the file has to be read again '''
+    stat = os.stat(path)
+    return stat.st_ino, stat.st_mtime_ns, stat.st_size
+
+def diffSettings(previous, current) -> dict:
+    ''' Compare two {setting: value} dicts; returns {"added": {...}, "removed": {...}, "changed": {setting: (old, new)}} '''
+    return {
+        "added"   : {key: value for key, value in current.items() if key not in previous},
+        "removed" : {key: value for key, value in previous.items() if key not in current},
+        "changed" : {key: (previous[key], value) for key, value in current.items() if key in previous and previous[key] != value},
+    }
+
+def parseIniValue(key, value):
+    ''' Convert one servertest.ini value to its type: a list for list settings, bool for true/false, a number for the numeric settings, else the string '''
+    if key in INI_LIST_SETTINGS:
+        return [item.strip() for item in value.split(";") if item.strip()]
+    if value.lower() in ("true", "false"):
+        return value.lower() == "true"
+    ## A numeric setting that doesn't hold a number is kept as written rather than guessed at
+    if key in INI_INT_SETTINGS + INI_FLOAT_SETTINGS and INI_NUMBER_PATTERN.fullmatch(value):
+        return int(value) if key in INI_INT_SETTINGS and "." not in value else float(value)
+    return value
+
+class cachedConfigFile(abc.ABC):
+    ''' A class to hold a config file's parsed contents and read it again only after it has changed on disk '''
+
+    def __init__(self, path) -> None:
+        ''' Constructor to declare the file; nothing is read until load() '''
+        self.path       = path
+        self.signature  = None
+        self.settings   = {}
+        self.lock       = th.Lock()
+
+    @abc.abstractmethod
+    def parse(self, text) -> dict:
+        ''' Turn the file's text into a settings dict; each kind of config file implements this '''
+
+    def load(self) -> dict:
+        ''' Return the parsed settings, parsing the file again only if it changed since the last read '''
+        self.reload()
+        return self.settings
+
+    def reload(self):
+        ''' Read the file again if it changed; returns the diff against the previous read, or None if it is unchanged '''
+        with self.lock:
+            signature = fileSignature(self.path)
+            if signature == self.signature:
+                return None
+            with open(self.path, "r") as config_file:
+                settings = self.parse(config_file.read())
+            previous        = self.settings
+            self.settings   = settings
+            self.signature  = signature
+            return diffSettings(previous, settings)
+
+class serverIni(cachedConfigFile):
+    ''' A class to parse a Zomboid servertest.ini into typed settings '''
+
+    def parse(self, text) -> dict:
+        ''' Parse every Key=Value line; "#" comment lines are skipped and the first occurrence of a key wins '''
+        settings = {}
+        for line in text.splitlines():
+            line = line.strip()
+            if not line or line.startswith("#") or "=" not in line:
+                continue
+            key, value = line.split("=", 1)
+            settings.setdefault(key.strip(), parseIniValue(key.strip(), value.strip()))
+        return settings
+
+    def workshopIds(self) -> list:
+        ''' Return the WorkshopItems= IDs in servertest.ini order, without duplicates '''
+        return list(dict.fromkeys(self.load().get("WorkshopItems", [])))
+
+    def mods(self) -> list:
+        ''' Return the Mods= mod IDs '''
+        return self.load().get("Mods", [])
+
+    def maps(self) -> list:
+        ''' Return the Map= folders '''
+        return self.load().get("Map", [])
+
+    def ports(self) -> dict:
+        ''' Return every port the server listens on, by setting name '''
+        settings = self.load()
+        return {key: settings[key] for key in INI_PORT_SETTINGS if key in settings}
+
+class managerConfig(cachedConfigFile):
+    ''' A class to read server_config.json '''
+
+    def parse(self, text) -> dict:
+        ''' Parse the JSON; a file caught half-written by an editor raises ValueError and is read again next time '''
+        return json.loads(text)
+
+    def reload(self):
+        ''' Read server_config.json again if it changed, keeping the previous settings if the new ones don't parse '''
+        try:
+            return super().reload()
+        except ValueError as error:
+            logging.info(f"ERROR - {self.path} is not valid JSON; keeping the previous settings\n{error}")
+            return None
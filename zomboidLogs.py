@@ -0,0 +1,191 @@
+#!/usr/bin/env python3
+
+import os
+import re
+import glob
+import sqlite3
+import logging
+import time as t
+import threading as th
+
+## Created by https://steamcommunity.com/id/Mr_Pink47/
+## © 2024 - Open Source - Free to share and modify
+
+## README: Follows the Zomboid server's own logs (server-console.txt and the files in Zomboid/Logs) and indexes what happens in them
+## Each file is read from the offset reached last time, in large chunks, and only whole lines are consumed.
+## A file that was recreated (new inode) or truncated is read again from the start.
+## Candidate lines are found with plain substring searches for a few keywords, which run at memory speed even on multi-GB logs;
+## only those lines are matched against the event patterns. Events are stored in a SQLite index
+## that zomboid_server_manager.py (and anything else) can query by type and time.
+
+## Event types and the patterns that identify them; when a line matches several, the first type listed here wins
+LOG_EVENT_PATTERNS = {
+    "startup"           : rb"SERVER STARTED",
+    "save_started"      : rb"[Ss]aving (?:the )?(?:game|world|map)\b",
+    "save_finished"     : rb"(?:[Gg]ame|[Ww]orld|[Mm]ap) saved|[Ss]ave (?:finished|complete)",
+    "player_connect"    : rb"\[fully-connected\]|[Pp]layer connected",
+    "player_disconnect" : rb"\[disconnect\]|[Pp]layer disconnected",
+    "mod_error"         : rb"(?:[Mm]od|[Ww]orkshop(?: item)?) [^\n]*?(?:not found|failed|missing)",
+    "exception"         : rb"^ERROR\b|\w(?:Exception|Error)\b",
+}
+
+## Every line an event pattern can match contains at least one of these
+LOG_EVENT_KEYWORDS = (
+    b"SERVER STARTED", b"aving", b"saved", b"ave finished", b"ave complete", b"fully-connected", b"layer connected",
+    b"disconnect", b"not found", b"failed", b"missing", b"ERROR", b"Exception", b"Error",
+)
+
+class logIndex():
+    ''' A class to store parsed log events and each followed file's read offset in a SQLite database '''
+
+    def __init__(self, index_path, retention_days=14) -> None:
+        ''' Constructor to create the index tables if they don't exist yet '''
+        self.index_path     = index_path
+        self.retention_days = retention_days
+        self.lock           = th.Lock()
+        with self.connect() as index:
+            index.executescript('''
+                CREATE TABLE IF NOT EXISTS events  (time REAL, type TEXT, path TEXT, offset INTEGER, line TEXT);
+                CREATE TABLE IF NOT EXISTS offsets (path TEXT PRIMARY KEY, inode INTEGER, offset INTEGER);
+                CREATE INDEX IF NOT EXISTS events_by_type ON events (type, time);
+                CREATE INDEX IF NOT EXISTS events_by_time ON events (time);
+            ''')
+
+    def connect(self) -> sqlite3.Connection:
+        ''' Open a connection; one per call keeps the index safe to use from worker threads '''
+        return sqlite3.connect(self.index_path, timeout=30)
+
+    def offsets(self) -> dict:
+        ''' Return {path: (inode, offset)} for every followed file '''
+        with self.connect() as index:
+            return {path: (inode, offset) for path, inode, offset in index.execute("SELECT path, inode, offset FROM offsets")}
+
+    def record(self, events, offsets) -> None:
+        ''' Store new events and the offsets they were read up to in one transaction, dropping events past the retention period '''
+        with self.lock, self.connect() as index:
+            index.executemany("INSERT INTO events VALUES (?, ?, ?, ?, ?)", [(event["time"], event["type"], event["path"], event["offset"], event["line"]) for event in events])
+            index.execute("DELETE FROM offsets")
+            index.executemany("INSERT INTO offsets VALUES (?, ?, ?)", [(path, inode, offset) for path, (inode, offset) in offsets.items()])
+            if self.retention_days:
+                index.execute("DELETE FROM events WHERE time < ?", (t.time() - self.retention_days * 86400,))
+
+    def events(self, event_type=None, since=None, limit=100) -> list:
+        ''' Return the newest events (optionally of one type and after a unix time) as dicts, newest first '''
+        query   = "SELECT time, type, path, offset, line FROM events WHERE 1 = 1"
+        params  = []
+        if event_type:
+            query += " AND type = ?"
+            params.append(event_type)
+        if since is not None:
+            query += " AND time >= ?"
+            params.append(since)
+        query += " ORDER BY time DESC, rowid DESC LIMIT ?"
+        params.append(limit)
+        with self.connect() as index:
+            return [{"time": row[0], "type": row[1], "path": row[2], "offset": row[3], "line": row[4]} for row in index.execute(query, params)]
+
+    def latest(self, event_type):
+        ''' Return the newest event of one type, or None '''
+        events = self.events(event_type, limit=1)
+        return events[0] if events else None
+
+    def counts(self, since=None) -> dict:
+        ''' Return {event type: number of events}, optionally only those after a unix time '''
+        with self.connect() as index:
+            return dict(index.execute("SELECT type, COUNT(*) FROM events WHERE time >= ? GROUP BY type", (since or 0,)))
+
+class logTailer():
+    ''' A class to read new lines from the server's log files and turn them into indexed events '''
+
+    def __init__(self, index, console_path=None, logs_path=None, patterns=None, keywords=None, chunk_size=4 * 1024 * 1024) -> None:
+        ''' Constructor to declare the followed files, the event patterns and the read size '''
+        self.index          = index
+        self.console_path   = console_path
+        self.logs_path      = logs_path
+        self.line_patterns  = [(event_type, re.compile(pattern)) for event_type, pattern in (patterns or LOG_EVENT_PATTERNS).items()]
+        self.keywords       = keywords or LOG_EVENT_KEYWORDS
+        self.chunk_size     = chunk_size
+        self.lock           = th.Lock()
+
+    def followedFiles(self) -> list:
+        ''' Return server-console.txt and the current log files in Zomboid/Logs (older runs are moved into subfolders) '''
+        paths = [self.console_path] if self.console_path else []
+        if self.logs_path:
+            paths += sorted(glob.glob(os.path.join(self.logs_path, "*.txt")))
+        return [path for path in paths if os.path.isfile(path)]
+
+    def classifyLine(self, line):
+        ''' Return the event type of a candidate line, or None if no event pattern matches it '''
+        for event_type, pattern in self.line_patterns:
+            if pattern.search(line):
+                return event_type
+        return None
+
+    def parseChunk(self, chunk, path, chunk_offset, now) -> list:
+        ''' Find every event in a chunk of whole lines; each line produces at most one event '''
+        ## Collect the lines containing any keyword; bytes.find is far faster than a regex scan over the whole chunk
+        lines = {}
+        for keyword in self.keywords:
+            position = chunk.find(keyword)
+            while position >= 0:
+                line_start  = chunk.rfind(b"\n", 0, position) + 1
+                line_end    = chunk.find(b"\n", position)
+                line_end    = len(chunk) if line_end < 0 else line_end
+                lines[line_start] = line_end
+                position    = chunk.find(keyword, line_end)
+
+        events = []
+        for line_start, line_end in sorted(lines.items()):
+            event_type = self.classifyLine(chunk[line_start:line_end])
+            if not event_type:
+                continue
+            events.append({
+                "time"   : now,
+                "type"   : event_type,
+                "path"   : path,
+                "offset" : chunk_offset + line_start,
+                "line"   : chunk[line_start:line_end].rstrip(b"\r").decode("utf-8", "replace")[:1000],
+            })
+        return events
+
+    def readFile(self, path, offset, now) -> tuple:
+        ''' Read whole lines from offset to the end of the file; returns (events, new offset) '''
+        events = []
+        with open(path, "rb") as log_file:
+            log_file.seek(offset)
+            while chunk := log_file.read(self.chunk_size):
+                ## Leave a trailing partial line for the next poll, unless a single line fills the whole chunk
+                end = chunk.rfind(b"\n") + 1
+                if not end:
+                    if len(chunk) < self.chunk_size:
+                        break
+                    end = len(chunk)
+                events.extend(self.parseChunk(chunk[:end], path, offset, now))
+                offset += end
+                if end < len(chunk):
+                    log_file.seek(offset)
+        return events, offset
+
+    def poll(self) -> list:
+        ''' Read everything written since the last poll, index the events found and return them '''
+        with self.lock:
+            now         = t.time()
+            stored      = self.index.offsets()
+            offsets     = {}
+            events      = []
+            for path in self.followedFiles():
+                try:
+                    stat = os.stat(path)
+                    inode, offset = stored.get(path, (stat.st_ino, 0))
+                    ## A recreated or truncated file starts over from the beginning
+                    if inode != stat.st_ino or stat.st_size < offset:
+                        offset = 0
+                    file_events, offset = self.readFile(path, offset, now)
+                    events.extend(file_events)
+                    offsets[path] = (stat.st_ino, offset)
+                except OSError as error:
+                    logging.info(f"ERROR - Could not read log {path}\n{error}")
+                    if path in stored:
+                        offsets[path] = stored[path]
+            self.index.record(events, offsets)
+            return events
@@ -0,0 +1,232 @@
+#!/usr/bin/env python3
+
+import json
+import bisect
+import logging
+import time as t
+import datetime as dt
+import threading as th
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+## Created by https://steamcommunity.com/id/Mr_Pink47/
+## © 2024 - Open Source - Free to share and modify
+
+## README: Timings and failure counts for mod checks, backups, RCON and restarts
+## Every module records into the shared METRICS registry below. zomboid_server_manager.py serves it in the Prometheus text format
+## on a local HTTP port and appends a JSON lines dump of it to a file, so trends can be followed without parsing print() output.
+## Recording a value is a bisect and a few additions under a lock, so it is safe to do on every request.
+
+## Default histogram buckets, in seconds and in bytes
+SECONDS_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120, 300, 600)
+BYTES_BUCKETS   = tuple(1024 * 1024 * 2 ** power for power in range(0, 16, 2))
+
+def formatLabels(labels) -> str:
+    ''' Render a {name: value} dict as a Prometheus label set '''
+    if not labels:
+        return ""
+    pairs = []
+    for name, value in labels.items():
+        escaped = str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+        pairs.append(f'{name}="{escaped}"')
+    return "{" + ",".join(pairs) + "}"
+
+class metricCounter():
+    ''' A class for a monotonically increasing count, optionally split by label values '''
+
+    def __init__(self, name, description, labelnames=(), lock=None) -> None:
+        ''' Constructor to declare the counter and its per-label values '''
+        self.name           = name
+        self.description    = description
+        self.labelnames     = tuple(labelnames)
+        self.values         = {}
+        self.lock           = lock or th.Lock()
+
+    def inc(self, amount=1, **labels) -> None:
+        ''' Add amount to the count for the given label values '''
+        key = tuple(str(labels.get(name, "")) for name in self.labelnames)
+        with self.lock:
+            self.values[key] = self.values.get(key, 0) + amount
+
+    def exposition(self) -> list:
+        ''' Return the counter's lines in the Prometheus text format '''
+        lines = [f"# HELP {self.name} {self.description}", f"# TYPE {self.name} counter"]
+        with self.lock:
+            for key, value in self.values.items():
+                lines.append(f"{self.name}{formatLabels(dict(zip(self.labelnames, key)))} {value}")
+        return lines
+
+    def snapshot(self) -> list:
+        ''' Return the counter's values as JSON-friendly dicts '''
+        with self.lock:
+            return [{"labels": dict(zip(self.labelnames, key)), "value": value} for key, value in self.values.items()]
+
+class metricHistogram():
+    ''' A class for a distribution of observed values in cumulative buckets, optionally split by label values '''
+
+    def __init__(self, name, description, buckets=SECONDS_BUCKETS, labelnames=(), lock=None) -> None:
+        ''' Constructor to declare the bucket bounds and the per-label series '''
+        self.name           = name
+        self.description    = description
+        self.buckets        = tuple(sorted(buckets))
+        self.labelnames     = tuple(labelnames)
+        self.series         = {}
+        self.lock           = lock or th.Lock()
+
+    def observe(self, value, **labels) -> None:
+        ''' Record one value for the given label values '''
+        key     = tuple(str(labels.get(name, "")) for name in self.labelnames)
+        index   = bisect.bisect_left(self.buckets, value)
+        with self.lock:
+            series = self.series.get(key)
+            if series is None:
+                ## Per-bucket (not yet cumulative) counts, with the last slot for values above every bound
+                series = self.series[key] = {"counts": [0] * (len(self.buckets) + 1), "sum": 0.0, "count": 0}
+            series["counts"][index] += 1
+            series["sum"]           += value
+            series["count"]         += 1
+
+    def time(self, **labels):
+        ''' Return a context manager that observes how long its block took '''
+        return metricTimer(self, labels)
+
+    def cumulative(self, series) -> list:
+        ''' Turn a series' per-bucket counts into (upper bound, cumulative count) pairs '''
+        running = 0
+        pairs   = []
+        for bound, count in zip(self.buckets + (float("inf"),), series["counts"]):
+            running += count
+            pairs.append((bound, running))
+        return pairs
+
+    def exposition(self) -> list:
+        ''' Return the histogram's lines in the Prometheus text format '''
+        lines = [f"# HELP {self.name} {self.description}", f"# TYPE {self.name} histogram"]
+        with self.lock:
+            for key, series in self.series.items():
+                labels = dict(zip(self.labelnames, key))
+                for bound, count in self.cumulative(series):
+                    lines.append(f"{self.name}_bucket{formatLabels({**labels, 'le': '+Inf' if bound == float('inf') else repr(float(bound))})} {count}")
+                lines.append(f"{self.name}_sum{formatLabels(labels)} {series['sum']}")
+                lines.append(f"{self.name}_count{formatLabels(labels)} {series['count']}")
+        return lines
+
+    def snapshot(self) -> list:
+        ''' Return the histogram's series as JSON-friendly dicts '''
+        with self.lock:
+            return [{
+                "labels"  : dict(zip(self.labelnames, key)),
+                "count"   : series["count"],
+                "sum"     : series["sum"],
+                "buckets" : {"+Inf" if bound == float("inf") else str(bound): count for bound, count in self.cumulative(series)},
+            } for key, series in self.series.items()]
+
+class metricTimer():
+    ''' A context manager observing the duration of its block into a histogram '''
+
+    def __init__(self, histogram, labels) -> None:
+        self.histogram  = histogram
+        self.labels     = labels
+        self.started    = None
+
+    def __enter__(self):
+        self.started = t.perf_counter()
+        return self
+
+    def __exit__(self, *exc_info) -> bool:
+        self.histogram.observe(t.perf_counter() - self.started, **self.labels)
+        return False
+
+class metricsRegistry():
+    ''' A class holding every metric so they can be rendered or dumped together '''
+
+    def __init__(self) -> None:
+        ''' Constructor to declare the registered metrics, in registration order '''
+        self.metrics    = {}
+        self.lock       = th.Lock()
+
+    def counter(self, name, description, labelnames=()) -> metricCounter:
+        ''' Register (or return the already registered) counter called name '''
+        return self.metrics.setdefault(name, metricCounter(name, description, labelnames, self.lock))
+
+    def histogram(self, name, description, buckets=SECONDS_BUCKETS, labelnames=()) -> metricHistogram:
+        ''' Register (or return the already registered) histogram called name '''
+        return self.metrics.setdefault(name, metricHistogram(name, description, buckets, labelnames, self.lock))
+
+    def exposition(self) -> str:
+        ''' Render every metric in the Prometheus text exposition format '''
+        lines = []
+        for metric in list(self.metrics.values()):
+            lines.extend(metric.exposition())
+        return "\n".join(lines) + "\n"
+
+    def snapshot(self) -> dict:
+        ''' Return every metric's current values as a JSON-friendly dict '''
+        return {name: metric.snapshot() for name, metric in list(self.metrics.items())}
+
+    def dump(self, dump_path) -> None:
+        ''' Append the current values of every metric to a JSON lines file '''
+        try:
+            with open(dump_path, "a") as dump_file:
+                dump_file.write(json.dumps({"time": dt.datetime.now().isoformat(), "metrics": self.snapshot()}) + "\n")
+        except Exception as error:
+            logging.info(f"ERROR - Could not write metrics to {dump_path}\n{error}")
+
+class metricsServer():
+    ''' A class serving a registry in the Prometheus text format from a background HTTP server thread '''
+
+    def __init__(self, registry, host="127.0.0.1", port=9108) -> None:
+        ''' Constructor to declare the registry and where to listen '''
+        self.registry   = registry
+        self.host       = host
+        self.port       = port
+        self.httpd      = None
+
+    def start(self) -> int:
+        ''' Start listening and return the bound port (useful when port is 0) '''
+        registry = self.registry
+
+        class metricsHandler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                if self.path.split("?")[0] not in ("/", "/metrics"):
+                    self.send_error(404)
+                    return
+                body = registry.exposition().encode("utf-8")
+                self.send_response(200)
+                self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format, *args):
+                pass
+
+        self.httpd      = ThreadingHTTPServer((self.host, self.port), metricsHandler)
+        self.httpd.daemon_threads = True
+        self.port       = self.httpd.server_address[1]
+        th.Thread(target=self.httpd.serve_forever, name="metrics-server", daemon=True).start()
+        logging.info(f"Serving metrics on http://{self.host}:{self.port}/metrics")
+        return self.port
+
+    def close(self) -> None:
+        ''' Stop the HTTP server '''
+        if self.httpd:
+            self.httpd.shutdown()
+            self.httpd.server_close()
+            self.httpd = None
+
+## The registry every module records into, and the metrics it exposes
+METRICS                 = metricsRegistry()
+WORKSHOP_FETCH_SECONDS  = METRICS.histogram("zomboid_workshop_fetch_seconds", "Time to fetch and parse one workshop page", labelnames=("status",))
+WORKSHOP_API_SECONDS    = METRICS.histogram("zomboid_workshop_api_batch_seconds", "Time for one GetPublishedFileDetails batch")
+WORKSHOP_FAILURES       = METRICS.counter("zomboid_workshop_failures_total", "Workshop lookups that failed", labelnames=("source",))
+MOD_CHECK_SECONDS       = METRICS.histogram("zomboid_mod_check_seconds", "Time to look up every mod's timestamp in one check")
+MOD_LOOKUPS             = METRICS.counter("zomboid_mod_lookups_total", "Workshop mods looked up or skipped by mod checks", labelnames=("result",))
+BACKUP_SECONDS          = METRICS.histogram("zomboid_backup_seconds", "Time to write one world backup", labelnames=("server", "mode"))
+BACKUP_BYTES            = METRICS.histogram("zomboid_backup_bytes", "Uncompressed world bytes read by one backup", buckets=BYTES_BUCKETS, labelnames=("server", "mode"))
+BACKUP_FAILURES         = METRICS.counter("zomboid_backup_failures_total", "World backups that raised an error", labelnames=("server",))
+RCON_SECONDS            = METRICS.histogram("zomboid_rcon_roundtrip_seconds", "Time from sending an RCON command to its response")
+RCON_FAILURES           = METRICS.counter("zomboid_rcon_failures_total", "RCON commands that failed after reconnecting")
+RESTART_DOWNTIME        = METRICS.histogram("zomboid_restart_downtime_seconds", "Time from quit to the restarted server being ready", labelnames=("server",))
+RESTART_FAILURES        = METRICS.counter("zomboid_restart_failures_total", "Restarts after which the server did not become ready", labelnames=("server",))
+SAVE_SECONDS            = METRICS.histogram("zomboid_save_seconds", "Time from sending save to the world being written", labelnames=("server",))
+LOG_EVENTS              = METRICS.counter("zomboid_log_events_total", "Events found in the server's logs", labelnames=("server", "type"))
@@ -0,0 +1,143 @@
+#!/usr/bin/env python3
+
+import os
+import json
+import math
+import random
+import logging
+import threading as th
+
+## Created by https://steamcommunity.com/id/Mr_Pink47/
+## © 2024 - Open Source - Free to share and modify
+
+## README: Decides which workshop mods each mod check looks up, so mods that rarely change aren't asked about every 30 minutes
+## Every lookup is recorded in a per-mod update history. Each mod's change rate is estimated from how often it has updated,
+## with older updates counting for less, and the mod is looked up again once the chance that it has changed since its last
+## lookup reaches change_probability. Mods updated in the last day are looked up on every check, since fixes tend to follow.
+## Next lookup times are jittered so mods don't bunch up on the same check, every lookup backs off when Steam answers
+## 429 Too Many Requests, and all of a server's mods are looked up in the last checks before its planned restart.
+## bench/modPollingReplay.py compares the polling against a fixed sweep over recorded or generated update histories.
+
+## Updates kept per mod; older ones barely count towards the change rate anyway
+MAX_UPDATES     = 32
+## What a mod with no history is assumed to do: one update per PRIOR_SECONDS, worth that much observation time
+PRIOR_UPDATES   = 1
+PRIOR_SECONDS   = 24 * 60 * 60
+
+class modUpdateHistory():
+    ''' A class to persist each workshop mod's last seen timestamp, lookup times and update history as one JSON file '''
+
+    def __init__(self, history_path=None) -> None:
+        ''' Constructor to load the history file; without a path the history is only kept in memory '''
+        self.history_path   = history_path
+        self.mods           = {}
+        self.lock           = th.Lock()
+
+        try:
+            if self.history_path and os.path.exists(self.history_path):
+                with open(self.history_path, "r") as history_file:
+                    self.mods = json.load(history_file)
+        except Exception as error:
+            logging.info(f"ERROR - Could not read mod history, starting empty\n{error}")
+            self.mods = {}
+
+    def entry(self, workshop_id, timestamp, now) -> dict:
+        ''' Return a mod's history, starting one at its current timestamp the first time the mod is seen '''
+        return self.mods.setdefault(workshop_id, {"timestamp": timestamp, "first_seen": now, "last_checked": now, "next_check": now, "updates": []})
+
+    def lastSeen(self, workshop_ids) -> dict:
+        ''' Return {workshop_id: timestamp} as last looked up, for the mods that have been looked up before '''
+        with self.lock:
+            return {workshop_id: self.mods[workshop_id]["timestamp"] for workshop_id in workshop_ids if workshop_id in self.mods}
+
+    def save(self) -> None:
+        ''' Write the history back to disk '''
+        if not self.history_path:
+            return
+        try:
+            with self.lock:
+                temp_path = f"{self.history_path}.tmp"
+                with open(temp_path, "w") as history_file:
+                    json.dump(self.mods, history_file)
+                os.replace(temp_path, self.history_path)
+        except Exception as error:
+            logging.info(f"ERROR - Could not write mod history\n{error}")
+
+class modPollScheduler():
+    ''' A class to pick the workshop mods due for a lookup from their update history, and to back off while Steam rate limits '''
+
+    def __init__(self, history, adaptive=True, min_interval=30 * 60, max_interval=24 * 60 * 60, change_probability=0.02,
+                 half_life=14 * 24 * 60 * 60, recent_window=24 * 60 * 60, jitter=0.1, backoff=15 * 60, seed=None) -> None:
+        ''' Constructor to declare the polling bounds; with adaptive False every mod is due on every check, as before '''
+        self.history            = history
+        self.adaptive           = adaptive
+        self.min_interval       = min_interval # Normally the mod check interval, since nothing is looked up between checks
+        self.max_interval       = max_interval
+        self.change_probability = change_probability
+        self.half_life          = half_life # An update this old counts half as much towards the change rate
+        self.recent_window      = recent_window
+        self.jitter             = jitter
+        self.min_backoff        = backoff
+        self.backoff            = 0
+        self.backoff_until      = 0
+        self.random             = random.Random(seed)
+
+    def changeRate(self, entry, now) -> float:
+        ''' Estimate a mod's updates per second: decayed update count over decayed observation time, plus the prior '''
+        decay           = self.half_life / math.log(2)
+        updates         = sum(math.exp(-max(0, now - update) / decay) for update in entry["updates"])
+        observed        = decay * (1 - math.exp(-max(0, now - entry["first_seen"]) / decay))
+        return (updates + PRIOR_UPDATES) / (observed + PRIOR_SECONDS)
+
+    def pollInterval(self, entry, now) -> float:
+        ''' Seconds until the chance that the mod has changed reaches change_probability, within min_interval and max_interval '''
+        if entry["updates"] and now - entry["updates"][-1] < self.recent_window:
+            return self.min_interval
+        interval = -math.log(1 - self.change_probability) / self.changeRate(entry, now)
+        return min(max(interval, self.min_interval), self.max_interval)
+
+    def dueMods(self, workshop_ids, now, priority_ids=()) -> list:
+        ''' Return the mods to look up on this check: priority mods first, then every mod past its next lookup time, most overdue first '''
+        if not self.adaptive:
+            return list(workshop_ids)
+        priority    = set(priority_ids)
+        due         = []
+        with self.history.lock:
+            for workshop_id in workshop_ids:
+                entry = self.history.mods.get(workshop_id)
+                if workshop_id in priority or entry is None or entry["next_check"] <= now:
+                    due.append((workshop_id not in priority, entry["next_check"] if entry else 0, workshop_id))
+        return [workshop_id for not_priority, next_check, workshop_id in sorted(due)]
+
+    def observe(self, remote_timestamps, now) -> list:
+        ''' Record the timestamps just looked up and schedule each mod's next lookup; returns the mods that changed '''
+        changed = []
+        with self.history.lock:
+            for workshop_id, timestamp in remote_timestamps.items():
+                known = workshop_id in self.history.mods
+                entry = self.history.entry(workshop_id, timestamp, now)
+                ## A failed lookup also comes back as None, so a mod going to None is never counted as an update
+                if known and timestamp is not None and entry["timestamp"] != timestamp:
+                    ## API timestamps are the update's own epoch; scraped dates only tell that it happened since the last lookup
+                    updated_at          = min(int(timestamp), now) if str(timestamp).isdigit() else now
+                    entry["updates"]    = (entry["updates"] + [updated_at])[-MAX_UPDATES:]
+                    entry["timestamp"]  = timestamp
+                    changed.append(workshop_id)
+                entry["last_checked"]   = now
+                entry["next_check"]     = now + self.pollInterval(entry, now) * self.random.uniform(1 - self.jitter, 1 + self.jitter)
+        return changed
+
+    def backingOff(self, now) -> bool:
+        ''' Report whether lookups are paused after Steam rate limited them '''
+        return now < self.backoff_until
+
+    def rateLimited(self, now, retry_after=None) -> float:
+        ''' Pause every lookup after a 429, twice as long as last time if the previous check was rate limited too; returns the pause '''
+        self.backoff        = min(max(self.backoff * 2, self.min_backoff), self.max_interval)
+        pause               = max(self.backoff, retry_after or 0) * self.random.uniform(1, 1 + self.jitter)
+        self.backoff_until  = now + pause
+        return pause
+
+    def clearBackoff(self) -> None:
+        ''' Reset the backoff after a check Steam answered in full '''
+        self.backoff = 0
@@ -0,0 +1,113 @@
+#!/usr/bin/env python3
+
+import os
+import json
+import signal
+import logging
+import psutil as ps
+import subprocess as sp
+
+## Created by https://steamcommunity.com/id/Mr_Pink47/
+## © 2024 - Open Source - Free to share and modify
+
+## README: Launches the Zomboid server and keeps track of exactly the processes it started
+## The spawned PID and its start time are written to a pidfile, so a restarted manager can find (and only find) its own server again.
+## Stopping sends SIGTERM to the whole process tree, waits for it to exit, and only then escalates to SIGKILL.
+
+class zomboidProcess():
+    ''' A class to start, find and stop the Zomboid server process tree launched by the manager '''
+
+    def __init__(self, start_cmd, pidfile_path, binary_process_name=None) -> None:
+        ''' Constructor to declare the start command and where the running server is recorded '''
+        ## Drop a trailing "&"; the server is detached with its own session instead, which keeps its PID known
+        self.start_cmd              = start_cmd.strip().rstrip("&").strip()
+        self.pidfile_path           = pidfile_path
+        self.binary_process_name    = binary_process_name
+        self.popen                  = None
+
+    def start(self):
+        ''' Launch the server in its own session, record it in the pidfile and return its PID, or None if it exited before it was recorded '''
+        self.popen = sp.Popen(self.start_cmd, shell=True, start_new_session=True, stdin=sp.DEVNULL)
+        try:
+            create_time = ps.Process(self.popen.pid).create_time()
+        except ps.NoSuchProcess:
+            ## Already gone, so reaping it doesn't block; nothing is recorded, so isRunning() stays False
+            try:
+                exit_code = self.popen.wait(timeout=5)
+            except sp.TimeoutExpired:
+                exit_code = None
+            logging.info(f"ERROR - Server process {self.popen.pid} exited before it could be recorded (exit code {exit_code})")
+            self.popen = None
+            return None
+        with open(self.pidfile_path, "w") as pidfile:
+            json.dump({"pid": self.popen.pid, "create_time": create_time}, pidfile)
+        logging.info(f"Started server process {self.popen.pid}")
+        return self.popen.pid
+
+    def process(self):
+        ''' Return the tracked server process, or None if it isn't running; the start time guards against a reused PID '''
+        try:
+            with open(self.pidfile_path, "r") as pidfile:
+                recorded = json.load(pidfile)
+            proc = ps.Process(recorded["pid"])
+            if abs(proc.create_time() - recorded["create_time"]) < 1 and proc.status() != ps.STATUS_ZOMBIE:
+                return proc
+        except (FileNotFoundError, ValueError, KeyError, ps.Error):
+            pass
+        return None
+
+    def processTree(self) -> list:
+        ''' Return the tracked server process and all of its descendants '''
+        proc = self.process()
+        if not proc:
+            return []
+        try:
+            return [proc] + proc.children(recursive=True)
+        except ps.Error:
+            return [proc]
+
+    def binaryProcess(self):
+        ''' Return the server binary (e.g. ProjectZomboid64) within the tracked tree, falling back to the root process '''
+        tree = self.processTree()
+        for proc in tree:
+            try:
+                if self.binary_process_name and proc.name() == self.binary_process_name:
+                    return proc
+            except ps.Error:
+                continue
+        return tree[0] if tree else None
+
+    def isRunning(self) -> bool:
+        ''' Report whether the tracked server is still alive '''
+        return self.process() is not None
+
+    def stop(self, timeout) -> bool:
+        ''' SIGTERM the tracked process tree, wait up to timeout seconds for it to exit, then SIGKILL whatever is left '''
+        tree = self.processTree()
+        for proc in tree:
+            try:
+                proc.send_signal(signal.SIGTERM)
+            except ps.Error:
+                pass
+
+        gone, alive = ps.wait_procs(tree, timeout=timeout)
+        if alive:
+            logging.info(f"{len(alive)} server process(es) ignored SIGTERM for {timeout}s; sending SIGKILL")
+            for proc in alive:
+                try:
+                    proc.kill()
+                except ps.Error:
+                    pass
+            gone, alive = ps.wait_procs(alive, timeout=5)
+
+        ## Reap the shell we spawned ourselves so it doesn't linger as a zombie
+        if self.popen:
+            try:
+                self.popen.wait(timeout=1)
+            except sp.TimeoutExpired:
+                pass
+            self.popen = None
+
+        if not alive and os.path.exists(self.pidfile_path):
+            os.remove(self.pidfile_path)
+        return not alive
@@ -0,0 +1,151 @@
+#!/usr/bin/env python3
+
+import re
+import socket
+import select
+import struct
+import logging
+import threading as th
+import time as t
+from zomboidMetrics import RCON_SECONDS, RCON_FAILURES
+
+## Created by https://steamcommunity.com/id/Mr_Pink47/
+## © 2024 - Open Source - Free to share and modify
+
+## README: A minimal Source RCON protocol client used by zomboid_server_manager.py to talk to a Zomboid server
+## A single authenticated TCP connection is kept open and reused for every command, and is re-established automatically if it drops
+## A command is only retried if it never reached the server (connecting or sending failed); once sent it is never sent again
+## Protocol reference: https://developer.valvesoftware.com/wiki/Source_RCON_Protocol
+
+## Source RCON packet types
+SERVERDATA_AUTH             = 3
+SERVERDATA_AUTH_RESPONSE    = 2
+SERVERDATA_EXECCOMMAND      = 2
+SERVERDATA_RESPONSE_VALUE   = 0
+
+## Commands after which the server closes the connection instead of answering
+CLOSING_COMMANDS            = {"quit"}
+
+## Header line of the Zomboid "players" command's response, e.g. "Players connected (2):"
+PLAYERS_PATTERN             = re.compile(r"Players connected \((\d+)\)")
+
+class zomboidRcon():
+    ''' A class to send commands to a Zomboid server over one persistent RCON connection '''
+
+    def __init__(self, host, port, password, timeout=5) -> None:
+        ''' Constructor to declare variables used by the RCON client '''
+        self.host       = host
+        self.port       = int(port)
+        self.password   = password
+        self.timeout    = timeout
+        self.conn       = None
+        self.request_id = 0
+        self.lock       = th.Lock()
+
+    def nextRequestId(self) -> int:
+        ''' Return a new positive request ID so responses can be matched to the command that caused them '''
+        self.request_id = self.request_id % 0x7FFFFFFF + 1
+        return self.request_id
+
+    def connect(self) -> None:
+        ''' Open the TCP connection and authenticate with the RCON password '''
+        self.close()
+        self.conn = socket.create_connection((self.host, self.port), timeout=self.timeout)
+        self.conn.settimeout(self.timeout)
+
+        auth_id = self.nextRequestId()
+        self.sendPacket(auth_id, SERVERDATA_AUTH, self.password)
+
+        ## Some servers send an empty RESPONSE_VALUE before the AUTH_RESPONSE, so read until the auth result arrives
+        while True:
+            response_id, response_type, _ = self.receivePacket()
+            if response_type == SERVERDATA_AUTH_RESPONSE:
+                break
+
+        if response_id == -1 or response_id != auth_id:
+            self.close()
+            raise ConnectionError(f"RCON authentication to {self.host}:{self.port} failed")
+
+    def close(self) -> None:
+        ''' Close the RCON connection if one is open '''
+        if self.conn:
+            try:
+                self.conn.close()
+            except OSError:
+                pass
+        self.conn = None
+
+    def stale(self) -> bool:
+        ''' Report whether the server has closed the idle connection, without waiting or consuming anything '''
+        try:
+            readable, _, _ = select.select([self.conn], [], [], 0)
+            return bool(readable) and not self.conn.recv(1, socket.MSG_PEEK)
+        except (OSError, ValueError):
+            return True
+
+    def sendPacket(self, request_id, packet_type, body) -> None:
+        ''' Encode and send one RCON packet '''
+        payload = struct.pack("<ii", request_id, packet_type) + body.encode("utf-8") + b"\x00\x00"
+        self.conn.sendall(struct.pack("<i", len(payload)) + payload)
+
+    def receiveExactly(self, size) -> bytes:
+        ''' Read exactly size bytes from the connection '''
+        data = b""
+        while len(data) < size:
+            chunk = self.conn.recv(size - len(data))
+            if not chunk:
+                raise ConnectionError("RCON connection closed by server")
+            data += chunk
+        return data
+
+    def receivePacket(self) -> tuple:
+        ''' Read and decode one RCON packet into (request_id, packet_type, body) '''
+        (size,)                     = struct.unpack("<i", self.receiveExactly(4))
+        payload                     = self.receiveExactly(size)
+        request_id, packet_type     = struct.unpack("<ii", payload[:8])
+        return request_id, packet_type, payload[8:].rstrip(b"\x00").decode("utf-8", "replace")
+
+    def command(self, rcon_command) -> str:
+        ''' Send a command and return the server's response, reconnecting once if the command could not be sent '''
+        with self.lock:
+            for attempt in range(2):
+                try:
+                    if self.conn and self.stale():
+                        self.close()
+                    if not self.conn:
+                        self.connect()
+
+                    command_id = self.nextRequestId()
+                    started    = t.perf_counter()
+                    self.sendPacket(command_id, SERVERDATA_EXECCOMMAND, rcon_command)
+                    break
+
+                except (OSError, struct.error) as error:
+                    self.close()
+                    if attempt:
+                        RCON_FAILURES.inc()
+                        raise
+                    logging.info(f"RCON connection lost ({error}), reconnecting...")
+
+            ## The command has reached the server, so a failure from here on is never retried: it could run twice
+            try:
+                ## Skip any late responses to earlier commands that timed out
+                while True:
+                    response_id, response_type, body = self.receivePacket()
+                    if response_id == command_id and response_type == SERVERDATA_RESPONSE_VALUE:
+                        RCON_SECONDS.observe(t.perf_counter() - started)
+                        return body
+
+            except (OSError, struct.error) as error:
+                self.close()
+                ## A server shutting down closes the connection instead of answering
+                if rcon_command.strip().lower() in CLOSING_COMMANDS and isinstance(error, ConnectionError):
+                    RCON_SECONDS.observe(t.perf_counter() - started)
+                    return ""
+                RCON_FAILURES.inc()
+                raise
+
+    def playerCount(self):
+        ''' Return the number of connected players reported by the "players" command, or None if the response can't be read '''
+        match = PLAYERS_PATTERN.search(self.command("players"))
+        return int(match.group(1)) if match else None
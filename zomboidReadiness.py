@@ -0,0 +1,100 @@
+#!/usr/bin/env python3
+
+import os
+import socket
+import asyncio
+import logging
+
+## Created by https://steamcommunity.com/id/Mr_Pink47/
+## © 2024 - Open Source - Free to share and modify
+
+## README: Readiness probes used by zomboid_server_manager.py instead of fixed sleeps
+## A server counts as up once it answers an RCON command, or once its console log prints the startup marker,
+## and counts as down once nothing is listening on the RCON port anymore
+
+class zomboidReadiness():
+    ''' A class to detect when a Zomboid server has finished starting up or shutting down '''
+
+    def __init__(self, rcon, console_path=None, ready_marker="SERVER STARTED", poll_interval=1) -> None:
+        ''' Constructor to declare the probes and the console log position '''
+        self.rcon           = rcon
+        self.console_path   = console_path
+        self.ready_marker   = ready_marker.encode("utf-8")
+        self.poll_interval  = poll_interval
+        self.console_inode  = None
+        self.console_offset = 0
+        self.console_tail   = b""
+
+    def markStart(self) -> None:
+        ''' Remember where the console log currently ends so markers from a previous run are ignored '''
+        self.console_inode  = None
+        self.console_offset = 0
+        self.console_tail   = b""
+        if self.console_path and os.path.exists(self.console_path):
+            stat                = os.stat(self.console_path)
+            self.console_inode  = stat.st_ino
+            self.console_offset = stat.st_size
+
+    def consoleReady(self) -> bool:
+        ''' Read any new console output and report whether the startup marker has appeared '''
+        if not self.console_path:
+            return False
+        try:
+            stat = os.stat(self.console_path)
+        except FileNotFoundError:
+            return False
+
+        ## The server recreates server-console.txt on start; read a new or truncated file from the beginning
+        if stat.st_ino != self.console_inode or stat.st_size < self.console_offset:
+            self.console_inode  = stat.st_ino
+            self.console_offset = 0
+            self.console_tail   = b""
+
+        with open(self.console_path, "rb") as console:
+            console.seek(self.console_offset)
+            while chunk := console.read(1024 * 1024):
+                self.console_offset += len(chunk)
+                ## Keep the end of the previous chunk so a marker split across two reads is still found
+                if self.ready_marker in self.console_tail + chunk:
+                    return True
+                self.console_tail = chunk[-len(self.ready_marker):]
+        return False
+
+    def rconReady(self) -> bool:
+        ''' Report whether the server answers RCON commands '''
+        try:
+            self.rcon.command("players")
+            return True
+        except Exception:
+            return False
+
+    def rconPortOpen(self) -> bool:
+        ''' Report whether anything is still accepting connections on the RCON port '''
+        try:
+            with socket.create_connection((self.rcon.host, self.rcon.port), timeout=self.poll_interval):
+                return True
+        except OSError:
+            return False
+
+    async def waitUntilReady(self, timeout):
+        ''' Wait until either probe reports the server is up; returns the seconds waited, or None on timeout '''
+        loop    = asyncio.get_running_loop()
+        started = loop.time()
+        while loop.time() - started < timeout:
+            if self.consoleReady() or await asyncio.to_thread(self.rconReady):
+                return loop.time() - started
+            await asyncio.sleep(self.poll_interval)
+        logging.info(f"Server did not become ready within {timeout}s")
+        return None
+
+    async def waitUntilStopped(self, timeout):
+        ''' Wait until the RCON port closes; returns the seconds waited, or None on timeout '''
+        self.rcon.close()
+        loop    = asyncio.get_running_loop()
+        started = loop.time()
+        while loop.time() - started < timeout:
+            if not await asyncio.to_thread(self.rconPortOpen):
+                return loop.time() - started
+            await asyncio.sleep(self.poll_interval)
+        logging.info(f"Server was still listening on RCON after {timeout}s")
+        return None
@@ -0,0 +1,102 @@
+#!/usr/bin/env python3
+
+import collections
+import psutil as ps
+
+## Created by https://steamcommunity.com/id/Mr_Pink47/
+## © 2024 - Open Source - Free to share and modify
+
+## README: Samples the memory and CPU use of the server process tree tracked by zomboidProcess
+## Each sample sums RSS, CPU%, threads and open file descriptors over the tree and goes into a fixed-size ring buffer.
+## zomboid_server_manager.py restarts the server early when RSS or its growth rate crosses a threshold,
+## and can skip a scheduled restart while the server is still healthy. The growth rate is only judged once the server is past its
+## warm-up (a starting JVM grows quickly for a few minutes, then levels off) and the samples after it span long enough to show a trend.
+
+class resourceSampler():
+    ''' A class to sample a server process tree's resource use into a ring buffer and judge whether it needs a restart '''
+
+    def __init__(self, server_process, window=120, max_rss_mb=None, max_growth_mb_per_hour=None, min_trend_samples=10, warmup_seconds=600, min_trend_seconds=1800) -> None:
+        ''' Constructor to declare the sampled process tree, the ring buffer and the restart thresholds '''
+        self.server_process         = server_process
+        self.samples                = collections.deque(maxlen=window)
+        self.max_rss_mb             = max_rss_mb
+        self.max_growth_mb_per_hour = max_growth_mb_per_hour
+        self.min_trend_samples      = min_trend_samples
+        self.warmup_seconds         = warmup_seconds # Samples this soon after the first one are left out of the trend
+        self.min_trend_seconds      = min_trend_seconds # The samples after the warm-up must span this long before growth is judged
+        self.processes              = {}
+        self.first_sample_at        = None
+
+    def reset(self) -> None:
+        ''' Forget every sample, e.g. after the server has been restarted '''
+        self.samples.clear()
+        self.processes.clear()
+        self.first_sample_at = None
+
+    def sample(self, now):
+        ''' Sum RSS, CPU%, threads and open FDs over the tracked process tree, store the sample taken at time now and return it '''
+        tree = self.server_process.processTree()
+        if not tree:
+            return None
+
+        ## Reuse the same Process objects between samples; cpu_percent() measures against the previous call on that object
+        processes = {}
+        for proc in tree:
+            processes[proc.pid] = self.processes.get(proc.pid, proc)
+        self.processes = processes
+
+        sample = {"time": now, "rss": 0, "cpu": 0.0, "threads": 0, "fds": 0}
+        for proc in processes.values():
+            try:
+                with proc.oneshot():
+                    sample["rss"]       += proc.memory_info().rss
+                    sample["cpu"]       += proc.cpu_percent(None)
+                    sample["threads"]   += proc.num_threads()
+                    sample["fds"]       += proc.num_fds() if hasattr(proc, "num_fds") else proc.num_handles()
+            except ps.Error:
+                continue
+        self.samples.append(sample)
+        if self.first_sample_at is None:
+            self.first_sample_at = now
+        return sample
+
+    def trendSamples(self) -> list:
+        ''' Return the buffered samples taken after the warm-up, or [] while they are too few or span too short a time to judge '''
+        if self.first_sample_at is None:
+            return []
+        samples = [sample for sample in self.samples if sample["time"] - self.first_sample_at >= self.warmup_seconds]
+        if len(samples) < self.min_trend_samples or samples[-1]["time"] - samples[0]["time"] < self.min_trend_seconds:
+            return []
+        return samples
+
+    def rssGrowth(self):
+        ''' Least-squares slope of RSS over the samples after the warm-up in bytes per second, or None until there are enough of them '''
+        samples = self.trendSamples()
+        if not samples:
+            return None
+        count   = len(samples)
+        mean_t  = sum(sample["time"] for sample in samples) / count
+        mean_r  = sum(sample["rss"] for sample in samples) / count
+        spread  = sum((sample["time"] - mean_t) ** 2 for sample in samples)
+        if not spread:
+            return None
+        return sum((sample["time"] - mean_t) * (sample["rss"] - mean_r) for sample in samples) / spread
+
+    def restartReason(self):
+        ''' Return why the server should be restarted now, or None if no threshold has been crossed '''
+        if not self.samples:
+            return None
+        rss_mb = self.samples[-1]["rss"] / 1048576
+        if self.max_rss_mb and rss_mb > self.max_rss_mb:
+            return f"RSS {rss_mb:.0f} MiB is above {self.max_rss_mb} MiB"
+
+        growth = self.rssGrowth()
+        if self.max_growth_mb_per_hour and growth is not None:
+            growth_mb_per_hour = growth * 3600 / 1048576
+            if growth_mb_per_hour > self.max_growth_mb_per_hour:
+                return f"RSS growing {growth_mb_per_hour:.0f} MiB/h, above {self.max_growth_mb_per_hour} MiB/h"
+        return None
+
+    def healthy(self) -> bool:
+        ''' Report whether the samples after the warm-up are enough to tell, and none of them call for a restart '''
+        return bool(self.trendSamples()) and self.restartReason() is None
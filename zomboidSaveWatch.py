@@ -0,0 +1,185 @@
+#!/usr/bin/env python3
+
+import os
+import errno
+import struct
+import asyncio
+import ctypes
+import ctypes.util
+import logging
+
+## Created by https://steamcommunity.com/id/Mr_Pink47/
+## © 2024 - Open Source - Free to share and modify
+
+## README: Tells zomboid_server_manager.py when a world save has finished, instead of sleeping a fixed few seconds after "save"
+## The world folder is watched with inotify (through ctypes, Linux only) for files being written, created, moved or deleted.
+## Where inotify isn't available, or runs out of watches, the folder's file count, sizes and mtimes are polled instead.
+## The save counts as finished once nothing has been written for quiet_seconds, or as soon as the server logs that it has saved.
+
+## inotify constants from <sys/inotify.h>
+IN_MODIFY       = 0x00000002
+IN_CLOSE_WRITE  = 0x00000008
+IN_MOVED_FROM   = 0x00000040
+IN_MOVED_TO     = 0x00000080
+IN_CREATE       = 0x00000100
+IN_DELETE       = 0x00000200
+IN_Q_OVERFLOW   = 0x00004000
+IN_ISDIR        = 0x40000000
+IN_NONBLOCK     = os.O_NONBLOCK
+IN_CLOEXEC      = os.O_CLOEXEC
+WRITE_EVENTS    = IN_MODIFY | IN_CLOSE_WRITE | IN_MOVED_FROM | IN_MOVED_TO | IN_CREATE | IN_DELETE
+EVENT_HEADER    = struct.Struct("iIII")
+
+def loadInotify():
+    ''' Return libc with its inotify functions declared, or None where there is no inotify '''
+    try:
+        libc = ctypes.CDLL(ctypes.util.find_library("c"), use_errno=True)
+        libc.inotify_init1.argtypes     = [ctypes.c_int]
+        libc.inotify_add_watch.argtypes = [ctypes.c_int, ctypes.c_char_p, ctypes.c_uint32]
+        return libc
+    except (OSError, AttributeError, TypeError):
+        return None
+
+class inotifyWatch():
+    ''' A class watching a folder tree for writes with inotify; new subfolders are watched as they appear '''
+
+    def __init__(self, libc, world_path) -> None:
+        ''' Constructor to open the inotify instance and watch every folder under world_path; raises OSError if it can't '''
+        self.libc       = libc
+        self.folders    = {}
+        self.fd         = libc.inotify_init1(IN_NONBLOCK | IN_CLOEXEC)
+        if self.fd < 0:
+            raise OSError(ctypes.get_errno(), os.strerror(ctypes.get_errno()))
+        try:
+            for folder, subfolders, files in os.walk(world_path):
+                self.addWatch(folder)
+        except OSError:
+            self.close()
+            raise
+
+    def addWatch(self, folder) -> None:
+        ''' Watch one folder for writes; raises OSError when the watch limit (fs.inotify.max_user_watches) is reached '''
+        wd = self.libc.inotify_add_watch(self.fd, os.fsencode(folder), WRITE_EVENTS)
+        if wd < 0:
+            error = ctypes.get_errno()
+            if error in (errno.ENOENT, errno.ENOTDIR):
+                return
+            raise OSError(error, os.strerror(error), folder)
+        self.folders[wd] = folder
+
+    def changed(self) -> bool:
+        ''' Drain the queued events without blocking and report whether anything was written since the last call '''
+        changed = False
+        while True:
+            try:
+                buffer = os.read(self.fd, 64 * 1024)
+            except BlockingIOError:
+                return changed
+            offset = 0
+            while offset < len(buffer):
+                wd, mask, cookie, length = EVENT_HEADER.unpack_from(buffer, offset)
+                name    = buffer[offset + EVENT_HEADER.size:offset + EVENT_HEADER.size + length].rstrip(b"\0")
+                offset  += EVENT_HEADER.size + length
+                changed = True
+                ## Watch folders created during the save too, e.g. a new map/ column
+                if mask & IN_CREATE and mask & IN_ISDIR and wd in self.folders:
+                    try:
+                        self.addWatch(os.path.join(self.folders[wd], os.fsdecode(name)))
+                    except OSError as error:
+                        logging.info(f"Could not watch new world folder: {error}")
+
+    def close(self) -> None:
+        ''' Close the inotify instance, which drops every watch '''
+        if self.fd >= 0:
+            os.close(self.fd)
+            self.fd = -1
+
+class pollingWatch():
+    ''' A class noticing writes in a folder tree by comparing file counts, sizes and mtimes between scans '''
+
+    def __init__(self, world_path) -> None:
+        ''' Constructor to take the first scan '''
+        self.world_path = world_path
+        self.signature  = self.scan()
+
+    def scan(self) -> tuple:
+        ''' Return (file count, total size, newest mtime) over every file under the world folder '''
+        count, size, newest = 0, 0, 0
+        folders = [self.world_path]
+        while folders:
+            try:
+                with os.scandir(folders.pop()) as entries:
+                    for entry in entries:
+                        if entry.is_dir(follow_symlinks=False):
+                            folders.append(entry.path)
+                            continue
+                        stat    = entry.stat(follow_symlinks=False)
+                        count   += 1
+                        size    += stat.st_size
+                        newest  = max(newest, stat.st_mtime_ns)
+            except OSError:
+                continue
+        return count, size, newest
+
+    def changed(self) -> bool:
+        ''' Scan again and report whether anything differs from the last scan '''
+        signature       = self.scan()
+        changed         = signature != self.signature
+        self.signature  = signature
+        return changed
+
+    def close(self) -> None:
+        pass
+
+class saveWatcher():
+    ''' A class to wait for a world save to finish by watching the world folder go quiet '''
+
+    def __init__(self, world_path, quiet_seconds=2, first_write_grace=10, poll_interval=0.25, scan_interval=1) -> None:
+        ''' Constructor to declare the watched world and how long it must stay quiet '''
+        self.world_path         = world_path
+        self.quiet_seconds      = quiet_seconds
+        self.first_write_grace  = first_write_grace # A save that writes nothing at all counts as finished after this long
+        self.poll_interval      = poll_interval
+        self.scan_interval      = scan_interval # Polling fallback only; each scan stats every file in the world
+        self.libc               = loadInotify()
+        self.watch              = None
+
+    def start(self) -> None:
+        ''' Start watching the world folder; call before sending "save" so its first writes aren't missed '''
+        self.stop()
+        if self.libc:
+            try:
+                self.watch = inotifyWatch(self.libc, self.world_path)
+                return
+            except OSError as error:
+                logging.info(f"inotify unavailable for {self.world_path} ({error}); polling file mtimes instead")
+        self.watch = pollingWatch(self.world_path)
+
+    def stop(self) -> None:
+        ''' Stop watching the world folder '''
+        if self.watch:
+            self.watch.close()
+            self.watch = None
+
+    async def waitUntilSaved(self, timeout, save_logged=None):
+        ''' Wait until nothing has been written for quiet_seconds, or save_logged() reports the save; returns the seconds waited, or None on timeout '''
+        if not self.watch:
+            self.start()
+        polling         = isinstance(self.watch, pollingWatch)
+        interval        = max(self.poll_interval, self.scan_interval) if polling else self.poll_interval
+        loop            = asyncio.get_running_loop()
+        started         = loop.time()
+        last_write      = None
+        while loop.time() - started < timeout:
+            changed = await asyncio.to_thread(self.watch.changed) if polling else self.watch.changed()
+            if changed:
+                last_write = loop.time()
+            if save_logged and await save_logged():
+                return loop.time() - started
+            if last_write is None and loop.time() - started >= self.first_write_grace:
+                return loop.time() - started
+            if last_write is not None and loop.time() - last_write >= self.quiet_seconds:
+                return loop.time() - started
+            await asyncio.sleep(interval)
+        logging.info(f"World at {self.world_path} was still being written after {timeout}s")
+        return None
@@ -0,0 +1,129 @@
+#!/usr/bin/env python3
+
+import asyncio
+import logging
+import selectors
+
+## Created by https://steamcommunity.com/id/Mr_Pink47/
+## © 2024 - Open Source - Free to share and modify
+
+## README: The asyncio job scheduler that drives zomboid_server_manager.py
+## Every recurring job gets its own timer task that sleeps until the job is due, and every job run is its own task,
+## so a long restart countdown never holds up a mod update check. All timing goes through the event loop's clock,
+## which lets virtualEventLoop below run a simulated day of server cycles in seconds.
+
+class zomboidScheduler():
+    ''' A class to run recurring coroutine jobs as independent, cancellable asyncio tasks '''
+
+    def __init__(self) -> None:
+        ''' Constructor to declare the timer tasks and the job runs still in flight '''
+        self.jobs       = []
+        self.running    = set()
+
+    def every(self, interval, job, *args, delay=None) -> asyncio.Task:
+        ''' Run job(*args) every interval seconds, starting delay seconds from now (interval seconds by default) '''
+        timer = asyncio.get_running_loop().create_task(self.runEvery(interval, job, args, interval if delay is None else delay))
+        self.jobs.append(timer)
+        return timer
+
+    async def runEvery(self, interval, job, args, delay) -> None:
+        ''' Timer loop for one recurring job; due times are fixed so a slow run never pushes the next one back '''
+        loop        = asyncio.get_running_loop()
+        next_due    = loop.time() + delay
+        while True:
+            await asyncio.sleep(max(0, next_due - loop.time()))
+            next_due += interval
+            self.spawn(job(*args))
+
+    def spawn(self, coroutine) -> asyncio.Task:
+        ''' Start a coroutine as a tracked task so it can be cancelled with the rest of the in-flight jobs '''
+        task = asyncio.get_running_loop().create_task(coroutine)
+        self.running.add(task)
+        task.add_done_callback(self.finished)
+        return task
+
+    def finished(self, task) -> None:
+        ''' Drop a finished job run and log any error it raised '''
+        self.running.discard(task)
+        if not task.cancelled() and task.exception():
+            logging.error(f"Scheduled job failed: {task.exception()!r}")
+
+    def cancel(self, timer) -> None:
+        ''' Stop one recurring timer returned by every() '''
+        timer.cancel()
+        if timer in self.jobs:
+            self.jobs.remove(timer)
+
+    def cancelJobs(self) -> None:
+        ''' Stop every recurring timer; job runs already in flight keep going '''
+        for timer in self.jobs:
+            timer.cancel()
+        self.jobs.clear()
+
+    def cancelRunning(self) -> list:
+        ''' Cancel every job run still in flight, except the task calling this; returns the cancelled tasks so they can be awaited '''
+        current     = asyncio.current_task()
+        cancelled   = [task for task in self.running if task is not current]
+        for task in cancelled:
+            task.cancel()
+        return cancelled
+
+class virtualSelector():
+    ''' A selector that never blocks while timers are pending; it moves the loop's virtual clock forward instead '''
+
+    def __init__(self, loop) -> None:
+        ''' Constructor to wrap the platform's default selector '''
+        self.loop       = loop
+        self.selector   = selectors.DefaultSelector()
+
+    def select(self, timeout=None):
+        ''' Return ready I/O at once, jumping the clock to the next timer when there is nothing to do '''
+        ## Work handed to threads (asyncio.to_thread) takes real time; wait for it for real instead of skipping past it
+        if timeout is None or (timeout > 0 and self.loop.executor_jobs):
+            return self.selector.select(None)
+        events = self.selector.select(0)
+        if not events and timeout > 0:
+            self.loop.virtual_time += timeout
+        return events
+
+    def register(self, fileobj, events, data=None):
+        return self.selector.register(fileobj, events, data)
+
+    def unregister(self, fileobj):
+        return self.selector.unregister(fileobj)
+
+    def modify(self, fileobj, events, data=None):
+        return self.selector.modify(fileobj, events, data)
+
+    def get_key(self, fileobj):
+        return self.selector.get_key(fileobj)
+
+    def get_map(self):
+        return self.selector.get_map()
+
+    def close(self) -> None:
+        self.selector.close()
+
+class virtualEventLoop(asyncio.SelectorEventLoop):
+    ''' An event loop on a virtual clock: asyncio.sleep() and every timer resolve instantly in wall-clock time '''
+
+    def __init__(self, start_time=0.0) -> None:
+        ''' Constructor to start the virtual clock at start_time '''
+        self.virtual_time   = start_time
+        self.executor_jobs  = 0
+        super().__init__(selector=virtualSelector(self))
+
+    def run_in_executor(self, executor, func, *args):
+        ''' Count jobs running on threads so the virtual clock holds still until they finish '''
+        future              = super().run_in_executor(executor, func, *args)
+        self.executor_jobs  += 1
+        future.add_done_callback(self.executorJobDone)
+        return future
+
+    def executorJobDone(self, future) -> None:
+        ''' Callback for a finished thread job '''
+        self.executor_jobs -= 1
+
+    def time(self) -> float:
+        ''' The loop's current virtual time in seconds '''
+        return self.virtual_time
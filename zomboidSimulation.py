@@ -0,0 +1,433 @@
+#!/usr/bin/env python3
+
+import os
+import sys
+import json
+import time as t
+import socket
+import random
+import asyncio
+import argparse
+import resource
+import psutil as ps
+import datetime as dt
+import threading as th
+import subprocess as sp
+from urllib.parse import urlsplit, parse_qs
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+## The fake server answers RCON with the stand-in the tests use
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "tests"))
+
+from stubs import fakeRconServer
+
+## Created by https://steamcommunity.com/id/Mr_Pink47/
+## © 2024 - Open Source - Free to share and modify
+
+## README: Runs zomboid_server_manager.py through many restart cycles without a Project Zomboid install
+## A fake start-server script (this file with "fake-server") answers RCON, writes server-console.txt and rewrites part of a synthetic
+## world on "save"; a fake workshop serves GetPublishedFileDetails and workshop pages, and bumps a mod now and then to cause update restarts.
+## The controller runs on zomboidScheduler.virtualEventLoop, so hours of schedule pass in seconds while backups, RCON and HTTP still
+## take real time. Downtime per restart, backup and save times, mod check latency and memory use are written to a JSON results file.
+## The manager shares this process with the harness and the fake workshop, so its own memory is the RSS it adds over the harness.
+##
+##      python3 zomboidSimulation.py --cycles 10 --output simulation_results.json
+
+## The stats container a workshop page shows; zomboidSoup's extractors read the third value as "last updated"
+WORKSHOP_PAGE = ('<html><body><div class="detailsStatsContainerRight">'
+                 '<div class="detailsStatRight">1.234 MB</div><div class="detailsStatRight">{posted}</div><div class="detailsStatRight">{updated}</div>'
+                 '</div>\n</div></body></html>')
+
+def freePort() -> int:
+    ''' Return a local TCP port nobody is listening on right now '''
+    with socket.socket() as probe:
+        probe.bind(("127.0.0.1", 0))
+        return probe.getsockname()[1]
+
+class fakeServer():
+    ''' A stand-in for the Zomboid server process: RCON, server-console.txt and world saves '''
+
+    def __init__(self, rcon_port, password, world_path, console_path, events_path, players=0, startup_seconds=0.1, save_fraction=0.1) -> None:
+        ''' Constructor to declare what the fake server answers and writes '''
+        self.rcon_port          = rcon_port
+        self.password           = password
+        self.world_path         = world_path
+        self.console_path       = console_path
+        self.events_path        = events_path
+        self.players            = players
+        self.startup_seconds    = startup_seconds
+        self.save_fraction      = save_fraction
+        self.rcon               = fakeRconServer(self.answer, password)
+        self.stopping           = th.Event()
+
+    def record(self, event) -> None:
+        ''' Append a timestamped lifecycle event for the harness to measure downtime from '''
+        with open(self.events_path, "a") as events_file:
+            events_file.write(json.dumps({"event": event, "time": t.time(), "pid": os.getpid()}) + "\n")
+
+    def console(self, line) -> None:
+        ''' Write a line to server-console.txt the way the server logs it '''
+        with open(self.console_path, "a") as console_file:
+            console_file.write(f"LOG  : General     , {int(t.time() * 1000)}> {line}\n")
+
+    def saveWorld(self) -> None:
+        ''' Rewrite a share of the world's chunk files; done before answering "save", since the virtual clock can't wait on this process '''
+        self.console("Saving world...")
+        chunks = sorted(os.listdir(self.world_path))
+        for name in random.sample(chunks, max(1, int(len(chunks) * self.save_fraction))) if chunks else []:
+            path = os.path.join(self.world_path, name)
+            size = os.path.getsize(path)
+            with open(path, "wb") as chunk_file:
+                chunk_file.write(os.urandom(size // 2) + bytes(size - size // 2))
+        self.console("World saved")
+        self.record("save")
+
+    def answer(self, command):
+        ''' Return the response to one RCON command; "quit" drops the connection without an answer, as the server does '''
+        if command == "quit":
+            self.stopping.set()
+            return None
+        if command == "players":
+            return f"Players connected ({self.players}):\n" + "".join(f"-survivor{index}\n" for index in range(self.players))
+        if command == "save":
+            self.saveWorld()
+            return "Saved"
+        if command.startswith("servermsg"):
+            return "Message sent."
+        return f"Unknown command {command}"
+
+    def run(self) -> None:
+        ''' Start up, serve RCON until "quit", then shut down the way the real server does '''
+        self.record("start")
+        ## The real server recreates server-console.txt on every start
+        with open(self.console_path, "w") as console_file:
+            console_file.write("")
+        self.console("Loading world...")
+        t.sleep(self.startup_seconds)
+
+        self.rcon.start(self.rcon_port)
+        self.console("SERVER STARTED")
+        self.record("ready")
+
+        self.stopping.wait()
+        self.rcon.close()
+        self.record("quit")
+        self.saveWorld()
+        self.console("Server is shutting down")
+
+class fakeWorkshop():
+    ''' A stand-in for the Steam workshop serving GetPublishedFileDetails and workshop pages from a dict of epochs '''
+
+    def __init__(self, workshop_ids, latency=0.0) -> None:
+        ''' Constructor to declare every mod's "last updated" epoch and the delay added to each response '''
+        self.time_updated   = {workshop_id: 1700000000 + index for index, workshop_id in enumerate(workshop_ids)}
+        self.latency        = latency
+        self.requests       = 0
+        self.lock           = th.Lock()
+        self.httpd          = None
+
+    def bump(self, workshop_id=None, updated_at=None) -> str:
+        ''' Publish an update of one mod (a random one by default) at the updated_at epoch, and return its ID '''
+        with self.lock:
+            workshop_id = workshop_id or random.choice(list(self.time_updated))
+            self.time_updated[workshop_id] = updated_at or self.time_updated[workshop_id] + 3600
+        return workshop_id
+
+    def start(self) -> int:
+        ''' Start serving on a free local port from a background thread and return the port '''
+        workshop = self
+
+        class workshopHandler(BaseHTTPRequestHandler):
+            def reply(self, body, content_type):
+                with workshop.lock:
+                    workshop.requests += 1
+                t.sleep(workshop.latency)
+                body = body.encode("utf-8")
+                self.send_response(200)
+                self.send_header("Content-Type", content_type)
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def do_POST(self):
+                form = parse_qs(self.rfile.read(int(self.headers.get("Content-Length", 0))).decode("utf-8"))
+                ids  = [values[0] for key, values in form.items() if key.startswith("publishedfileids[")]
+                with workshop.lock:
+                    details = [{"publishedfileid": workshop_id, "result": 1, "time_updated": workshop.time_updated[workshop_id]} if workshop_id in workshop.time_updated
+                               else {"publishedfileid": workshop_id, "result": 9} for workshop_id in ids]
+                self.reply(json.dumps({"response": {"result": 1, "resultcount": len(details), "publishedfiledetails": details}}), "application/json")
+
+            def do_GET(self):
+                workshop_id = parse_qs(urlsplit(self.path).query).get("id", [""])[0]
+                with workshop.lock:
+                    epoch = workshop.time_updated.get(workshop_id)
+                if epoch is None:
+                    self.send_error(404)
+                    return
+                updated = dt.datetime.fromtimestamp(epoch).strftime("%d %b, %Y @ %I:%M%p")
+                self.reply(WORKSHOP_PAGE.format(posted="1 Jan, 2023 @ 9:00am", updated=updated), "text/html")
+
+            def log_message(self, format, *args):
+                pass
+
+        self.httpd = ThreadingHTTPServer(("127.0.0.1", 0), workshopHandler)
+        self.httpd.daemon_threads = True
+        th.Thread(target=self.httpd.serve_forever, name="fake-workshop", daemon=True).start()
+        return self.httpd.server_address[1]
+
+    def close(self) -> None:
+        ''' Stop the HTTP server '''
+        if self.httpd:
+            self.httpd.shutdown()
+            self.httpd.server_close()
+
+def histogramSummary(snapshot) -> dict:
+    ''' Add up every label series of a histogram snapshot into {count, total_seconds, mean_seconds} '''
+    count = sum(series["count"] for series in snapshot)
+    total = sum(series["sum"] for series in snapshot)
+    return {"count": count, "total": round(total, 4), "mean": round(total / count, 4) if count else None}
+
+class rssSampler():
+    ''' A class to sample this process's RSS with psutil from a thread, so the peak is caught however fast the virtual clock runs '''
+
+    def __init__(self, interval=0.05) -> None:
+        ''' Constructor to declare the sampling interval in real seconds '''
+        self.process    = ps.Process()
+        self.interval   = interval
+        self.baseline   = None
+        self.peak       = 0
+        self.stopping   = th.Event()
+        self.thread     = None
+
+    def sample(self) -> None:
+        ''' Record the current RSS if it is the highest so far '''
+        self.peak = max(self.peak, self.process.memory_info().rss)
+
+    def start(self) -> None:
+        ''' Take the baseline and start sampling '''
+        self.baseline   = self.process.memory_info().rss
+        self.peak       = self.baseline
+        self.thread     = th.Thread(target=self.run, daemon=True)
+        self.thread.start()
+
+    def run(self) -> None:
+        ''' Sample every interval until stopped '''
+        while not self.stopping.wait(self.interval):
+            self.sample()
+
+    def stop(self) -> None:
+        ''' Stop sampling, taking one last sample '''
+        self.stopping.set()
+        self.thread.join()
+        self.sample()
+
+class lifecycleSimulation():
+    ''' A class to run the real controller against the fake server and workshop, and summarise how it performed '''
+
+    def __init__(self, work_path, cycles=10, restart_interval_hours=4, mod_check_interval_minutes=30, mods=50, world_chunks=200, chunk_kb=64,
+                 players=0, mod_update_hours=6, backup_mode="tar", backend="api", workshop_latency=0.0, mod_polling="sweep") -> None:
+        ''' Constructor to declare the simulated setup; nothing is created until run() '''
+        self.work_path                  = os.path.abspath(work_path)
+        self.cycles                     = cycles
+        self.restart_interval_hours     = restart_interval_hours
+        self.mod_check_interval_minutes = mod_check_interval_minutes
+        self.workshop_ids               = [str(2000000000 + index) for index in range(mods)]
+        self.world_chunks               = world_chunks
+        self.chunk_kb                   = chunk_kb
+        self.players                    = players
+        self.mod_update_hours           = mod_update_hours
+        self.backup_mode                = backup_mode
+        self.backend                    = backend
+        self.mod_polling                = mod_polling
+        self.workshop                   = fakeWorkshop(self.workshop_ids, workshop_latency)
+        self.world_path                 = os.path.join(self.work_path, "Saves", "servertest")
+        self.events_path                = os.path.join(self.work_path, "fake_server_events.jsonl")
+
+    def createWorld(self) -> None:
+        ''' Write the synthetic world (half random, half zeros, so it compresses like real chunk data) and servertest.ini '''
+        os.makedirs(self.world_path, exist_ok=True)
+        size = self.chunk_kb * 1024
+        for index in range(self.world_chunks):
+            with open(os.path.join(self.world_path, f"map_{index % 100}_{index // 100}.bin"), "wb") as chunk_file:
+                chunk_file.write(os.urandom(size // 2) + bytes(size - size // 2))
+        with open(os.path.join(self.work_path, "servertest.ini"), "w") as ini_file:
+            ini_file.write(f"Public=true\nMods={';'.join(f'mod{index}' for index in range(len(self.workshop_ids)))}\n"
+                           f"WorkshopItems={';'.join(self.workshop_ids)}\nMap=Muldraugh, KY\nDefaultPort=16261\nRCONPort=27015\n")
+
+    def serverConfig(self, workshop_port, rcon_port) -> dict:
+        ''' Return the server_config.json the controller runs with '''
+        fake_server = (f'"{sys.executable}" "{os.path.abspath(__file__)}" fake-server --rcon-port {rcon_port} --password simulation'
+                       f' --world "{self.world_path}" --console "{os.path.join(self.work_path, "server-console.txt")}"'
+                       f' --events "{self.events_path}" --players {self.players}')
+        return {"server_config": {
+            "start_server_command"          : fake_server,
+            "server_ini_path"               : os.path.join(self.work_path, "servertest.ini"),
+            "mod_state_path"                : os.path.join(self.work_path, "zomboid_mod_state.jsonl"),
+            "workshop_backend"              : self.backend,
+            "workshop_page_url"             : f"http://127.0.0.1:{workshop_port}/sharedfiles/filedetails/?id=",
+            "workshop_api_url"              : f"http://127.0.0.1:{workshop_port}/ISteamRemoteStorage/GetPublishedFileDetails/v1/",
+            "workshop_requests_per_second"  : 1000,
+            "backup_folder_path"            : os.path.join(self.work_path, "backups"),
+            "world_dict_path"               : self.world_path,
+            "backup_mode"                   : self.backup_mode,
+            "server_binary_process_name"    : os.path.basename(sys.executable),
+            "server_pidfile_path"           : os.path.join(self.work_path, "zomboid_server.pid"),
+            "server_console_path"           : os.path.join(self.work_path, "server-console.txt"),
+            "log_index_path"                : os.path.join(self.work_path, "zomboid_logs.db"),
+            ## Waiting costs nothing on the virtual clock, so the timeouts only have to outlast real process startup
+            "startup_timeout"               : 86400,
+            "shutdown_timeout"              : 30,
+            "rcon_local_ip"                 : "127.0.0.1",
+            "rcon_local_port"               : rcon_port,
+            "rcon_password"                 : "simulation",
+            "restart_interval_hours"        : self.restart_interval_hours,
+            "mod_check_interval_minutes"    : self.mod_check_interval_minutes,
+            "mod_polling"                   : self.mod_polling,
+            "mod_history_path"              : os.path.join(self.work_path, "zomboid_mod_history.json"),
+            "reboot_enabled"                : False,
+            "reboot_threshold"              : 3,
+        }}
+
+    def downtimes(self) -> list:
+        ''' Wall-clock seconds from each fake server's "quit" to the next one answering RCON '''
+        with open(self.events_path, "r") as events_file:
+            events = [json.loads(line) for line in events_file]
+        downtimes   = []
+        quit_time   = None
+        for event in events:
+            if event["event"] == "quit":
+                quit_time = event["time"]
+            elif event["event"] == "ready" and quit_time is not None:
+                downtimes.append(round(event["time"] - quit_time, 4))
+                quit_time = None
+        return downtimes
+
+    def run(self) -> dict:
+        ''' Run every cycle on the virtual clock and return the results '''
+        ## zomboid_server_manager.py reads server_config.json from the working directory
+        os.makedirs(self.work_path, exist_ok=True)
+        os.chdir(self.work_path)
+        ## Start without the previous run's events or mod history, which would skew the results
+        for stale_path in (self.events_path, os.path.join(self.work_path, "zomboid_mod_history.json")):
+            if os.path.exists(stale_path):
+                os.remove(stale_path)
+        self.createWorld()
+        workshop_port = self.workshop.start()
+        with open("server_config.json", "w") as config_file:
+            json.dump(self.serverConfig(workshop_port, freePort()), config_file, indent=4)
+
+        ## The baseline holds the harness and the fake workshop; everything above it comes from loading and running the manager
+        rss = rssSampler()
+        rss.start()
+        from zomboid_server_manager import ZomboidServerController
+        from zomboidScheduler import virtualEventLoop
+        from zomboidMetrics import METRICS
+
+        loop = virtualEventLoop()
+        asyncio.set_event_loop(loop)
+        controller      = ZomboidServerController()
+        hours           = self.cycles * self.restart_interval_hours
+        bumped          = []
+        wall_started    = t.perf_counter()
+
+        def publishUpdate():
+            bumped.append(self.workshop.bump(updated_at=int(controller.epochNow())))
+            loop.call_later(self.mod_update_hours * 3600, publishUpdate)
+        if self.mod_update_hours:
+            loop.call_later(self.mod_update_hours * 3600, publishUpdate)
+
+        async def stop():
+            for scheduler in [controller.scheduler] + [instance.scheduler for instance in controller.instances]:
+                scheduler.cancelJobs()
+                scheduler.cancelRunning()
+            await controller.shutdown()
+
+        try:
+            runner = loop.create_task(controller.run())
+            ## Leave a minute past the last restart for it to come back up
+            loop.run_until_complete(asyncio.sleep(hours * 3600 + 60))
+            loop.run_until_complete(stop())
+            loop.run_until_complete(runner)
+        finally:
+            for instance in controller.instances:
+                instance.server_process.stop(5)
+            self.workshop.close()
+            loop.close()
+            rss.stop()
+
+        metrics     = METRICS.snapshot()
+        downtimes   = self.downtimes()
+        return {
+            "finished"          : dt.datetime.now().isoformat(),
+            "git_commit"        : self.gitCommit(),
+            "python"            : sys.version.split()[0],
+            "settings"          : {key: value for key, value in vars(self).items() if key in ("cycles", "restart_interval_hours", "mod_check_interval_minutes", "world_chunks",
+                                                                                       "chunk_kb", "players", "mod_update_hours", "backup_mode", "backend", "mod_polling")} | {"mods": len(self.workshop_ids)},
+            "simulated_hours"   : hours,
+            "wall_seconds"      : round(t.perf_counter() - wall_started, 3),
+            "restarts"          : len(downtimes),
+            "mod_updates"       : len(bumped),
+            "restart_failures"  : sum(series["value"] for series in metrics["zomboid_restart_failures_total"]),
+            "downtime_seconds"  : downtimes,
+            "downtime_mean"     : round(sum(downtimes) / len(downtimes), 4) if downtimes else None,
+            "downtime_max"      : max(downtimes) if downtimes else None,
+            "backup_seconds"    : histogramSummary(metrics["zomboid_backup_seconds"]),
+            "save_seconds"      : histogramSummary(metrics["zomboid_save_seconds"]),
+            "mod_check_seconds" : histogramSummary(metrics["zomboid_mod_check_seconds"]),
+            "rcon_seconds"      : histogramSummary(metrics["zomboid_rcon_roundtrip_seconds"]),
+            "workshop_requests" : self.workshop.requests,
+            "mod_lookups"       : {series["labels"]["result"]: series["value"] for series in metrics["zomboid_mod_lookups_total"]},
+            ## Peak RSS of the whole process, i.e. the manager together with this harness and the fake workshop; ru_maxrss is in KiB on Linux
+            "harness_rss_mb"    : round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 1),
+            ## The manager's own share: the process's peak RSS over the harness's baseline, sampled with psutil
+            "manager_rss_mb"    : round((rss.peak - rss.baseline) / 1048576, 1),
+        }
+
+    def gitCommit(self):
+        ''' Return the short commit of the checkout this file is in, so results can be compared across versions '''
+        try:
+            return sp.run(["git", "rev-parse", "--short", "HEAD"], cwd=os.path.dirname(os.path.abspath(__file__)), capture_output=True, text=True, timeout=5).stdout.strip() or None
+        except (OSError, sp.SubprocessError):
+            return None
+
+if __name__ == "__main__":
+    if sys.argv[1:2] == ["fake-server"]:
+        parser = argparse.ArgumentParser(description="Fake Zomboid server started by the simulation")
+        parser.add_argument("--rcon-port", type=int, required=True)
+        parser.add_argument("--password", required=True)
+        parser.add_argument("--world", required=True)
+        parser.add_argument("--console", required=True)
+        parser.add_argument("--events", required=True)
+        parser.add_argument("--players", type=int, default=0)
+        parser.add_argument("--startup-seconds", type=float, default=0.1)
+        parser.add_argument("--save-fraction", type=float, default=0.1)
+        args = parser.parse_args(sys.argv[2:])
+        fakeServer(args.rcon_port, args.password, args.world, args.console, args.events, args.players, args.startup_seconds, args.save_fraction).run()
+        sys.exit(0)
+
+    parser = argparse.ArgumentParser(description="Run zomboid_server_manager.py through simulated restart cycles and write the results as JSON")
+    parser.add_argument("--cycles", type=int, default=10, help="Scheduled restart cycles to simulate")
+    parser.add_argument("--restart-interval-hours", type=float, default=4)
+    parser.add_argument("--mod-check-interval-minutes", type=float, default=30)
+    parser.add_argument("--mods", type=int, default=50, help="Workshop items in servertest.ini")
+    parser.add_argument("--world-chunks", type=int, default=200, help="Files in the synthetic world")
+    parser.add_argument("--chunk-kb", type=int, default=64, help="Size of each world file")
+    parser.add_argument("--players", type=int, default=0, help="Players the fake server reports; 0 restarts without a countdown")
+    parser.add_argument("--mod-update-hours", type=float, default=6, help="Simulated hours between workshop mod updates (0 for none)")
+    parser.add_argument("--backup-mode", choices=["tar", "snapshot"], default="tar")
+    parser.add_argument("--backend", choices=["api", "html"], default="api")
+    parser.add_argument("--workshop-latency", type=float, default=0.0, help="Seconds added to every fake workshop response")
+    parser.add_argument("--mod-polling", choices=["sweep", "adaptive"], default="sweep")
+    parser.add_argument("--work-dir", default="zomboid_simulation", help="Folder for the synthetic world, backups and state")
+    parser.add_argument("--output", default="simulation_results.json")
+    args = parser.parse_args()
+
+    output_path = os.path.abspath(args.output)
+    simulation  = lifecycleSimulation(args.work_dir, args.cycles, args.restart_interval_hours, args.mod_check_interval_minutes, args.mods, args.world_chunks,
+                                      args.chunk_kb, args.players, args.mod_update_hours, args.backup_mode, args.backend, args.workshop_latency,
+                                      args.mod_polling)
+    results     = simulation.run()
+    with open(output_path, "w") as output_file:
+        json.dump(results, output_file, indent=4)
+    print(json.dumps({key: value for key, value in results.items() if key != "downtime_seconds"}, indent=4))
+    print(f"Results written to {output_path}")
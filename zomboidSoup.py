@@ -1,13 +1,23 @@
 #!/usr/bin/env python3
 
+import os
+import re
 import sys
+import html
+import json
 import logging
 import requests
-import numpy as np
-import pandas as pd
 import queue
+import time as t
 import datetime as dt
-from bs4 import BeautifulSoup
+import threading as th
+from bs4 import BeautifulSoup, SoupStrainer
+from urllib.parse import urlsplit
+from urllib3.util.retry import Retry
+from requests.adapters import HTTPAdapter
+from concurrent.futures import ThreadPoolExecutor
+from zomboidConfig import serverIni
+from zomboidMetrics import WORKSHOP_FETCH_SECONDS, WORKSHOP_API_SECONDS, WORKSHOP_FAILURES, MOD_CHECK_SECONDS
 
 ## Created by https://steamcommunity.com/id/Mr_Pink47/
 ## NOTE Version - 1.8 (12/20/2023)
@@ -15,108 +25,422 @@ from bs4 import BeautifulSoup
 
 ## README: This script is best used with a Linux x64 Zomboid Server
 ## This script currently opens a Zomboid servertest.ini file to search for steam workshop mod IDs and then uses them to search the steam workshop using Beautiful Soup to retrieve the mod's last updated timestamp
-## The workshop IDs and their "last updated" timestamps are appended to a list which are then exported to a CSV file
+## The workshop IDs and their "last updated" timestamps are kept in a dict keyed by workshop ID and saved to an append-only mod state file
 
 ## If you run into issues running this program, be sure to intstall html5lib
 ## python3 -m pip install html5lib
 
+## lxml is optional; the "strainer" extractor uses it when installed and falls back to Python's html.parser otherwise
+try:
+    import lxml
+    STRAINER_PARSER = "lxml"
+except ImportError:
+    STRAINER_PARSER = "html.parser"
+
+## Compiled patterns for the "regex" extractor, which only looks at the stats container instead of building a full tree
+STATS_CONTAINER_PATTERN = re.compile(rb'<div class="detailsStatsContainerRight">(.*?</div>)\s*</div>', re.S)
+STAT_VALUE_PATTERN      = re.compile(rb'<div class="detailsStatRight">(.*?)</div>', re.S)
+
+## Tokens of Valve's KeyValues format used by SteamCMD's .acf manifests: quoted strings and braces
+ACF_TOKEN_PATTERN       = re.compile(r'"((?:[^"\\]|\\.)*)"|([{}])')
+
+class hostRateLimiter():
+    ''' A class to space out requests made to the same host across threads '''
+
+    def __init__(self, requests_per_second) -> None:
+        ''' Constructor to declare the minimum interval between requests to a single host '''
+        self.interval   = 1 / requests_per_second if requests_per_second else 0
+        self.next_slot  = {}
+        self.lock       = th.Lock()
+
+    def wait(self, url) -> None:
+        ''' Block until the url's host has a free request slot '''
+        host = urlsplit(url).netloc
+        with self.lock:
+            now                     = t.monotonic()
+            slot                    = max(now, self.next_slot.get(host, now))
+            self.next_slot[host]    = slot + self.interval
+        if slot > now:
+            t.sleep(slot - now)
+
+class workshopValidatorCache():
+    ''' A class to persist each workshop page's HTTP validators (ETag / Last-Modified) alongside its extracted timestamp '''
+
+    def __init__(self, cache_path, max_entries=1000) -> None:
+        ''' Constructor to load the on-disk cache, ordered from least to most recently used '''
+        self.cache_path     = cache_path
+        self.max_entries    = max_entries
+        self.entries        = {}
+        self.hits           = 0
+        self.misses         = 0
+        self.bytes_saved    = 0
+        self.lock           = th.Lock()
+
+        try:
+            if os.path.exists(self.cache_path):
+                with open(self.cache_path, "r") as cache_file:
+                    self.entries = json.load(cache_file)
+        except Exception as error:
+            logging.info(f"ERROR - Could not read workshop cache, starting empty\n{error}")
+            self.entries = {}
+
+    def lookup(self, workshop_id):
+        ''' Return the cached entry for a workshop ID, or None if it has not been cached '''
+        with self.lock:
+            return self.entries.get(workshop_id)
+
+    def conditionalHeaders(self, entry) -> dict:
+        ''' Build the If-None-Match / If-Modified-Since headers for a cached entry '''
+        headers = {}
+        if entry:
+            if entry.get("etag"):
+                headers["If-None-Match"] = entry["etag"]
+            if entry.get("last_modified"):
+                headers["If-Modified-Since"] = entry["last_modified"]
+        return headers
+
+    def hit(self, workshop_id, entry):
+        ''' Record a 304 for a workshop ID, mark its entry most recently used and return the cached timestamp '''
+        with self.lock:
+            self.entries.pop(workshop_id, None)
+            self.entries[workshop_id] = entry
+            self.hits           += 1
+            self.bytes_saved    += entry.get("content_length", 0)
+            while len(self.entries) > self.max_entries:
+                del self.entries[next(iter(self.entries))]
+        return entry.get("timestamp")
+
+    def store(self, workshop_id, response, timestamp) -> None:
+        ''' Record a full response's validators and extracted timestamp, evicting the least recently used entries past max_entries '''
+        with self.lock:
+            self.misses += 1
+            self.entries.pop(workshop_id, None)
+            if not (response.headers.get("ETag") or response.headers.get("Last-Modified")):
+                return
+            self.entries[workshop_id] = {
+                "etag"           : response.headers.get("ETag"),
+                "last_modified"  : response.headers.get("Last-Modified"),
+                "timestamp"      : timestamp,
+                "content_length" : len(response.content),
+            }
+            while len(self.entries) > self.max_entries:
+                del self.entries[next(iter(self.entries))]
+
+    def hitRate(self) -> float:
+        ''' Fraction of lookups answered by a 304 '''
+        lookups = self.hits + self.misses
+        return self.hits / lookups if lookups else 0.0
+
+    def save(self) -> None:
+        ''' Write the cache back to disk '''
+        ## Each writer gets its own temp file, so two servers saving the same cache at once never interleave and a reader only sees a whole file
+        temp_path = f"{self.cache_path}.{os.getpid()}.{th.get_ident()}.tmp"
+        try:
+            with self.lock:
+                with open(temp_path, "w") as cache_file:
+                    json.dump(self.entries, cache_file)
+                os.replace(temp_path, self.cache_path)
+        except Exception as error:
+            logging.info(f"ERROR - Could not write workshop cache\n{error}")
+
+class timestampSentinel():
+    ''' A named stand-in for a timestamp, kept apart from None (removed or never updated) '''
+
+    def __init__(self, name) -> None:
+        ''' Constructor to declare the name it is shown with '''
+        self.name = name
+
+    def __repr__(self) -> str:
+        return self.name
+
+## The lookup failed (timeout, 5xx, 429...), which says nothing about the mod
+LOOKUP_FAILED       = timestampSentinel("LOOKUP_FAILED")
+## A fast extractor found no stats container on the page (removed mod or a changed layout), so the full parse has to decide
+NO_STATS_CONTAINER  = timestampSentinel("NO_STATS_CONTAINER")
+
+def keepStoredOnFailure(stored, current) -> dict:
+    ''' Return current with every failed lookup replaced by the stored timestamp, leaving out failed mods that aren't stored yet '''
+    return {workshop_id: stored[workshop_id] if timestamp is LOOKUP_FAILED else timestamp
+            for workshop_id, timestamp in current.items() if timestamp is not LOOKUP_FAILED or workshop_id in stored}
+
+def isEpoch(timestamp) -> bool:
+    ''' Report whether a timestamp is an API epoch rather than a date scraped from a workshop page '''
+    return timestamp is not None and str(timestamp).isdigit()
+
+def keepComparable(stored, current, replace_dates=False) -> dict:
+    ''' Return current with every timestamp that can't be compared with the stored one (a scraped date against an API epoch) replaced by the stored value '''
+    ## A page scraped after a failed API batch shows a date, which says nothing about whether the stored epoch is out of date;
+    ## with replace_dates, stored dates may still be replaced by epochs so switching to the api backend takes effect on the next --write
+    comparable = dict(current)
+    for workshop_id, timestamp in current.items():
+        previous = stored.get(workshop_id)
+        if previous is None or timestamp is None or isEpoch(previous) == isEpoch(timestamp):
+            continue
+        if isEpoch(previous) or not replace_dates:
+            comparable[workshop_id] = previous
+    return comparable
+
+def diffModStates(stored, current) -> dict:
+    ''' Compare two {workshop_id: timestamp} dicts mod by mod; the order mods are listed in doesn't matter '''
+    return {
+        "changed" : [workshop_id for workshop_id, timestamp in current.items() if workshop_id in stored and stored[workshop_id] != timestamp],
+        "added"   : [workshop_id for workshop_id in current if workshop_id not in stored],
+        "removed" : [workshop_id for workshop_id in stored if workshop_id not in current],
+    }
+
+class modStateStore():
+    ''' A class to persist each workshop mod's last seen timestamp as an append-only JSON lines file '''
+
+    def __init__(self, state_path) -> None:
+        ''' Constructor to declare the state file and how many records it currently holds '''
+        self.state_path = state_path
+        self.records    = 0
+
+    def exists(self) -> bool:
+        ''' Report whether a mod state has been written yet '''
+        return os.path.exists(self.state_path)
+
+    def load(self) -> dict:
+        ''' Replay the state file into {workshop_id: timestamp}; later records win and "removed" records drop a mod '''
+        states          = {}
+        self.records    = 0
+        try:
+            with open(self.state_path, "r") as state_file:
+                for line in state_file:
+                    try:
+                        record = json.loads(line)
+                    except ValueError:
+                        ## A line cut short by a crash mid-append is skipped; the next save rewrites that mod anyway
+                        continue
+                    self.records += 1
+                    if record.get("removed"):
+                        states.pop(record["id"], None)
+                    else:
+                        states[record["id"]] = record.get("timestamp")
+        except FileNotFoundError:
+            pass
+        return states
+
+    def save(self, states) -> dict:
+        ''' Append a record for every mod that differs from the stored state and return the diff '''
+        diff    = diffModStates(self.load(), states)
+        records = [{"id": workshop_id, "timestamp": states[workshop_id]} for workshop_id in diff["changed"] + diff["added"]]
+        records += [{"id": workshop_id, "removed": True} for workshop_id in diff["removed"]]
+
+        ## Once most of the file is superseded records, rewrite it with just the current state
+        if self.records + len(records) > 2 * len(states) + 64:
+            temp_path = f"{self.state_path}.tmp"
+            with open(temp_path, "w") as state_file:
+                for workshop_id, timestamp in states.items():
+                    state_file.write(json.dumps({"id": workshop_id, "timestamp": timestamp}) + "\n")
+            os.replace(temp_path, self.state_path)
+            self.records = len(states)
+        elif records:
+            with open(self.state_path, "a") as state_file:
+                state_file.write("".join(json.dumps(record) + "\n" for record in records))
+            self.records += len(records)
+        return diff
+
+class workshopManifest():
+    ''' A class to read the installed workshop items SteamCMD records in appworkshop_108600.acf '''
+
+    def __init__(self, manifest_path) -> None:
+        ''' Constructor to declare the manifest path and the parse cache '''
+        self.manifest_path  = manifest_path
+        self.file_signature = None
+        self.installed      = {}
+        self.needs_update   = False
+
+    def parseKeyValues(self, text) -> dict:
+        ''' Parse Valve KeyValues text into nested dicts '''
+        root    = {}
+        stack   = [root]
+        key     = None
+        for match in ACF_TOKEN_PATTERN.finditer(text):
+            string, brace = match.groups()
+            if brace == "{":
+                child           = {}
+                stack[-1][key]  = child
+                stack.append(child)
+                key             = None
+            elif brace == "}":
+                if len(stack) > 1:
+                    stack.pop()
+            elif key is None:
+                key = string
+            else:
+                stack[-1][key]  = string
+                key             = None
+        ## A manifest cut short (e.g. read while SteamCMD rewrites it) leaves sections open
+        if len(stack) > 1:
+            raise ValueError("Unterminated section in KeyValues text")
+        return root
+
+    def installedItems(self):
+        ''' Return {workshop_id: {"timeupdated": int, "manifest": str}}, re-reading the manifest only when its mtime or size changes, or None if it can't be read '''
+        try:
+            stat            = os.stat(self.manifest_path)
+            file_signature  = (stat.st_mtime_ns, stat.st_size)
+        except Exception as error:
+            logging.info(f"ERROR - Could not stat workshop manifest {self.manifest_path}\n{error}")
+            return self.unreadable()
+
+        if file_signature == self.file_signature:
+            return self.installed
+
+        logging.info(f"Reading workshop manifest {self.manifest_path}....")
+        try:
+            with open(self.manifest_path, "r", encoding="utf-8", errors="replace") as manifest:
+                app_workshop = self.parseKeyValues(manifest.read())["AppWorkshop"]
+            if not isinstance(app_workshop, dict):
+                raise ValueError("AppWorkshop is not a section")
+        except Exception as error:
+            logging.info(f"ERROR - Could not parse workshop manifest\n{error}")
+            return self.unreadable()
+
+        installed = {}
+        for workshop_id, item in app_workshop.get("WorkshopItemsInstalled", {}).items():
+            try:
+                installed[workshop_id] = {"timeupdated": int(item.get("timeupdated", 0)), "manifest": item.get("manifest")}
+            except ValueError:
+                continue
+
+        self.installed      = installed
+        self.needs_update   = app_workshop.get("NeedsUpdate") == "1" or app_workshop.get("NeedsDownload") == "1"
+        self.file_signature = file_signature
+        return self.installed
+
+    def unreadable(self) -> None:
+        ''' Forget the last parse of a manifest that is missing or can't be parsed, so an empty read is never mistaken for "nothing installed" '''
+        self.file_signature = None
+        self.installed      = {}
+        self.needs_update   = False
+        return None
+
 class zomboidSoup():
     ''' A class to scrape the steam workshop for Zomboid mod updates to help determine when a server should restart/shutdown '''
 
-    def __init__(self, server_ini, mod_csv) -> None:
+    def __init__(self, server_ini, mod_state_path, backend="api", api_batch_size=100, max_concurrency=8, requests_per_second=10, max_retries=3, cache_path=None, cache_max_entries=1000, extractor="regex", workshop_manifest=None, server_settings=None, workshop_url=None, steam_api_url=None) -> None:
         ''' Constructor to declare variables used by the Zomboid Soup Scraping Class'''
-        self.modlist_timestamps     = []
         self.server_ini             = server_ini
-        self.mod_csv                = mod_csv
-        self.workshop_URL           = "https://steamcommunity.com/sharedfiles/filedetails/?id="
-        self.workshop_ids_column    = pd.DataFrame()
+        self.server_settings        = server_settings or serverIni(server_ini) # Shared with the manager so the ini is only parsed again after it changes
+        self.mod_state              = modStateStore(mod_state_path)
+        self.backend                = backend
+        self.api_batch_size         = api_batch_size
+        self.max_concurrency        = max_concurrency
+        self.max_retries            = max_retries
+        self.rate_limiter           = hostRateLimiter(requests_per_second)
+        self.session                = None
+        self.validator_cache        = workshopValidatorCache(cache_path, cache_max_entries) if cache_path else None
+        self.extractors             = {"regex": self.extractTimestampRegex, "strainer": self.extractTimestampStrainer, "html5lib": self.extractTimestampFull}
+        self.extractor              = extractor if extractor in self.extractors else "html5lib"
+        self.workshop_manifest      = workshop_manifest
+        self.workshop_URL           = workshop_url or "https://steamcommunity.com/sharedfiles/filedetails/?id="
+        self.steam_api_URL          = steam_api_url or "https://api.steampowered.com/ISteamRemoteStorage/GetPublishedFileDetails/v1/"
+        self.workshop_ids           = []
+        self.mod_timestamps         = {}
+        self.mod_diff               = None
+        self.rate_limited           = False # Set when Steam answers 429 Too Many Requests during a lookup
+        self.rate_limited_ids       = set() # Mods whose page lookup was refused with a 429
+        self.retry_after            = None
+        self.rate_limit_lock        = th.Lock()
 
     def checkAndCompare(self, data_queue) -> queue.Queue:
         ''' A method to check and compare the mod list'''
         logging.info("Checking if anything has changed...")
-        try:
-            current_mod_list = pd.read_csv(self.mod_csv)
-        except Exception as e:
-            logging.info(f"ERROR - Could not read mod_csv\n{e}")
-
-        ## Fix weird issue with NaN's interpreted as strings in some cases
-        try:
-            self.workshop_ids_column['updated_timestamp']   = self.workshop_ids_column['updated_timestamp'].replace('NaN', np.nan)
-            current_mod_list['updated_timestamp']           = current_mod_list['updated_timestamp'].replace('NaN', np.nan)
-        except Exception as e:
-            print(f"ERROR - Could not convert timestamps\n{e}")
+        if self.workshop_manifest:
+            installed = self.workshop_manifest.installedItems()
+            if installed is not None:
+                return self.compareWithManifest(installed, data_queue)
+            logging.info("Workshop manifest unreadable; comparing against the mod state instead.")
 
-        ## Enable logging.DEBUG to view DataFrame output
-        # logging.debug("From File:")
-        # logging.debug(current_mod_list['updated_timestamp'])
-        # logging.debug("From Workshop")
-        # logging.debug(self.workshop_ids_column['updated_timestamp'])
+        if not self.mod_state.exists():
+            logging.info(f"ERROR - No mod state found at {self.mod_state.state_path}; run --write first")
+            return None
 
-        try:
-            compare_cols = current_mod_list['updated_timestamp'].equals(self.workshop_ids_column['updated_timestamp'])
-            logging.info(f"Local mods are currently up to date: {compare_cols}")
-        except Exception as e:
-            logging.info(f"ERROR - Could not compare current mod_list to updated_timestamp dataframe\n{e}")
+        ## Mods are matched by workshop ID, so reordering WorkshopItems= alone is not an update
+        stored          = self.mod_state.load()
+        self.logFailedLookups()
+        self.mod_diff   = diffModStates(stored, keepComparable(stored, keepStoredOnFailure(stored, self.mod_timestamps)))
+        in_sync         = not any(self.mod_diff.values())
+        logging.info(f"Local mods are currently up to date: {in_sync}")
+        for kind, workshop_ids in self.mod_diff.items():
+            if workshop_ids:
+                logging.info(f"Mods {kind}: {', '.join(workshop_ids)}")
 
         ## If mods are in sync between local and workshop, return True, else return False
-        if compare_cols:
+        if in_sync:
             return data_queue.put(0)
             
         else:
             return data_queue.put(1)
 
-    def openServerConfig(self) -> pd.DataFrame():
-        ''' A method to open servertest.ini config files and return the workshop mod ID list as a Panadas DataFrame column '''
+    def compareWithManifest(self, installed, data_queue) -> queue.Queue:
+        ''' A method to compare remote workshop epochs against the versions SteamCMD actually installed '''
+        outdated    = []
+        scraped     = {}
+        for workshop_id, remote_timestamp in self.mod_timestamps.items():
+            ## Removed mods can't be updated and failed lookups say nothing
+            if remote_timestamp is None or remote_timestamp is LOOKUP_FAILED:
+                continue
+            ## Scraped dates (html backend, or a failed API batch) can't be compared against the manifest's epochs
+            if not isEpoch(remote_timestamp):
+                scraped[workshop_id] = remote_timestamp
+                continue
+            if workshop_id not in installed or int(remote_timestamp) > installed[workshop_id]["timeupdated"]:
+                outdated.append(workshop_id)
+
+        if scraped:
+            logging.info(f"WARNING - {len(scraped)} mods only have scraped workshop dates, which can't be compared with the manifest; comparing them against the mod state instead (use the api backend with workshop_manifest_path)")
+            if self.mod_state.exists():
+                stored = self.mod_state.load()
+                stored = {workshop_id: timestamp for workshop_id, timestamp in stored.items() if workshop_id in scraped}
+                outdated.extend(diffModStates(stored, keepComparable(stored, scraped))["changed"])
+            else:
+                logging.info(f"ERROR - No mod state found at {self.mod_state.state_path}; updates to those mods can't be detected until --write runs")
+
+        logging.info(f"Local mods are currently up to date: {not outdated}")
+        if outdated:
+            logging.info(f"Mods newer on the workshop than installed: {', '.join(outdated)}")
+            return data_queue.put(1)
+        return data_queue.put(0)
+
+    def openServerConfig(self) -> list:
+        ''' A method to open servertest.ini config files and return the workshop mod ID list '''
         ## Open servertest.ini file to check for WorkshopItem IDs
         logging.info(f"Reading Mods from {self.server_ini}....")
         try:
-            with open(f"{self.server_ini}") as config:
-                lines           = config.readlines()
-                search_string   = "WorkshopItems="
-                found_line      = next((line for line in lines if search_string in line and "#" not in line), None)                
-                mods_list       = found_line.strip().replace("WorkshopItems=","").split(";")
-
-            ## Create a new dataframe enumerated with workshop IDs from servertest.ini
-            self.workshop_ids_column = pd.DataFrame({'workshop_id': mods_list})
+            ## Keep the workshop IDs in servertest.ini order, dropping blanks (e.g. a trailing ";") and duplicates
+            self.workshop_ids = self.server_settings.workshopIds()
             logging.info("Mods list loaded successfully.")
-            return self.workshop_ids_column
+            return self.workshop_ids
         except Exception as error:
             logging.info(f"ERROR - Failed loading server config: {error}\n")
 
-    def scrapeSteamWorkshop(self, arg, data_queue) -> None:
+    def scrapeSteamWorkshop(self, arg, data_queue, remote_timestamps=None) -> None:
         ''' A method to check whether Steam workshop mods have been updated or not'''
         try:
             if arg.lower() in ["--write", "--check"]:
-                if self.openServerConfig().empty:
+                ## This runs inside the manager's worker threads, so a missing mod list is reported on the queue rather than exiting
+                if not self.openServerConfig():
                     logging.info("ERROR - Could not load mods from server configuration ini")
-                    exit(1)
+                    return data_queue.put(None)
 
-                ## Iterate over workshop item IDs and begin scraping the Steam Workship for timestamps of when mods were last updated
-                logging.info("Scraping Steam Workshop....")
+                ## SteamCMD flags pending downloads in the manifest itself, so there's no need to ask Steam in that case
+                if arg.lower() == "--check" and self.workshop_manifest:
+                    self.workshop_manifest.installedItems()
+                    if self.workshop_manifest.needs_update:
+                        logging.info("Workshop manifest has downloads pending (NeedsUpdate/NeedsDownload set).")
+                        return data_queue.put(1)
 
-                ## Append Steam Workshop search URL to each modID in a new column
-                self.workshop_ids_column["mod_urls"] = self.workshop_URL + self.workshop_ids_column["workshop_id"]
-                
-                for mod_url in self.workshop_ids_column["mod_urls"]:
-                    raw_webpage         = requests.get(mod_url, timeout=5)
-                    converted_webpage   = BeautifulSoup(raw_webpage.content, 'html5lib')
-
-                    try:
-                        ## Find the mod's latest update timestamp and isolate it from the rest of the HTML5 encoding, then append it the list of timestamps
-                        mod_update_results  = converted_webpage.find('div', attrs = {'class':'detailsStatsContainerRight'})
-                        isolated_timestamp  = mod_update_results.get_text().replace('\t', '').strip().split('\n')[2]
-                        modified_timestamp  = isolated_timestamp.strip().replace("@","").replace("  ", " ")
-                        self.modlist_timestamps.append(modified_timestamp)
-                            
-                    except Exception as error:
-                        ## If the website results include no "last updated" timestamp or no longer exists then append NaN
-                        self.modlist_timestamps.append(np.nan)
-
-                ## Merge updated timestamps and workshopIDs into one dataframe
-                self.workshop_ids_column.insert(1,"updated_timestamp", self.modlist_timestamps, True)
+                ## Timestamps fetched for a larger set of mods (e.g. every managed server's mods at once) are reused instead of asking Steam again
+                if remote_timestamps is None:
+                    remote_timestamps = self.fetchTimestamps(self.workshop_ids)
+                ## A mod missing from the shared lookup was never answered, which is not the same as removed
+                self.mod_timestamps = {workshop_id: remote_timestamps.get(workshop_id, LOOKUP_FAILED) for workshop_id in self.workshop_ids}
 
                 if arg.lower() == "--write":
-                    self.writeToCSV()
+                    self.writeModState()
                 elif arg.lower() == "--check":
                     self.checkAndCompare(data_queue)
 
@@ -126,24 +450,220 @@ class zomboidSoup():
         except Exception as e:
             logging.debug(f"ERROR - {e}")
 
-    def writeToCSV(self) -> None:
-        ''' Write mod ID and mod last update timestamp to CSV '''
-        logging.info("Writing latest mod list to CSV file...")
-        self.workshop_ids_column.to_csv(self.mod_csv, index=False)
-        logging.info("Done.\n")
+    def fetchTimestamps(self, workshop_ids) -> dict:
+        ''' A method to look up the "last updated" timestamp of each workshop ID, returned as {workshop_id: timestamp} '''
+        started = t.perf_counter()
+        self.rate_limited, self.rate_limited_ids, self.retry_after = False, set(), None
+
+        ## Share one keep-alive connection pool between every request made during this check
+        self.session = self.createSession()
+
+        ## Ask the Steam Web API for every mod's timestamp in a few batched requests, then scrape any mods the API could not answer for
+        api_timestamps = {}
+        if self.backend == "api":
+            logging.info("Querying Steam Web API for workshop timestamps....")
+            api_timestamps = self.queryPublishedFileDetails(workshop_ids)
+
+        ## Scrape the remaining workshop pages concurrently; map() hands results back in workshop_id order
+        scrape_ids  = [workshop_id for workshop_id in workshop_ids if workshop_id not in api_timestamps]
+        scrape_urls = [self.workshop_URL + workshop_id for workshop_id in scrape_ids]
+        if scrape_ids:
+            logging.info(f"Scraping Steam Workshop ({len(scrape_ids)} mods, {self.max_concurrency} at a time)....")
+            with ThreadPoolExecutor(max_workers=self.max_concurrency) as pool:
+                scraped_timestamps = iter(list(pool.map(self.scrapeWorkshopPage, scrape_ids, scrape_urls)))
+
+            if self.validator_cache:
+                logging.info(f"Workshop cache hit rate: {self.validator_cache.hitRate():.0%} ({self.validator_cache.hits} hits, {self.validator_cache.misses} misses, {self.validator_cache.bytes_saved} bytes saved)")
+                self.validator_cache.save()
+
+        ## Timestamps are stored as strings (or None for removed / never updated mods) so API epochs and scraped dates compare alike
+        remote_timestamps = {}
+        for workshop_id in workshop_ids:
+            if workshop_id in api_timestamps:
+                time_updated = api_timestamps[workshop_id]
+                remote_timestamps[workshop_id] = None if time_updated is None else str(time_updated)
+            else:
+                remote_timestamps[workshop_id] = next(scraped_timestamps)
+
+        self.session.close()
+        MOD_CHECK_SECONDS.observe(t.perf_counter() - started)
+        return remote_timestamps
+
+    def createSession(self) -> requests.Session:
+        ''' A method to build a pooled HTTP session that retries 429/5xx responses with exponential backoff '''
+        retries = Retry(total=self.max_retries, backoff_factor=0.5, status_forcelist=[429, 500, 502, 503, 504], allowed_methods=None, raise_on_status=False)
+        adapter = HTTPAdapter(pool_connections=2, pool_maxsize=self.max_concurrency, max_retries=retries)
+        session = requests.Session()
+        session.mount("https://", adapter)
+        session.mount("http://", adapter)
+        return session
+
+    def queryPublishedFileDetails(self, workshop_ids) -> dict:
+        ''' A method to look up the last updated epoch of each workshop ID through batched GetPublishedFileDetails requests '''
+        ## Returns {workshop_id: time_updated}, where time_updated is None for mods that were removed or never updated
+        ## IDs belonging to a batch that failed are left out so the caller can fall back to scraping them
+        api_timestamps = {}
+        for start in range(0, len(workshop_ids), self.api_batch_size):
+            batch   = workshop_ids[start:start + self.api_batch_size]
+            payload = {"itemcount": len(batch)}
+            for index, workshop_id in enumerate(batch):
+                payload[f"publishedfileids[{index}]"] = workshop_id
+
+            try:
+                self.rate_limiter.wait(self.steam_api_URL)
+                with WORKSHOP_API_SECONDS.time():
+                    response = self.session.post(self.steam_api_URL, data=payload, timeout=10)
+                if response.status_code == 429:
+                    self.noteRateLimit(response)
+                response.raise_for_status()
+                file_details = response.json()["response"]["publishedfiledetails"]
+            except Exception as error:
+                WORKSHOP_FAILURES.inc(source="api")
+                logging.info(f"ERROR - GetPublishedFileDetails batch {start // self.api_batch_size} failed: {error}")
+                continue
+
+            for details in file_details:
+                workshop_id = str(details.get("publishedfileid"))
+                if workshop_id not in batch:
+                    continue
+                ## result 1 means OK, anything else (9 - file not found, etc.) means the mod has been removed or hidden
+                if details.get("result") == 1 and details.get("time_updated"):
+                    api_timestamps[workshop_id] = int(details["time_updated"])
+                else:
+                    api_timestamps[workshop_id] = None
+
+        return api_timestamps
+
+    def scrapeWorkshopPage(self, workshop_id, mod_url):
+        ''' A method to scrape a single Steam workshop page for the mod's last updated timestamp '''
+        try:
+            ## Ask Steam to answer 304 Not Modified if the page hasn't changed since it was last parsed
+            cached_entry    = self.validator_cache.lookup(workshop_id) if self.validator_cache else None
+            headers         = self.validator_cache.conditionalHeaders(cached_entry) if cached_entry else {}
+
+            self.rate_limiter.wait(mod_url)
+            started             = t.perf_counter()
+            raw_webpage         = self.session.get(mod_url, headers=headers, timeout=5)
+
+            if raw_webpage.status_code == 429:
+                self.noteRateLimit(raw_webpage, workshop_id)
+                WORKSHOP_FAILURES.inc(source="page")
+                return LOOKUP_FAILED
+
+            if raw_webpage.status_code == 304 and cached_entry:
+                timestamp = self.validator_cache.hit(workshop_id, cached_entry)
+                WORKSHOP_FETCH_SECONDS.observe(t.perf_counter() - started, status=304)
+                return timestamp
+
+            WORKSHOP_FETCH_SECONDS.observe(t.perf_counter() - started, status=raw_webpage.status_code)
+            ## Steam answers removed mods with a 200 error page; any other status (5xx after the retries, a 304 without a cached entry) says nothing
+            if raw_webpage.status_code != 200:
+                WORKSHOP_FAILURES.inc(source="page")
+                return LOOKUP_FAILED
+
+            timestamp = self.extractTimestamp(raw_webpage.content)
+            if self.validator_cache:
+                self.validator_cache.store(workshop_id, raw_webpage, timestamp)
+            return timestamp
+
+        except Exception as error:
+            ## If the website could not be reached the mod keeps its stored timestamp
+            WORKSHOP_FAILURES.inc(source="page")
+            return LOOKUP_FAILED
+
+    def noteRateLimit(self, response, workshop_id=None) -> None:
+        ''' A method to record a 429 that outlasted the retries, with the Retry-After seconds Steam asked for, so the caller can back off '''
+        retry_after = response.headers.get("Retry-After", "")
+        with self.rate_limit_lock:
+            self.rate_limited = True
+            if retry_after.isdigit():
+                self.retry_after = max(self.retry_after or 0, int(retry_after))
+            if workshop_id:
+                self.rate_limited_ids.add(workshop_id)
+
+    def extractTimestamp(self, page_content):
+        ''' A method to pull the "last updated" timestamp out of a workshop page with the configured extractor '''
+        ## Fast extractors return NO_STATS_CONTAINER when they can't find the stats container at all (removed mod, changed page layout, etc.)
+        ## so the full html5lib parse can verify the page; a container without an update value (never updated mod) is already an answer
+        timestamp = self.extractors[self.extractor](page_content)
+        if timestamp is NO_STATS_CONTAINER:
+            timestamp = self.extractTimestampFull(page_content)
+        return timestamp
+
+    def normalizeTimestamp(self, stat_values):
+        ''' Turn the stats container's values (size, posted, updated) into the stored "last updated" timestamp '''
+        if len(stat_values) < 3:
+            ## Mods that have never been updated only list their size and posted date
+            return None
+        return stat_values[2].strip().replace("@","").replace("  ", " ")
+
+    def extractTimestampRegex(self, page_content):
+        ''' Extract the timestamp with compiled patterns over the stats container only '''
+        container = STATS_CONTAINER_PATTERN.search(page_content)
+        if not container:
+            return NO_STATS_CONTAINER
+        stat_values = [html.unescape(value.decode("utf-8", "replace")) for value in STAT_VALUE_PATTERN.findall(container.group(1))]
+        return self.normalizeTimestamp(stat_values)
+
+    def extractTimestampStrainer(self, page_content):
+        ''' Extract the timestamp by letting BeautifulSoup build only the stats container '''
+        strained_webpage = BeautifulSoup(page_content, STRAINER_PARSER, parse_only=SoupStrainer('div', attrs = {'class':'detailsStatsContainerRight'}))
+        if not strained_webpage.contents:
+            return NO_STATS_CONTAINER
+        stat_values = [stat.get_text() for stat in strained_webpage.find_all('div', attrs = {'class':'detailsStatRight'})]
+        return self.normalizeTimestamp(stat_values)
+
+    def extractTimestampFull(self, page_content):
+        ''' Extract the timestamp from a full html5lib parse of the page; the slowest but most forgiving extractor '''
+        try:
+            converted_webpage   = BeautifulSoup(page_content, 'html5lib')
+
+            ## Find the mod's latest update timestamp and isolate it from the rest of the HTML5 encoding
+            mod_update_results  = converted_webpage.find('div', attrs = {'class':'detailsStatsContainerRight'})
+            isolated_timestamp  = mod_update_results.get_text().replace('\t', '').strip().split('\n')[2]
+            return isolated_timestamp.strip().replace("@","").replace("  ", " ")
+
+        except Exception as error:
+            ## If the website results include no "last updated" timestamp or no longer exists then return None
+            return None
+
+    def trackModChanges(self, added, removed) -> dict:
+        ''' Start tracking mods added to WorkshopItems= at their current timestamp and stop tracking removed ones, without treating either as an update '''
+        states = {workshop_id: timestamp for workshop_id, timestamp in self.mod_state.load().items() if workshop_id not in removed}
+        if added:
+            states.update(self.fetchTimestamps(list(added)))
+            self.mod_timestamps = states
+            self.logFailedLookups()
+        self.mod_diff = self.mod_state.save(keepStoredOnFailure({}, states))
+        return self.mod_diff
+
+    def logFailedLookups(self) -> None:
+        ''' Log the mods whose lookup failed, which keep their stored timestamp instead of counting as changed '''
+        failed = [workshop_id for workshop_id, timestamp in self.mod_timestamps.items() if timestamp is LOOKUP_FAILED]
+        if failed:
+            logging.info(f"Lookups failed for {len(failed)} mods; keeping their stored timestamps: {', '.join(failed)}")
+
+    def writeModState(self) -> None:
+        ''' Save each mod ID's last update timestamp to the mod state file '''
+        logging.info("Writing latest mod list to the mod state file...")
+        stored          = self.mod_state.load()
+        self.logFailedLookups()
+        self.mod_diff   = self.mod_state.save(keepComparable(stored, keepStoredOnFailure(stored, self.mod_timestamps), replace_dates=True))
+        logging.info(f"Done ({len(self.mod_diff['changed'])} changed, {len(self.mod_diff['added'])} added, {len(self.mod_diff['removed'])} removed).\n")
 
 if __name__ == "__main__":
     # Configure the logging system
     logging.basicConfig(level = logging.INFO) ## To re-enable logging remove logging.disable() i.e, level = logging.INFO
 
     usage = ("Proper Usage:\n\tpython3 zomboid_soup.py --check\n\tpython3 zomboid_soup.py --write\
-        \n\n\t--write:\n\t\tReads your server.ini file for workshop mod IDs and then creates a CSV file to use as reference while scraping the Steam workshop for mod updates.\
+        \n\n\t--write:\n\t\tReads your server.ini file for workshop mod IDs and then creates a mod state file to use as reference while scraping the Steam workshop for mod updates.\
         \n\t\tIf --check returns False, you can use --write to update your mod list upon a server restart.\
-        \n\t--check:\n\t\tCrawls the Steam workshop to check if mods are updated by comparing them against the CSV file created by --write.\
-        \n\t\tReturns 0 to passed queue if the last updated timestamps crawled from Steam matches the CSV. Returns 1 if not.\
+        \n\t--check:\n\t\tCrawls the Steam workshop to check if mods are updated by comparing them against the mod state file created by --write.\
+        \n\t\tReturns 0 to passed queue if the last updated timestamps crawled from Steam match the mod state. Returns 1 if not.\
+        \n\t\tBoth put None on the queue if servertest.ini lists no workshop mods.\
         \n\n\t© 2024 - Free to share and distribute\n\t\t Created by:  Pink9\n\t\t Version: 1.8")
 
-    zs = zomboidSoup("../servertest.ini", "../mod_csv.csv")
+    zs = zomboidSoup("../servertest.ini", "../mod_state.jsonl")
 
     response_queue = queue.Queue()
     
@@ -2,18 +2,49 @@
 
 ## Standard imports
 import os
-import json
 import queue
 import time as t
-import psutil as ps
-import schedule as s
+import asyncio
+import contextlib
 import datetime as dt
 import subprocess as sp
-import threading as th
-from signal import signal, SIGINT
+from signal import SIGINT
 
 ## import custom class for scraping mods list
-from zomboidSoup import zomboidSoup
+from zomboidSoup import zomboidSoup, workshopManifest, LOOKUP_FAILED
+
+## import custom class for talking to the server over RCON
+from zomboidRcon import zomboidRcon
+
+## import custom class for incremental world snapshots
+from zomboidBackup import zomboidBackup
+
+## import custom class for detecting when the server is up or down
+from zomboidReadiness import zomboidReadiness
+
+## import custom asyncio job scheduler
+from zomboidScheduler import zomboidScheduler
+
+## import custom class for launching and stopping the tracked server process tree
+from zomboidProcess import zomboidProcess
+
+## import custom class for sampling the server's memory and CPU use
+from zomboidResources import resourceSampler
+
+## import custom classes for following the server's logs and indexing their events
+from zomboidLogs import logTailer, logIndex
+
+## import custom class for telling when a world save has finished
+from zomboidSaveWatch import saveWatcher
+
+## import custom classes for reading servertest.ini and server_config.json only when they change
+from zomboidConfig import serverIni, managerConfig, diffSettings
+
+## import custom classes for choosing which workshop mods each mod check looks up
+from zomboidModPolling import modUpdateHistory, modPollScheduler
+
+## import the shared metrics registry and its HTTP endpoint
+from zomboidMetrics import METRICS, metricsServer, BACKUP_SECONDS, BACKUP_BYTES, BACKUP_FAILURES, RESTART_DOWNTIME, RESTART_FAILURES, LOG_EVENTS, SAVE_SECONDS, MOD_LOOKUPS
 
 ################################################################################
 #  Created by https://steamcommunity.com/id/Mr_Pink47/
@@ -27,12 +58,6 @@ from zomboidSoup import zomboidSoup
 #     python3 -m pip install -r requirements.txt
 #        (I recommend using a venv for this; Python>=3.10 )
 #
-# Then ensure you have this rcon client installed into your Linux server
-#
-#      https://github.com/gorcon/rcon-cli/releases
-#
-#      *Extract this rcon archive to /usr/bin on your Linux server
-#
 # Then run this script with Python3 like so:
 #
 #           python3 /path/to/script/zomboid_server_manager.py
@@ -41,203 +66,505 @@ from zomboidSoup import zomboidSoup
 #           @reboot /usr/bin/python3 /path/to/script/zomboid_server_manager.py
 #
 #
-# NOTE: zomboidSoup.py must be in the same folder as zomboid_server_manager.py
+# NOTE: zomboidSoup.py, zomboidRcon.py, zomboidBackup.py, zomboidReadiness.py, zomboidScheduler.py, zomboidProcess.py, zomboidResources.py, zomboidLogs.py, zomboidSaveWatch.py, zomboidConfig.py, zomboidModPolling.py and zomboidMetrics.py must be in the same folder as zomboid_server_manager.py
 ################################################################################
 
-class ZomboidServerController():
-    ''' A zomboid server controller class '''
+## server_config.json settings that take effect while the manager keeps running (read by ZomboidServerInstance.loadSettings);
+## changing any other setting of a server needs a manager restart
+LIVE_SETTINGS = (
+    "reboot_enabled", "reboot_threshold", "restart_interval_hours", "workshop_backend", "workshop_api_batch_size", "workshop_max_concurrency",
+    "workshop_requests_per_second", "workshop_max_retries", "workshop_cache_path", "workshop_cache_max_entries", "workshop_extractor",
+    "workshop_page_url", "workshop_api_url",
+    "resource_sample_interval_seconds", "skip_healthy_restarts", "max_uptime_hours", "restart_max_rss_mb", "restart_max_rss_growth_mb_per_hour",
+    "resource_warmup_minutes", "resource_min_trend_minutes",
+    "players_poll_interval_seconds", "restart_player_threshold", "restart_window_deadline_minutes", "mod_update_window_deadline_minutes",
+    "startup_timeout", "shutdown_timeout", "log_poll_interval_seconds", "save_timeout", "save_quiet_seconds", "save_first_write_grace",
+)
+## Live settings read when the recurring jobs are scheduled, i.e. whenever the server (re)starts
+INTERVAL_SETTINGS = ("restart_interval_hours", "resource_sample_interval_seconds", "players_poll_interval_seconds", "log_poll_interval_seconds")
+## Settings the controller applies itself
+CONTROLLER_SETTINGS = ("mod_check_interval_minutes", "config_reload_interval_seconds", "mod_polling", "mod_poll_max_hours", "mod_poll_change_probability",
+                       "mod_poll_jitter", "mod_poll_backoff_minutes", "mod_poll_priority_minutes")
+
+class ZomboidServerInstance():
+    ''' A single zomboid server managed by ZomboidServerController '''
     
-    def __init__(self) -> None:
-        ''' Constructor for Zomboid Server Cotnroller Variables '''
-        try:
-            if os.path.exists("server_config.json"):
-                with open("server_config.json", "r") as config:
-                    config_data = json.load(config)
-                
-                ## Reboot counter - Tracks when to restart the host pc 
-                ###########################################################
-                self.reboot_counter         = 0 # - Don't Modify
-                self.reboot_counter_enabled = config_data["server_config"]["reboot_enabled"]
-                self.reboot_threshold       = config_data["server_config"]["reboot_threshold"]
-                ###########################################################
+    def __init__(self, server_config, controller) -> None:
+        ''' Constructor for one server instance's variables '''
+        ## Instance name shown in the log, and the controller coordinating mod checks and disk access between instances
+        ###########################################################
+        self.name       = server_config["name"]
+        self.controller = controller
+        self.config     = server_config # The settings last applied, to diff reloaded ones against
+        ###########################################################
 
-                ## Flags for managing state of the server - Don't Modify
-                ###########################################################
-                self.one_hour_flag = False
-                self.restart_flag  = False
-                self.start_flag    = False
-                ###########################################################
+        ## Reboot counter - Tracks when to restart the host pc 
+        ###########################################################
+        self.reboot_counter         = 0 # - Don't Modify
+        ###########################################################
 
-                ## A list storing current jobs active on the server
-                ###########################################################
-                self.jobs = []
-                ###########################################################
+        ## Flags for managing state of the server - Don't Modify
+        ###########################################################
+        self.one_hour_flag = False
+        self.restart_flag  = False
+        self.start_flag    = False
+        ###########################################################
 
-                ## Current Datetime - Don't Modify
-                ###########################################################
-                self.current_time = dt.datetime
-                ###########################################################
+        ## Scheduler running the recurring jobs and every in-flight job as its own asyncio task
+        ###########################################################
+        self.scheduler   = zomboidScheduler()
+        self.backup_task = None
+        self.restart_schedule = None # (loop time the restart timer was set, restart interval), for nextPlannedRestart()
+        ###########################################################
+
+        ## Current Datetime - Don't Modify
+        ###########################################################
+        self.current_time = dt.datetime
+        ###########################################################
                 
-                ## Path to start-server script
-                ###########################################################
-                self.start_server_cmd = config_data["server_config"]["start_server_command"]
-                ###########################################################
+        ## Path to start-server script
+        ###########################################################
+        self.start_server_cmd = server_config["start_server_command"]
+        ###########################################################
                 
-                ## Zomboid Soup Paths
-                ###########################################################
-                self.server_ini = config_data["server_config"]["server_ini_path"] # Specify path to server.init
-                self.mod_csv    = config_data["server_config"]["mod_csv_path"] # specify path where to save mod_updateList.csv
-                ###########################################################
+        ## Zomboid Soup Paths
+        ###########################################################
+        self.server_ini = server_config["server_ini_path"] # Specify path to server.init
+        self.server_settings = serverIni(self.server_ini) # Typed servertest.ini settings, parsed again only after the file changes
+        self.ini_settings    = None # The servertest.ini settings last seen by reloadServerIni()
+        self.mod_state  = server_config.get("mod_state_path") or os.path.splitext(server_config["mod_csv_path"])[0] + ".jsonl" # specify path where to save the mod state (older configs: next to mod_csv_path)
+        self.workshop_manifest_path       = server_config.get("workshop_manifest_path") # SteamCMD's appworkshop_108600.acf (optional)
+        self.workshop_manifest            = workshopManifest(self.workshop_manifest_path) if self.workshop_manifest_path else None
+        ###########################################################
 
-                ## Define backup folder path and world dictionary location
-                ###########################################################
-                self.backup_path = config_data["server_config"]["backup_folder_path"] ## Location of server backups
-                self.world_path  = config_data["server_config"]["world_dict_path"]
-                ###########################################################
+        ## Define backup folder path and world dictionary location
+        ###########################################################
+        self.backup_path = server_config["backup_folder_path"] ## Location of server backups
+        self.world_path  = server_config["world_dict_path"]
+        self.backup_mode = server_config.get("backup_mode", "tar") ## "tar" (full archive) or "snapshot" (incremental, deduplicated)
+        self.world_backup = zomboidBackup(self.world_path, self.backup_path,
+                                          codec   = server_config.get("backup_codec", "gz"), ## "gz", "bz2" or "xz"
+                                          level   = server_config.get("backup_compression_level", 6),
+                                          workers = server_config.get("backup_workers"), ## Defaults to every CPU core
+                                          retention = server_config.get("backup_retention")) ## e.g. {"hourly": 24, "daily": 7, "weekly": 4}
+        ## Instances whose worlds live on the same disk take turns backing up and restarting
+        self.disk_lock    = controller.diskLock(self.world_path)
+        self.holding_disk = False
+        ###########################################################
 
-                ## Server Shell and binary process names
-                ###########################################################
-                self.server_shell_process_name  = config_data["server_config"]["server_shell_process_name"]
-                self.server_binary_process_name = config_data["server_config"]["server_binary_process_name"]
-                ###########################################################
+        ## Server binary process name and the pidfile tracking the server process tree
+        ###########################################################
+        self.server_binary_process_name = server_config["server_binary_process_name"]
+        self.server_pidfile_path        = server_config.get("server_pidfile_path", "zomboid_server.pid")
+        self.server_process             = zomboidProcess(self.start_server_cmd, self.server_pidfile_path, self.server_binary_process_name)
+        ###########################################################
 
-                ## Rcon Config 
-                ##########################################################
-                self.server_local_ip  = config_data["server_config"]["rcon_local_ip"]
-                self.local_rcon_port  = config_data["server_config"]["rcon_local_port"]
-                self.rcon_password    = config_data["server_config"]["rcon_password"]
-                #########################################################
-
-                ## Rcon Command - Don't Modify
-                #########################################################        
-                self.rcon_conn_string = rf"rcon --address {self.server_local_ip}:{self.local_rcon_port} --password {self.rcon_password} "
-                #########################################################
-            
+        ## Resource Sampler - Restart early when memory runs away, and optionally skip scheduled restarts while the server is healthy
+        ###########################################################
+        self.started_at               = None
+        self.resources                = resourceSampler(self.server_process, window = server_config.get("resource_window", 120)) # Samples kept for the growth trend
+        ###########################################################
+
+        ## Rcon Config 
+        ##########################################################
+        self.server_local_ip  = server_config["rcon_local_ip"]
+        self.local_rcon_port  = server_config["rcon_local_port"]
+        self.rcon_password    = server_config["rcon_password"]
+        self.rcon_timeout     = server_config.get("rcon_timeout", 5)
+        #########################################################
+
+        ## Rcon Client - Don't Modify
+        #########################################################        
+        self.rcon = zomboidRcon(self.server_local_ip, self.local_rcon_port, self.rcon_password, self.rcon_timeout)
+        #########################################################
+
+        ## Player-Aware Restarts - Restart at once on an empty server, otherwise wait for few enough players up to a deadline
+        #########################################################
+        self.player_count                 = None
+        self.players_polled_at            = None
+        #########################################################
+
+        ## Readiness Probes - Wait for the server to actually be up/down instead of fixed sleeps
+        #########################################################
+        self.readiness        = zomboidReadiness(self.rcon,
+                                                 console_path = server_config.get("server_console_path"), # e.g. /home/user/Zomboid/server-console.txt
+                                                 ready_marker = server_config.get("server_ready_marker", "SERVER STARTED"))
+        #########################################################
+
+        ## Log Index - Follow server-console.txt and Zomboid/Logs, and index startups, saves, player joins and errors
+        #########################################################
+        self.logs              = None
+        if server_config.get("server_console_path") or server_config.get("server_logs_path"):
+            self.logs = logTailer(logIndex(server_config.get("log_index_path") or "zomboid_logs.db", server_config.get("log_retention_days", 14)),
+                                  console_path = server_config.get("server_console_path"),
+                                  logs_path    = server_config.get("server_logs_path")) # e.g. /home/user/Zomboid/Logs
+        #########################################################
+
+        ## Save Watcher - Back up as soon as the world save has finished writing, instead of after a fixed sleep
+        #########################################################
+        self.save_watch   = saveWatcher(self.world_path)
+        #########################################################
+
+        self.loadSettings(server_config)
+
+    def loadSettings(self, server_config) -> None:
+        ''' A method to read the settings listed in LIVE_SETTINGS; called again whenever server_config.json changes '''
+        ## Reboot counter
+        ###########################################################
+        self.reboot_counter_enabled = server_config["reboot_enabled"]
+        self.reboot_threshold       = server_config["reboot_threshold"]
+        self.restart_interval_hours = server_config.get("restart_interval_hours", 4) # Hours between scheduled restarts; the last-hour warning goes out an hour before
+        ###########################################################
+
+        ## Workshop lookups - Each mod check builds its zomboidSoup from these
+        ###########################################################
+        self.workshop_backend        = server_config.get("workshop_backend", "api") # "api" (batched Steam Web API) or "html" (scrape each page)
+        self.workshop_api_batch_size = server_config.get("workshop_api_batch_size", 100) # Workshop IDs per GetPublishedFileDetails request
+        self.workshop_max_concurrency     = server_config.get("workshop_max_concurrency", 8) # Workshop pages scraped at the same time
+        self.workshop_requests_per_second = server_config.get("workshop_requests_per_second", 10) # Request rate cap per Steam host
+        self.workshop_max_retries         = server_config.get("workshop_max_retries", 3) # Retries with exponential backoff on 429/5xx
+        self.workshop_cache_path          = server_config.get("workshop_cache_path") # ETag / Last-Modified cache for workshop pages (optional)
+        self.workshop_cache_max_entries   = server_config.get("workshop_cache_max_entries", 1000)
+        self.workshop_extractor           = server_config.get("workshop_extractor", "regex") # "regex", "strainer" or "html5lib"
+        self.workshop_page_url            = server_config.get("workshop_page_url") # Workshop page / GetPublishedFileDetails URLs, e.g. a mirror or zomboidSimulation.py's fake workshop
+        self.workshop_api_url             = server_config.get("workshop_api_url")
+        ###########################################################
+
+        ## Resource Sampler thresholds
+        ###########################################################
+        self.resource_sample_interval = server_config.get("resource_sample_interval_seconds", 30)
+        self.skip_healthy_restarts    = server_config.get("skip_healthy_restarts", False)
+        self.max_uptime_hours         = server_config.get("max_uptime_hours", 24) # Scheduled restarts always go ahead past this uptime
+        self.resources.max_rss_mb             = server_config.get("restart_max_rss_mb")
+        self.resources.max_growth_mb_per_hour = server_config.get("restart_max_rss_growth_mb_per_hour")
+        self.resources.warmup_seconds         = server_config.get("resource_warmup_minutes", 10) * 60 # RSS growth right after a start isn't judged
+        self.resources.min_trend_seconds      = server_config.get("resource_min_trend_minutes", 30) * 60 # Samples spanning this long are needed to judge growth
+        ###########################################################
+
+        ## Player-Aware Restarts
+        #########################################################
+        self.players_poll_interval        = server_config.get("players_poll_interval_seconds", 60)
+        self.restart_player_threshold     = server_config.get("restart_player_threshold", 0) # Player count low enough to start the restart countdown
+        self.restart_window_deadline      = server_config.get("restart_window_deadline_minutes", 0) * 60 # Longest wait for that window on scheduled/resource restarts
+        self.mod_update_window_deadline   = server_config.get("mod_update_window_deadline_minutes", 0) * 60 # Longest wait for that window on mod update restarts
+        #########################################################
+
+        ## Readiness, log polling and save timeouts
+        #########################################################
+        self.startup_timeout   = server_config.get("startup_timeout", 600)
+        self.shutdown_timeout  = server_config.get("shutdown_timeout", 60)
+        self.log_poll_interval = server_config.get("log_poll_interval_seconds", 10)
+        self.save_timeout      = server_config.get("save_timeout", 300)
+        self.save_watch.quiet_seconds     = server_config.get("save_quiet_seconds", 2) # No writes for this long means the save is done
+        self.save_watch.first_write_grace = server_config.get("save_first_write_grace", 10)
+        #########################################################
+
+    def applyConfig(self, server_config) -> None:
+        ''' A method to apply a reloaded server_config.json entry, printing every setting that changed '''
+        diff    = diffSettings(self.config, server_config)
+        changed = {**{key: (None, value) for key, value in diff["added"].items()},
+                   **{key: (value, None) for key, value in diff["removed"].items()},
+                   **diff["changed"]}
+        if not changed:
+            return
+        for key, (old, new) in changed.items():
+            print(f"{self.current_time.now()} -- [{self.name}] Config {key}: {old!r} -> {new!r}")
+        self.loadSettings(server_config)
+        self.config = server_config
+
+        if any(key in INTERVAL_SETTINGS for key in changed):
+            print(f"{self.current_time.now()} -- [{self.name}] New job intervals apply from the next server restart.")
+        needs_restart = [key for key in changed if key not in LIVE_SETTINGS and key not in CONTROLLER_SETTINGS]
+        if needs_restart:
+            print(f"{self.current_time.now()} -- [{self.name}] Restart the manager to apply: {', '.join(needs_restart)}")
+
+    async def reloadServerIni(self) -> None:
+        ''' A method to re-read servertest.ini if it changed, and start monitoring workshop items added to it straight away '''
+        try:
+            settings = await asyncio.to_thread(self.server_settings.load)
+        except OSError as error:
+            print(f"{self.current_time.now()} -- [{self.name}] ERROR reading {self.server_ini}: {error}")
+            return
+        ## Mod checks load the same parsed settings, so compare against what this method saw last rather than the previous parse
+        previous, self.ini_settings = self.ini_settings, settings
+        if previous is None or previous is settings:
+            return
+        diff = diffSettings(previous, settings)
+        if not any(diff.values()):
+            return
+
+        for key, (old, new) in diff["changed"].items():
+            if isinstance(old, list) and isinstance(new, list):
+                print(f"{self.current_time.now()} -- [{self.name}] servertest.ini {key}: added {[item for item in new if item not in old]}, removed {[item for item in old if item not in new]}")
             else:
-                print("Unable to read server_config.json.\nPlease re-download the repo and ensure it's in the same directory as zomboid_server_manager.py")
-                exit(1)
+                print(f"{self.current_time.now()} -- [{self.name}] servertest.ini {key}: {old!r} -> {new!r}")
+        for key, value in diff["added"].items():
+            print(f"{self.current_time.now()} -- [{self.name}] servertest.ini {key} added: {value!r}")
+        for key in diff["removed"]:
+            print(f"{self.current_time.now()} -- [{self.name}] servertest.ini {key} removed")
+        print(f"{self.current_time.now()} -- [{self.name}] The server itself picks up servertest.ini changes when it next restarts.\n")
 
-        except Exception as error:
-            print(f"ERROR: Could not initialize server configuration.\n{error}")
-            exit(1)
+        ## The mod state follows WorkshopItems= at once, so new mods are checked for updates from the next mod check on
+        if "WorkshopItems" in diff["changed"] and os.path.exists(self.mod_state) and not (self.start_flag or self.restart_flag):
+            old, new = diff["changed"]["WorkshopItems"]
+            added    = [workshop_id for workshop_id in dict.fromkeys(new) if workshop_id not in old]
+            removed  = [workshop_id for workshop_id in old if workshop_id not in new]
+            await asyncio.to_thread(self.workshopSoup().trackModChanges, added, removed)
+            print(f"{self.current_time.now()} -- [{self.name}] Now monitoring {len(self.server_settings.workshopIds())} workshop mods.\n")
+
+    def workshopSoup(self) -> zomboidSoup:
+        ''' A method to build the zomboidSoup mod checker for this instance's servertest.ini and mod state '''
+        return zomboidSoup(self.server_ini, self.mod_state,
+                           backend             = self.workshop_backend,
+                           api_batch_size      = self.workshop_api_batch_size,
+                           max_concurrency     = self.workshop_max_concurrency,
+                           requests_per_second = self.workshop_requests_per_second,
+                           max_retries         = self.workshop_max_retries,
+                           cache_path          = self.workshop_cache_path,
+                           cache_max_entries   = self.workshop_cache_max_entries,
+                           extractor           = self.workshop_extractor,
+                           workshop_manifest   = self.workshop_manifest,
+                           server_settings     = self.server_settings,
+                           workshop_url        = self.workshop_page_url,
+                           steam_api_url       = self.workshop_api_url)
+
+    @contextlib.asynccontextmanager
+    async def diskTurn(self):
+        ''' Hold this instance's disk for a backup or restart; other instances on the same disk wait their turn '''
+        if self.holding_disk:
+            yield
+            return
+        async with self.disk_lock:
+            self.holding_disk = True
+            try:
+                yield
+            finally:
+                self.holding_disk = False
 
     def backupWorld(self, server_status) -> None:
         ''' A method to backup the Zomboid server '''
         # Back up server to tar.gz
-        print(f"{self.current_time.now()} -- Backing up Server!\n")
-        backup_server_cmd = f"tar -zcpf {self.backup_path}/\"`date +%Y%m%d-%H%M%S`\"_{server_status}_serverWorldSave.tgz --absolute-names {self.world_path}"
-        sp.call(backup_server_cmd, shell=True)
-        t.sleep(10)
+        print(f"{self.current_time.now()} -- [{self.name}] Backing up Server!\n")
+        try:
+            if self.backup_mode == "snapshot":
+                ## Only chunk files that changed since the last snapshot are copied into the store
+                with BACKUP_SECONDS.time(server=self.name, mode="snapshot"):
+                    snapshot_stats = self.world_backup.snapshot(server_status)
+                BACKUP_BYTES.observe(snapshot_stats["bytes_in"], server=self.name, mode="snapshot")
+                print(f"{self.current_time.now()} -- [{self.name}] Snapshot saved: {snapshot_stats['path']} ({snapshot_stats['files']} files, {snapshot_stats['reused_files']} unchanged, {snapshot_stats['bytes_in'] / 1048576:.1f} MiB read)\n")
+                return
 
-    def coldStart(self) -> None:
-        ''' A method for starting the server for the first boot '''
-        
-        ## Track number of times user presses Ctrl+C (Sigint)
-        self.sigint_count = 0
+            ## Compress the world across every worker process; this returns as soon as the archive is fully written
+            archive_stats = self.world_backup.archive(server_status)
+        except Exception:
+            BACKUP_FAILURES.inc(server=self.name)
+            raise
 
-        def handler(signal_received, frame):
-            ''' A handler for killing the program with Ctrl+C '''
-            # Handle user shutdown
-            print(f'\n{self.current_time.now()} -- CTRL-C detected. Exiting gracefully. Please wait...\n')
-            if self.sigint_count >= 1:
-               print(f"{self.current_time.now()} -- CTRL-C received twice; forcing immediate server shutdown!\n")
-               exit(0)
-            self.sigint_count += 1
-            self.serverMessenger("quit")
-            exit(0)
-       
-        ## When Ctrl+C detected, called stopServer()
-        signal(SIGINT, handler)
+        BACKUP_SECONDS.observe(archive_stats["seconds"], server=self.name, mode="tar")
+        BACKUP_BYTES.observe(archive_stats["bytes_in"], server=self.name, mode="tar")
+        print(f"{self.current_time.now()} -- [{self.name}] Backup finished at {archive_stats['finished']}: {archive_stats['path']} ({archive_stats['bytes_in'] / 1048576:.1f} MiB in {archive_stats['seconds']:.1f}s, {archive_stats['throughput'] / 1048576:.1f} MiB/s)\n")
+
+    async def backupWorldTask(self, server_status) -> None:
+        ''' A method to run a backup off the event loop; a cancelled caller never abandons a half-written backup '''
+        ## Let any backup still running (e.g. from a cancelled restart) finish before starting the next one
+        if self.backup_task and not self.backup_task.done():
+            await asyncio.shield(self.backup_task)
+        async with self.diskTurn():
+            self.backup_task = asyncio.ensure_future(asyncio.to_thread(self.backupWorld, server_status))
+            await asyncio.shield(self.backup_task)
 
+    async def coldStart(self) -> None:
+        ''' A method for starting the server for the first boot '''
         ## Start a new server instance
         ## and kill any previous instances
-        self.stopServer()
-        self.startServer()
+        async with self.diskTurn():
+            await self.stopServer()
+            await self.startServer()
 
-    def rebootHost(self) -> None:
-        ''' A method to reboot the host PC after the server has rebooted x number of times '''
-        print(f"\n####ZOMBOID SERVER HAS RESTARTED {self.reboot_counter} TIMES.\n####Initiating a reboot of the host PC...\n")
-        result = sp.run(["uname", "-a"], capture_output=True)
-        result = result.stdout.strip().decode()
-        ## Check if server is hosted in a WSL instance or not
-        if "Microsoft" in result:
-            sp.call(["/mnt/c/WINDOWS/system32/shutdown.exe", "/r"])
-            sp.call(["/mnt/c/WINDOWS/system32/shutdown.exe", "/f"])
+    def scheduleTasks(self) -> None:
+        ## Set schedules for restarting the server and sampling its resource use; the controller checks every instance's mods together
+        ## Each timer wakes exactly when its job is due; cancelled by stopServer()
+        restart_interval = self.restart_interval_hours * 60 * 60
+        self.restart_schedule = (asyncio.get_running_loop().time(), restart_interval)
+        if self.restart_interval_hours > 1:
+            ## The warning repeats with the restart, always an hour ahead of it
+            self.scheduler.every(restart_interval, self.serverMessenger, "1h", delay=restart_interval - 60 * 60)
+        self.scheduler.every(restart_interval, self.serverMessenger, "scheduledRestart")
+        self.scheduler.every(self.resource_sample_interval, self.sampleResources)
+        self.scheduler.every(self.players_poll_interval, self.pollPlayers)
+        if self.logs:
+            self.scheduler.every(self.log_poll_interval, self.pollLogs)
+
+    def nextPlannedRestart(self):
+        ''' Return the loop time of the next scheduled restart, or None while the server isn't running on its schedule '''
+        if self.restart_schedule is None:
+            return None
+        scheduled_at, restart_interval = self.restart_schedule
+        elapsed = asyncio.get_running_loop().time() - scheduled_at
+        return scheduled_at + (elapsed // restart_interval + 1) * restart_interval
+
+    async def pollLogs(self) -> list:
+        ''' A method to index everything the server has logged since the last poll and report its errors '''
+        try:
+            events = await asyncio.to_thread(self.logs.poll)
+        except Exception as error:
+            print(f"{self.current_time.now()} -- [{self.name}] ERROR reading server logs: {error}")
+            return []
+        for event in events:
+            LOG_EVENTS.inc(server=self.name, type=event["type"])
+            if event["type"] in ("mod_error", "exception"):
+                print(f"{self.current_time.now()} -- [{self.name}] Server log {event['type']}: {event['line']}")
+        return events
+
+    async def pollPlayers(self):
+        ''' A method to ask the server how many players are connected and cache the answer; returns None if RCON can't tell '''
+        try:
+            self.player_count = await asyncio.to_thread(self.rcon.playerCount)
+        except Exception:
+            self.player_count = None
+        self.players_polled_at = asyncio.get_running_loop().time()
+        return self.player_count
+
+    async def currentPlayers(self):
+        ''' A method to return the cached player count, polling the server again only if the cache is older than the poll interval '''
+        if self.players_polled_at is None or asyncio.get_running_loop().time() - self.players_polled_at >= self.players_poll_interval:
+            return await self.pollPlayers()
+        return self.player_count
+
+    async def awaitRestartWindow(self, deadline):
+        ''' A method to wait up to deadline seconds for no more than restart_player_threshold players; returns the last player count '''
+        loop    = asyncio.get_running_loop()
+        started = loop.time()
+        players = await self.currentPlayers()
+        while players is not None and players > self.restart_player_threshold and loop.time() - started < deadline:
+            await asyncio.sleep(min(self.players_poll_interval, max(0, deadline - (loop.time() - started))))
+            players = await self.currentPlayers()
+        return players
+
+    async def saveLogged(self) -> bool:
+        ''' A method to report whether the server has logged a finished save since the logs were last polled '''
+        return any(event["type"] == "save_finished" for event in await self.pollLogs())
+
+    async def saveWorld(self):
+        ''' A method to save the world over RCON and wait until it has been written; returns the seconds waited, or None on timeout '''
+        ## Index what was logged before the save, so only a save_finished line written from here on counts
+        if self.logs:
+            await self.pollLogs()
+        await asyncio.to_thread(self.save_watch.start)
+        try:
+            await asyncio.to_thread(self.rcon.command, "save")
+            saved_after = await self.save_watch.waitUntilSaved(self.save_timeout, self.saveLogged if self.logs else None)
+        finally:
+            self.save_watch.stop()
+
+        if saved_after is None:
+            print(f"{self.current_time.now()} -- [{self.name}] WARNING: World still being written after {self.save_timeout}s; backing up anyway.\n")
         else:
-            ## In case of Linux, run reboot with --force
-            sp.call("reboot --force")
-    
-    def runScheduler(self):
-        ''' Method to keep the scheduler running '''
-        while True:
-           # Checks whether a scheduled task
-            # is pending to run or not
-            s.run_pending()
-            t.sleep(1)
+            SAVE_SECONDS.observe(saved_after, server=self.name)
+            print(f"{self.current_time.now()} -- [{self.name}] World saved after {saved_after:.1f}s.\n")
+        return saved_after
 
-    def scheduleTasks(self) -> None:
-        ## Set schedules for restarting the server, and checking modlist status
-        one_hour        = s.every(3).hours.do(zsc.serverMessenger, "1h")
-        restart         = s.every(4).hours.do(zsc.serverMessenger, "restart")
-        update_check    = s.every(30).minutes.do(zsc.serverMessenger, "modUpdateCheck")
+    def restartSkippable(self) -> bool:
+        ''' Report whether a scheduled restart can be skipped: skipping is enabled, the server is healthy and not up longer than max_uptime_hours '''
+        if not self.skip_healthy_restarts or self.started_at is None:
+            return False
+        uptime = asyncio.get_running_loop().time() - self.started_at
+        return uptime < self.max_uptime_hours * 60 * 60 and self.resources.healthy()
 
-        ## Store jobs so they can be cancelled later
-        self.jobs.extend([one_hour, restart, update_check])
+    async def sampleResources(self) -> None:
+        ''' A method to sample the server's resource use and restart it early once a threshold is crossed '''
+        sample = await asyncio.to_thread(self.resources.sample, asyncio.get_running_loop().time())
+        reason = self.resources.restartReason() if sample else None
+        if reason and not (self.restart_flag or self.start_flag):
+            print(f"{self.current_time.now()} -- [{self.name}] {reason}. Restarting server early.\n")
+            await self.serverMessenger("restart")
 
-    def serverMessenger(self, cmd_flag) -> None:
-        ''' A method for controlling the Zomboid Server and sending messages via RCON '''
+    async def serverMessenger(self, cmd_flag, window_deadline=None) -> None:
+        ''' A method for controlling the Zomboid Server and sending messages via RCON; window_deadline overrides how long a restart waits for few players '''
         ## Send messages to the server
-        def sendMessage(rcon_command):
-            ''' A helper method to perform a subprocess (system) call to send an rcon message to the zomboid server instance '''
-            sp.call(self.rcon_conn_string + rcon_command, shell=True)
+        async def sendMessage(rcon_command):
+            ''' A helper method to send an rcon command to the zomboid server instance over the persistent RCON connection '''
+            return await asyncio.to_thread(self.rcon.command, rcon_command)
+
+        async def step(awaitable):
+            ''' A helper method to run one step of a shutdown, reporting its error so the steps after it still run '''
+            try:
+                return await awaitable
+            except Exception as error:
+                print(f"{self.current_time.now()} -- [{self.name}] ERROR: {error}")
         
         try:
-            if cmd_flag in ["1h", "4h"]:
-                print(f"{self.current_time.now()} -- {cmd_flag} sent. Sending {cmd_flag} before restart warning.")
+            if cmd_flag == "1h" and self.restartSkippable():
+                print(f"{self.current_time.now()} -- [{self.name}] Server is healthy; skipping the 1h restart warning.")
+                return
+
+            if cmd_flag == "scheduledRestart":
+                ## A restart that was already announced goes ahead; otherwise a healthy server keeps running until the next one
+                if not self.one_hour_flag and self.restartSkippable():
+                    print(f"{self.current_time.now()} -- [{self.name}] Server is healthy; skipping the scheduled restart.\n")
+                    return
+                cmd_flag = "restart"
+
+            if cmd_flag in ["1h", f"{self.restart_interval_hours}h"]:
+                print(f"{self.current_time.now()} -- [{self.name}] {cmd_flag} sent. Sending {cmd_flag} before restart warning.")
                 try:
-                    sendMessage(f"\"servermsg \\\"Server will restart in {cmd_flag.replace("h","")} hour(s)\\\"\"")
+                    await sendMessage(f"servermsg \"Server will restart in {cmd_flag.replace('h','')} hour(s)\"")
                     if cmd_flag == "1h":
                         self.one_hour_flag = True
                 except Exception as error:
-                    print(f"{self.current_time.now()} -- ERROR: {error}")
+                    print(f"{self.current_time.now()} -- [{self.name}] ERROR: {error}")
             
             if cmd_flag == "restart":
-                print(f"\n{self.current_time.now()} -- {cmd_flag} sent. Restarting server.\n")
+                if self.restart_flag:
+                    print(f"{self.current_time.now()} -- [{self.name}] Restart already in progress. Ignoring {cmd_flag}.\n")
+                    return
+                self.restart_flag = True
+                print(f"\n{self.current_time.now()} -- [{self.name}] {cmd_flag} sent. Restarting server.\n")
                 try:
                     if self.reboot_counter == self.reboot_threshold:
-                        self.backupWorld("restart")
-                        self.stopServer()
-                        self.rebootHost()
+                        ## Every instance on the host goes down with it, so the controller backs up and stops all of them first
+                        await self.controller.rebootHost(self)
                 except Exception as error:
-                    print(f"{self.current_time.now()} -- ERROR: {error}")
-                try:
-                    sendMessage("\"servermsg \\\"Server will restart in 5 minutes...\\\"\"")
-                    self.restart_flag = True
-                    t.sleep(300)
-                    sendMessage("\"servermsg \\\"Server will restart in 1 minutes...\\\"\"")
-                    t.sleep(60)
-                    sendMessage("\"servermsg \\\"Server preparing for restart...\\\"\"")
-                    t.sleep(1)
-                    sendMessage("\"servermsg \\\"Restart imminent! Please disconnect from the server!\\\"\"")
-                    t.sleep(1)
-                    sendMessage("\"servermsg \\\"Saving Server State and backing up World Dictionary.\\\"\"")
-                    t.sleep(1)
-                    sendMessage("\"servermsg \\\"Server is preparing to restart.\\\"\"")
-                    t.sleep(1)
-                    sendMessage("\"save\"")
-                    t.sleep(1)
-                    self.backupWorld(cmd_flag)
-                    t.sleep(5)
-                    sendMessage("\"quit\"")
+                    print(f"{self.current_time.now()} -- [{self.name}] ERROR: {error}")
 
-                except Exception as error:
-                    print(f"{self.current_time.now()} -- ERROR: {error}")
+                ## Hold the restart until few enough players are online (or the deadline passes); nobody online means no countdown at all
+                players = await self.awaitRestartWindow(self.restart_window_deadline if window_deadline is None else window_deadline)
+                print(f"{self.current_time.now()} -- [{self.name}] {'Unknown number of' if players is None else players} player(s) online.")
+                if players == 0:
+                    print(f"{self.current_time.now()} -- [{self.name}] Server is empty; restarting without a countdown.\n")
+                else:
+                    try:
+                        await sendMessage("servermsg \"Server will restart in 5 minutes...\"")
+                        await asyncio.sleep(300)
+                        await sendMessage("servermsg \"Server will restart in 1 minutes...\"")
+                        await asyncio.sleep(60)
+                        await sendMessage("servermsg \"Server preparing for restart...\"")
+                        await asyncio.sleep(1)
+                        await sendMessage("servermsg \"Restart imminent! Please disconnect from the server!\"")
+                        await asyncio.sleep(1)
+                        await sendMessage("servermsg \"Saving Server State and backing up World Dictionary.\"")
+                        await asyncio.sleep(1)
+                        await sendMessage("servermsg \"Server is preparing to restart.\"")
+                        await asyncio.sleep(1)
+                    except Exception as error:
+                        print(f"{self.current_time.now()} -- [{self.name}] ERROR: {error}")
 
-                ## Stop & Restart the server
-                t.sleep(5)
-                self.stopServer()
-                t.sleep(10)
-                self.startServer()
+                ## Save, back up, stop and start while holding the disk, so instances sharing it restart one after another
+                async with self.diskTurn():
+                    ## Each step runs even if the one before it failed, so an unreachable server is still backed up
+                    await step(self.saveWorld())
+                    await step(self.backupWorldTask(cmd_flag))
+                    ## Downtime counts from the quit; players stay on through the save and the backup
+                    down_since = asyncio.get_running_loop().time()
+                    await step(sendMessage("quit"))
+
+                    ## Wait for the server to go down on its own, then make sure it's stopped & restart it
+                    await self.readiness.waitUntilStopped(self.shutdown_timeout)
+                    await self.stopServer()
+                    if await self.startServer() is None:
+                        RESTART_FAILURES.inc(server=self.name)
+                    else:
+                        RESTART_DOWNTIME.observe(asyncio.get_running_loop().time() - down_since, server=self.name)
 
                 if self.reboot_counter_enabled:
                     self.reboot_counter += 1 
@@ -246,125 +573,434 @@ class ZomboidServerController():
                     print("Reboot counter disabled. Manual reboot is required for the host PC.")
         
             if cmd_flag == "quit":
-                print(f"\n{self.current_time.now()} -- {cmd_flag} sent. Shutting down server.")
+                print(f"\n{self.current_time.now()} -- [{self.name}] {cmd_flag} sent. Shutting down server.")
+                ## Each step runs even if the one before it failed; the backup and the stop always run, so the server is never left running without one
                 try:
                     ## Issue a final deathnote to the server and save the map
-                    sendMessage("\"servermsg \\\"Server is shutting down.\\\"\"")
-                    sendMessage("\"save\"")
-
-                    ## Sleep 5 seconds to allow the final save to take place prior to backing up the server
-                    t.sleep(5)
+                    await step(sendMessage("servermsg \"Server is shutting down.\""))
 
-                    ## Backup the world before shutting down the server 
-                    self.backupWorld(cmd_flag)
+                    ## Save the map and wait for the save to finish before backing up the server
+                    await step(self.saveWorld())
 
-                    ## Send a quit message to shutdown the Zomboid server connection
-                    sendMessage("\"quit\"")
+                finally:
+                    try:
+                        ## Backup the world before shutting down the server
+                        await step(self.backupWorldTask(cmd_flag))
 
-                    ## Wait 5 seconds for "quit" command to finish
-                    t.sleep(5)
+                        ## Send a quit message to shutdown the Zomboid server connection
+                        await step(sendMessage("quit"))
 
-                    ## Call the final stop function to kill the server
-                    self.stopServer()
+                        ## Wait for the "quit" command to finish shutting the server down
+                        await step(self.readiness.waitUntilStopped(self.shutdown_timeout))
 
-                except Exception as error:
-                    print(f"\n{self.current_time.now()} -- ERROR: {error}")
+                    finally:
+                        ## Call the final stop function to kill the server
+                        await self.stopServer()
             
             if cmd_flag == "modUpdateCheck":
                 if self.one_hour_flag or self.restart_flag:
                     print("Server preparing to restart. Cancelling mod update check.\n")
                     return
-                
-                ## Instantiate ZomboidSoup class to variable
-                zs = zomboidSoup(self.server_ini, self.mod_csv)
-
-                ## Queue to grab the state of current server mods
-                response_queue = queue.Queue()
-
-                def modUpdateThread(arg, response_queue):
-                    ''' A helper method for creating threads for the updating the zomboid server modlist '''
-                    ## Thread zomboidSoup instance for faster results and better interoperability with other scripts
-                    thread = th.Thread(target=zs.scrapeSteamWorkshop,args=(arg ,response_queue,), daemon=True)
-                    thread.start()
-
-                if os.path.exists(self.mod_csv) and not self.start_flag:
-                    ## Check if the current modsList.csv has updated
-                    modUpdateThread("--check", response_queue)
-                    result = response_queue.get()
-
-                    if result == 0:
-                        print(f"{self.current_time.now()} -- Mods are in sync. Nothing else to do.\n")
-                        return
-
-                    elif result == 1:
-                        print(f"{self.current_time.now()} -- Mods out of sync. Preparing to restart server!\n")
-                        try:
-                            sendMessage("\"servermsg \\\"One or more mods have updated and the server must restart.\\\"\"")
-                        except Exception as error:
-                            print(f"{self.current_time.now()} -- ERROR: {error}\n")
-                        self.serverMessenger("restart")
-                        return
-                    else:
-                        print(f"{self.current_time.now()} -- Error with synchronizing mods. Skipping sync.\n")
-                
-                elif not os.path.exists(self.mod_csv) or self.start_flag:
+
+                if os.path.exists(self.mod_state) and not self.start_flag:
+                    ## Check if any mod in the saved mod state has updated; the controller restarts this instance if so
+                    await self.controller.modUpdateCheck([self])
+
+                elif not os.path.exists(self.mod_state) or self.start_flag:
                     ## Mods are updated on server start, so only write updates to modList
-                    print(f"{self.current_time.now()} -- Server started; updating modlist CSV.")
-                    modUpdateThread("--write", response_queue)
+                    print(f"{self.current_time.now()} -- [{self.name}] Server started; updating mod state.")
+                    self.scheduler.spawn(self.writeModState())
                     self.start_flag = False
                     return
 
+            if cmd_flag == "modsUpdated":
+                print(f"{self.current_time.now()} -- [{self.name}] Mods out of sync. Preparing to restart server!\n")
+                try:
+                    await sendMessage("servermsg \"One or more mods have updated and the server must restart.\"")
+                except Exception as error:
+                    print(f"{self.current_time.now()} -- [{self.name}] ERROR: {error}\n")
+                await self.serverMessenger("restart", self.mod_update_window_deadline)
+
         except Exception as error:
-            print(f"{self.current_time.now()} -- ERROR {error}")
+            print(f"{self.current_time.now()} -- [{self.name}] ERROR {error}")
+
+    async def writeModState(self) -> None:
+        ''' A method to save every mod's current timestamp as the mod state, and add the lookups to the controller's mod history '''
+        soup = self.workshopSoup()
+        now  = self.controller.epochNow()
+        response_queue = queue.Queue()
+        await asyncio.to_thread(soup.scrapeSteamWorkshop, "--write", response_queue)
+        if not response_queue.empty() and response_queue.get() is None:
+            print(f"{self.current_time.now()} -- [{self.name}] No workshop mods found in {self.server_ini}. Skipping the mod state.\n")
+            return
+        await self.controller.recordModLookups(soup, soup.mod_timestamps, now)
 
-    def startServer(self):
-        ''' A method for starting a zomboid server instance '''
+    async def startServer(self):
+        ''' A method for starting a zomboid server instance; returns the seconds it took to become ready, or None '''
         ## Start the Zomboid server
-        print(f"{self.current_time.now()} -- Starting first server instance via script!\n")
+        print(f"{self.current_time.now()} -- [{self.name}] Starting first server instance via script!\n")
         print('#### Server instance started! Press CTRL-C to safely shutdown, backup, and exit the server. ####\n')
         
         ## Backup the world before starting the server
-        self.backupWorld("start")
+        await self.backupWorldTask("start")
 
         ## This line starts the server using the command assigned from config.json
         ## The command is printed to the terminal to verify it's been passed correctly
-        sp.call(self.start_server_cmd, shell=True)
-        print(f"{self.current_time.now()} -- Now running server-start.sh script...\nCommand: {self.start_server_cmd}")
+        self.readiness.markStart()
+        server_pid = await asyncio.to_thread(self.server_process.start)
+        if server_pid is None:
+            ## The restart timers still run, so the next planned restart tries again
+            print(f"{self.current_time.now()} -- [{self.name}] ERROR: Server process exited right after starting.\nCommand: {self.start_server_cmd}\n")
+            self.scheduleTasks()
+            return None
+        self.started_at = asyncio.get_running_loop().time()
+        self.resources.reset()
+        print(f"{self.current_time.now()} -- [{self.name}] Now running server-start.sh script (PID {server_pid})...\nCommand: {self.start_server_cmd}")
         
         ## A flag to manage server state
         self.start_flag = True 
         
-        ## Update modList.csv
-        self.serverMessenger("modUpdateCheck") 
+        ## Update the mod state
+        await self.serverMessenger("modUpdateCheck") 
         
-        ## Sleep 5 minutes to allow the server to finish loading, then send server message
-        t.sleep(300)
+        ## Wait for the server to finish loading (RCON answering or the console's startup marker), then send server message
+        ready_after = await self.readiness.waitUntilReady(self.startup_timeout)
+        if ready_after is None:
+            print(f"{self.current_time.now()} -- [{self.name}] WARNING: Server not ready after {self.startup_timeout}s; continuing anyway.\n")
+        else:
+            print(f"{self.current_time.now()} -- [{self.name}] Server ready after {ready_after:.0f}s.\n")
         
-        ## Send 4h restart warning to the server
-        self.serverMessenger("4h")
+        ## Send the restart warning (4h by default) to the server
+        await self.serverMessenger(f"{self.restart_interval_hours}h")
 
         ## Schedule tasks to run after the server has started
         self.scheduleTasks()
+        return ready_after
 
-    def stopServer(self):
+    async def stopServer(self):
         ''' A method for stopping instances of a zomboid server '''
         ## Reset all server state flags
         self.one_hour_flag = False
         self.restart_flag  = False
         self.start_flag    = False
 
-        ## Clear the jobs list
-        for job in self.jobs:
-            s.cancel_job(job)
-        self.jobs.clear() 
+        ## Cancel the recurring job timers
+        self.scheduler.cancelJobs()
+        self.restart_schedule = None
         
+        ## Drop the RCON connection; it reconnects on the next command once the server is back up
+        self.rcon.close()
+
         ## stop server process
-        print(f"{self.current_time.now()} -- Cleaning up previous server instance (if any exist)...\n")
-        for proc in ps.process_iter():
-            # check whether the process name matches
-            if proc.name() in [self.server_shell_process_name,self.server_binary_process_name]:
-                proc.kill()
-        t.sleep(5)
+        print(f"{self.current_time.now()} -- [{self.name}] Cleaning up previous server instance (if any exist)...\n")
+        ## Only the process tree recorded in the pidfile is touched: SIGTERM, wait for it to exit, then SIGKILL if it has to
+        if not await asyncio.to_thread(self.server_process.stop, self.shutdown_timeout):
+            print(f"{self.current_time.now()} -- [{self.name}] WARNING: Server processes are still running after SIGKILL.\n")
+
+        ## Index whatever the server logged while shutting down
+        if self.logs:
+            await self.pollLogs()
+
+class ZomboidServerController():
+    ''' A zomboid server controller class managing every server instance listed in server_config.json '''
+
+    def __init__(self) -> None:
+        ''' Constructor for Zomboid Server Controller Variables '''
+        try:
+            if os.path.exists("server_config.json"):
+                ## server_config.json is checked for changes every config_reload_interval_seconds and applied without a restart
+                self.config_file = managerConfig("server_config.json")
+                config_data      = self.config_file.load()
+
+                ## Scheduler running the shared mod update check, and the event set once every server has shut down
+                ###########################################################
+                self.scheduler          = zomboidScheduler()
+                self.stopped            = None
+                self.mod_check_interval = config_data["server_config"].get("mod_check_interval_minutes", 30) * 60
+                self.mod_check_timer    = None
+                self.config_reload_interval = config_data["server_config"].get("config_reload_interval_seconds", 10)
+                self.current_time       = dt.datetime
+                ###########################################################
+
+                ## Mod Polling - Every lookup goes into the mod history; "adaptive" mod_polling looks each mod up at its own rate instead of every check
+                ###########################################################
+                self.mod_history        = modUpdateHistory(config_data["server_config"].get("mod_history_path") or "zomboid_mod_history.json")
+                self.mod_poller         = modPollScheduler(self.mod_history)
+                self.epoch_offset       = 0 # Unix time minus loop time, so history times follow the loop's clock
+                self.loadPollSettings(config_data["server_config"])
+                self.workshop_lookup    = self.workshopLookup(config_data["server_config"]) # Looks up every server's mods at once on each mod check
+                self.lookup_lock        = asyncio.Lock() # A check started by one server waits for the timer's check, and vice versa
+                ###########################################################
+
+                ## Metrics - Prometheus text endpoint on a local port, and a periodic JSON lines dump (both optional)
+                ###########################################################
+                self.metrics_server        = metricsServer(METRICS, config_data["server_config"].get("metrics_host", "127.0.0.1"), config_data["server_config"].get("metrics_port"))
+                self.metrics_dump_path     = config_data["server_config"].get("metrics_dump_path")
+                self.metrics_dump_interval = config_data["server_config"].get("metrics_dump_interval_seconds", 60)
+                ###########################################################
+
+                ## Server instances - "servers" entries override the shared "server_config" settings;
+                ## without a "servers" list, "server_config" describes the one server to manage
+                ###########################################################
+                self.disk_locks = {}
+                self.instances  = [ZomboidServerInstance(server_config, self) for server_config in self.instanceConfigs(config_data)]
+                ###########################################################
+
+            else:
+                print("Unable to read server_config.json.\nPlease re-download the repo and ensure it's in the same directory as zomboid_server_manager.py")
+                exit(1)
+
+        except Exception as error:
+            print(f"ERROR: Could not initialize server configuration.\n{error}")
+            exit(1)
+
+    def instanceConfigs(self, config_data) -> list:
+        ''' Return each managed server's settings: its "servers" entry merged over the shared "server_config" '''
+        server_configs = []
+        for server in config_data.get("servers") or [{}]:
+            server_config = {**config_data["server_config"], **server}
+            server_config.setdefault("name", os.path.splitext(os.path.basename(server_config["server_ini_path"]))[0])
+            if "servers" in config_data:
+                ## Files the manager keeps for each server default to one per instance name, next to the shared setting
+                for key, default in [("server_pidfile_path", "zomboid_server.pid"), ("mod_state_path", "zomboid_mod_state.jsonl"), ("log_index_path", "zomboid_logs.db"),
+                                     ("workshop_cache_path", None)]:
+                    if key not in server and (config_data["server_config"].get(key) or default):
+                        stem, extension = os.path.splitext(config_data["server_config"].get(key) or default)
+                        server_config[key] = f"{stem}_{server_config['name']}{extension}"
+                ## Backups go in a folder per instance, so archive names, retention, the catalog and the snapshot store never mix servers
+                if "backup_folder_path" not in server:
+                    server_config["backup_folder_path"] = os.path.join(config_data["server_config"]["backup_folder_path"], server_config["name"])
+            server_configs.append(server_config)
+
+        backup_folders = [os.path.normpath(server_config["backup_folder_path"]) for server_config in server_configs]
+        for backup_folder in sorted({folder for folder in backup_folders if backup_folders.count(folder) > 1}):
+            print(f"{self.current_time.now()} -- WARNING: Several servers back up to {backup_folder}; their backups can overwrite and prune each other.")
+        return server_configs
+
+    def loadPollSettings(self, server_config) -> None:
+        ''' Apply the mod_poll_* settings; called again whenever server_config.json changes '''
+        self.mod_poller.adaptive           = server_config.get("mod_polling", "sweep") == "adaptive" # "sweep" looks every mod up on every check
+        self.mod_poller.min_interval       = self.mod_check_interval
+        self.mod_poller.max_interval       = server_config.get("mod_poll_max_hours", 24) * 60 * 60 # Longest a mod goes without a lookup
+        self.mod_poller.change_probability = server_config.get("mod_poll_change_probability", 0.02) # Chance of a missed update that prompts a lookup
+        self.mod_poller.jitter             = server_config.get("mod_poll_jitter", 0.1)
+        self.mod_poller.min_backoff        = server_config.get("mod_poll_backoff_minutes", 15) * 60 # First pause after a 429; doubles while they continue
+        self.mod_priority_window           = server_config.get("mod_poll_priority_minutes", 90) * 60 # Look every mod up this close to a planned restart
+
+    def workshopLookup(self, server_config) -> zomboidSoup:
+        ''' A method to build the workshop lookup the mod checks share, from the shared "server_config" workshop settings '''
+        ## It only fetches timestamps, so it reads no servertest.ini or mod state; its page cache and rate limits cover every server's mods
+        return zomboidSoup(None, None,
+                           backend             = server_config.get("workshop_backend", "api"),
+                           api_batch_size      = server_config.get("workshop_api_batch_size", 100),
+                           max_concurrency     = server_config.get("workshop_max_concurrency", 8),
+                           requests_per_second = server_config.get("workshop_requests_per_second", 10),
+                           max_retries         = server_config.get("workshop_max_retries", 3),
+                           cache_path          = server_config.get("workshop_cache_path"),
+                           cache_max_entries   = server_config.get("workshop_cache_max_entries", 1000),
+                           extractor           = server_config.get("workshop_extractor", "regex"),
+                           workshop_url        = server_config.get("workshop_page_url"),
+                           steam_api_url       = server_config.get("workshop_api_url"))
+
+    def epochNow(self) -> float:
+        ''' Return the current unix time according to the event loop's clock '''
+        return asyncio.get_running_loop().time() + self.epoch_offset
+
+    def diskLock(self, path) -> asyncio.Lock:
+        ''' Return the lock shared by every instance whose files live on the same disk (st_dev) as path '''
+        try:
+            device = os.stat(path).st_dev
+        except OSError:
+            device = path
+        return self.disk_locks.setdefault(device, asyncio.Lock())
+
+    async def run(self) -> None:
+        ''' Method to cold start every server and keep the event loop running until they have all been shut down '''
+        self.stopped = asyncio.Event()
+        self.epoch_offset = t.time() - asyncio.get_running_loop().time()
+
+        ## Track number of times user presses Ctrl+C (Sigint)
+        self.sigint_count = 0
+
+        def handler():
+            ''' A handler for killing the program with Ctrl+C '''
+            # Handle user shutdown
+            print(f'\n{self.current_time.now()} -- CTRL-C detected. Exiting gracefully. Please wait...\n')
+            if self.sigint_count >= 1:
+               print(f"{self.current_time.now()} -- CTRL-C received twice; forcing immediate server shutdown!\n")
+               os._exit(0)
+            self.sigint_count += 1
+
+            ## Cancel the timers and anything in flight (e.g. a restart countdown) before shutting down
+            for scheduler in [self.scheduler] + [instance.scheduler for instance in self.instances]:
+                scheduler.cancelJobs()
+                scheduler.cancelRunning()
+            self.scheduler.spawn(self.shutdown())
+
+        ## When Ctrl+C detected, cancel running jobs and quit
+        asyncio.get_running_loop().add_signal_handler(SIGINT, handler)
+
+        if self.metrics_server.port is not None:
+            try:
+                self.metrics_server.start()
+            except OSError as error:
+                print(f"{self.current_time.now()} -- ERROR: Could not serve metrics on port {self.metrics_server.port}: {error}")
+        if self.metrics_dump_path:
+            self.scheduler.every(self.metrics_dump_interval, self.dumpMetrics)
+
+        for instance in self.instances:
+            instance.scheduler.spawn(instance.coldStart())
+        self.mod_check_timer = self.scheduler.every(self.mod_check_interval, self.modUpdateCheck)
+        self.scheduler.every(self.config_reload_interval, self.reloadConfig)
+        await self.stopped.wait()
+
+    async def reloadConfig(self) -> None:
+        ''' A method to apply changes to server_config.json and each servertest.ini while every server keeps running '''
+        try:
+            diff = await asyncio.to_thread(self.config_file.reload)
+            server_configs = self.instanceConfigs(self.config_file.settings) if diff else None
+        except (OSError, KeyError, TypeError, AttributeError) as error:
+            print(f"{self.current_time.now()} -- ERROR: Could not apply server_config.json: {error!r}")
+            server_configs = None
+
+        if server_configs is not None:
+            print(f"{self.current_time.now()} -- server_config.json changed; applying it.")
+            by_name = {server_config["name"]: server_config for server_config in server_configs}
+            for instance in list(self.instances):
+                if instance.name in by_name:
+                    instance.applyConfig(by_name.pop(instance.name))
+                else:
+                    ## A server dropped from "servers" is shut down the same way as on Ctrl+C
+                    print(f"{self.current_time.now()} -- [{instance.name}] Removed from server_config.json; shutting it down.")
+                    self.instances.remove(instance)
+                    ## Stop its timers and any restart in flight first, and wait for them to unwind, so none of them brings the server back up mid-shutdown
+                    instance.scheduler.cancelJobs()
+                    await asyncio.gather(*instance.scheduler.cancelRunning(), return_exceptions=True)
+                    instance.scheduler.spawn(instance.serverMessenger("quit"))
+            for server_config in by_name.values():
+                print(f"{self.current_time.now()} -- [{server_config['name']}] Added to server_config.json; starting it.")
+                instance = ZomboidServerInstance(server_config, self)
+                self.instances.append(instance)
+                instance.scheduler.spawn(instance.coldStart())
+
+            mod_check_interval = self.config_file.settings["server_config"].get("mod_check_interval_minutes", 30) * 60
+            if mod_check_interval != self.mod_check_interval:
+                print(f"{self.current_time.now()} -- Mod checks now run every {mod_check_interval / 60:g} minutes.")
+                self.mod_check_interval = mod_check_interval
+                self.scheduler.cancel(self.mod_check_timer)
+                self.mod_check_timer = self.scheduler.every(self.mod_check_interval, self.modUpdateCheck)
+            self.loadPollSettings(self.config_file.settings["server_config"])
+            self.workshop_lookup = self.workshopLookup(self.config_file.settings["server_config"])
+
+        for instance in self.instances:
+            await instance.reloadServerIni()
+
+    async def shutdown(self) -> None:
+        ''' A method to quit every server and let run() return '''
+        await asyncio.gather(*(instance.serverMessenger("quit") for instance in self.instances))
+        ## Let each last backup finish its checksum manifest and pruning before the manager exits
+        await asyncio.gather(*(asyncio.to_thread(instance.world_backup.finish) for instance in self.instances))
+        if self.metrics_dump_path:
+            await self.dumpMetrics()
+        self.metrics_server.close()
+        self.stopped.set()
+
+    async def dumpMetrics(self) -> None:
+        ''' A method to append the current metrics to the JSON lines dump '''
+        await asyncio.to_thread(METRICS.dump, self.metrics_dump_path)
+
+    async def modUpdateCheck(self, instances=None) -> None:
+        ''' A method to check the mods of several instances with one workshop lookup, restarting only the instances whose mods changed '''
+        ## Instances that are starting, about to restart or have no mod state yet are left to their own schedule
+        checks = {}
+        for instance in instances or self.instances:
+            ## Pick up servertest.ini edits first, so mods just added to WorkshopItems= are tracked instead of counting as an update
+            await instance.reloadServerIni()
+            if instance.one_hour_flag or instance.restart_flag or instance.start_flag or not os.path.exists(instance.mod_state):
+                continue
+            soup = instance.workshopSoup()
+            if await asyncio.to_thread(soup.openServerConfig):
+                checks[instance] = soup
+        if not checks:
+            return
+
+        now = self.epochNow()
+        if self.mod_poller.backingOff(now):
+            print(f"{self.current_time.now()} -- Steam is rate limiting workshop lookups; skipping this mod check ({(self.mod_poller.backoff_until - now) / 60:.0f} minutes of backoff left).")
+            return
+
+        ## Ask Steam once for the mods due out of every instance's WorkshopItems=; servers close to a planned restart have all their mods looked up, first
+        workshop_ids    = list(dict.fromkeys(workshop_id for soup in checks.values() for workshop_id in soup.workshop_ids))
+        loop_time       = asyncio.get_running_loop().time()
+        priority_ids    = [workshop_id for instance, soup in checks.items()
+                           if instance.nextPlannedRestart() is not None and instance.nextPlannedRestart() - loop_time <= self.mod_priority_window
+                           for workshop_id in soup.workshop_ids]
+        due_ids         = self.mod_poller.dueMods(workshop_ids, now, priority_ids)
+        MOD_LOOKUPS.inc(len(due_ids), result="looked_up")
+        MOD_LOOKUPS.inc(len(workshop_ids) - len(due_ids), result="skipped")
+        if not due_ids:
+            print(f"{self.current_time.now()} -- None of the {len(workshop_ids)} workshop mods are due for a lookup.")
+            return
+        print(f"{self.current_time.now()} -- Checking {len(due_ids)} of {len(workshop_ids)} workshop mods for {len(checks)} server(s)...")
+        ## The lookup is the controller's own, so no instance's soup ends up holding (or rate limited on) the other servers' mods
+        async with self.lookup_lock:
+            lookup              = self.workshop_lookup
+            fetched_timestamps  = await asyncio.to_thread(lookup.fetchTimestamps, due_ids)
+            await self.recordModLookups(lookup, fetched_timestamps, now)
+
+        ## Mods that weren't looked up this time, or whose lookup failed (e.g. a 429), count as unchanged since their last lookup
+        remote_timestamps = {**self.mod_history.lastSeen(workshop_ids),
+                             **{workshop_id: timestamp for workshop_id, timestamp in fetched_timestamps.items() if timestamp is not LOOKUP_FAILED}}
+
+        for instance, soup in checks.items():
+            response_queue = queue.Queue()
+            await asyncio.to_thread(soup.scrapeSteamWorkshop, "--check", response_queue, remote_timestamps)
+            result = response_queue.get() if not response_queue.empty() else None
+
+            if result == 0:
+                print(f"{self.current_time.now()} -- [{instance.name}] Mods are in sync. Nothing else to do.\n")
+            elif result == 1:
+                instance.scheduler.spawn(instance.serverMessenger("modsUpdated"))
+            else:
+                print(f"{self.current_time.now()} -- [{instance.name}] Error with synchronizing mods. Skipping sync.\n")
+
+    async def recordModLookups(self, soup, remote_timestamps, now) -> None:
+        ''' A method to add a lookup's timestamps to the mod history, pausing mod checks if Steam rate limited any of it '''
+        if soup.rate_limited:
+            pause = self.mod_poller.rateLimited(now, soup.retry_after)
+            print(f"{self.current_time.now()} -- Steam answered 429 Too Many Requests; pausing mod checks for {pause / 60:.0f} minutes.")
+        else:
+            self.mod_poller.clearBackoff()
+        self.mod_poller.observe({workshop_id: timestamp for workshop_id, timestamp in remote_timestamps.items() if timestamp is not LOOKUP_FAILED}, now)
+        await asyncio.to_thread(self.mod_history.save)
+
+    async def rebootHost(self, instance) -> None:
+        ''' A method to reboot the host PC after a server has restarted x number of times '''
+        print(f"\n####ZOMBOID SERVER {instance.name} HAS RESTARTED {instance.reboot_counter} TIMES.\n####Initiating a reboot of the host PC...\n")
+
+        ## Back up and stop every server first; instances sharing a disk still take turns
+        async def backupAndStop(server):
+            try:
+                await server.saveWorld()
+            except Exception as error:
+                print(f"{self.current_time.now()} -- [{server.name}] ERROR: {error}")
+            try:
+                await server.backupWorldTask("restart")
+            except Exception as error:
+                print(f"{self.current_time.now()} -- [{server.name}] ERROR: {error}")
+            finally:
+                await server.stopServer()
+        await asyncio.gather(*(backupAndStop(server) for server in self.instances))
+
+        result = sp.run(["uname", "-a"], capture_output=True)
+        result = result.stdout.strip().decode()
+        ## Check if server is hosted in a WSL instance or not
+        if "Microsoft" in result:
+            sp.call(["/mnt/c/WINDOWS/system32/shutdown.exe", "/r"])
+            sp.call(["/mnt/c/WINDOWS/system32/shutdown.exe", "/f"])
+        else:
+            ## In case of Linux, run reboot with --force
+            sp.call("reboot --force")
 
 if __name__ == "__main__":    
     print(r" ____          _         _    _   ___                        __  __                              ")
@@ -380,11 +1016,8 @@ if __name__ == "__main__":
     ## Init the server controller obj
     zsc = ZomboidServerController()
     
-    ## Call a server cold start
-    zsc.coldStart()
-
-    ## Start the job scheduler
-    zsc.runScheduler()
+    ## Cold start the server and run the scheduled jobs on the event loop until the server is shut down
+    asyncio.run(zsc.run())
 
 
 